@@ -1,912 +1,1960 @@
-
-## core_grade.py
-
-"""
-Defines gradepipe grading processes.
-
-Contains the Process class, which defines a single step to be executed
-during a gradepipe session.  This superclass defines the interface for all
-other specific processes to implement.
-
-Also contains all specific processes implemented so far.
-
-Part of Tamarin, by Zach Tomaszewski.  
-Created: 14 Jul 2012.
-"""
-
-import datetime
-import glob
-import html
-import logging
-import re
-import os
-import shutil
-import subprocess
-import zipfile
-
-# can't import tamarin here due to circular dependency; imported in methods
-#from core_type import TamarinErrror 
-
-class Process:
-    """
-    A Process simplifies the work of executing a step in the grading flow.
-    It is possible to execute Python code or invoke an external tool.
-    Any Process subclass has access to a common logger.
-    
-    See method documentation for further details.  Also, see GradeFile for
-    an example of how the variables and methods of a Process are often used.
-          
-    """
-    def __init__(self, required=True, displayName=None):
-        """
-        Initializes this Process.  Subclasses may add additional required
-        parameters, but should always invoke this superclass constructor. 
-        
-        Sets up these public instance variables:
-        * required (from parameter)
-        * name (name of the constructing subclass)
-        * displayName (from parameter, if given; else name)
-        * grade (None)
-        * output (None)
-        * logger
-        
-        self.required (taken from the parameter) specifies whether this 
-        process must pass its run before carrying on to the next one in the 
-        current grading sequence. That is, if this process fails to pass its
-        run, should this abort the rest of the grading sequence for this 
-        submitted file? 
-        
-        self.grade is the grade resulting from the run of this process.  
-        The value must match the format of tamarin.GRADE_RE, which means 
-        a float or 'OK' or 'X' (or 'ERR').  If left as None, grading 
-        is not relevant to this process.  (For example, the process might
-        be only informational or simply involve copying files around in
-        preparation for another process.) 
-        
-        self.output is any content that should be displayed to the student
-        in the generated grader output file.  
-        
-        self.name is the most-specific class name of this Process.
-        
-        self.displayName is a longer or more coherent name shown in grader 
-        output to the student.  Defaults to self.name if not given.
-        
-        self.logger is the logger specific to the particular Process class
-        and can be used to record information that would be useful in 
-        debugging or when monitoring the process.  See the Python logging
-        module for more information.  Logged data does NOT go into output
-        passed on to the student.  
-        
-        """
-        self.required = required
-        self.name = type(self).__name__
-        self.displayName = displayName if displayName else self.name
-        self.grade = None
-        self.output = None
-        self.logger = logging.getLogger('Process.' + self.name)
-
-    def run(self, args):
-        """
-        Executes this Process.
-        
-        Passes in a dict as args.  This dictionary is shared by all Processes
-        in a grading sequence, so every Process should document what keys it
-        requires and what changes it might make.  This mechanism allows 
-        different processes to recording important information (such as 
-        return codes, etc.) for other later processes to access.  To avoid
-        unexpected name clashes, every Process should prefix its class name 
-        to any keys it uses.  For example, if a GradeFile process wants to add
-        a 'filename key, it should instead add 'GradeFile.filename'. 
-            
-        This method should then return either True or False.  If True, the
-        run sufficiently accomplished its goals.  If False, the run failed to 
-        achieve what was required of either it or the submitted work.  
-        For example, a Compile process would return False if the files did 
-        not actually compile.
-        
-        For errors in the process itself, an exception--preferably a
-        TamarinError--should be thrown.
-        
-        The difference between a run failure (returning False) and an error
-        (throwing an exception) is that failure will still result in grade
-        and output being reported to the student.  Also, if the process was not
-        required, the gradepipe will try to continue with the next Process.  
-        On the other hand, an error means the Process itself crashed, which 
-        will halt the gradepipe for the current file and be reported as a 
-        Tamarin-level error.
-        
-        This run(args) method must be overridden in any implementing subclass.
-        """
-        pass
-
-
-class GradePipe(Process):
-    """
-    Not intended for direct use by Tamarin users or admins.
-    Thus, it should not be included in the process list for a SubmissionType.
-        
-    GradePipe is something of a "meta process".  It is normally started 
-    when gradepipe.py is executed.               
-    
-    """
-    def __init__(self, required=True, fileControlled=True, 
-                 logLevel='INFO', gradeOnly=None):
-        """
-        If fileControlled is True, this GradePipe will respect the files
-        set in tamarin.py on whether or not it should run.  That is, it
-        will abort if another GrapePipe is running (tamarin.GRADEPIPE_ACTIVE)
-        or disabled (tamarin.GRADEPIPE_DISABLED).  If False, it will always
-        run.
-        
-        logLevel controls the level of logging.  Should be one of the 
-        standard levels from Python's logging module.  'DEBUG' is basically
-        'verbose' mode. 
-        
-        If gradeOnly is given, will grade only those submitted files 
-        whose basenames includes the given substring.
-        
-        """
-        super().__init__(required)
-        self.fileControlled = fileControlled
-        self.logLevel = logLevel
-        self.gradeOnly = gradeOnly
-    
-    def run(self, args=None):
-        """
-        Grades all files in tamarin.SUBMITTED_ROOT.
-        
-        Will abort with False if fileControlled and a file state indicates
-        it should not run.  
-        
-        If running, sets up logging for all sub-processes.  Will then loop
-        through all submitted files, running GradeFile on each one, and return
-        True.
-        """
-        import tamarin
-        
-        if not args:
-            args = dict()
-                
-        # set up top-level Process logger in order to capture all logging
-        topLogger = logging.getLogger('Process')
-        handler = logging.StreamHandler()
-        formatter = logging.Formatter(fmt='{name}-{levelname}: {message}', 
-                                      style='{')
-        handler.setFormatter(formatter)
-        topLogger.addHandler(handler)
-        topLogger.setLevel(self.logLevel)
-        
-        # make sure we should even run.
-        if self.fileControlled:            
-            if os.path.exists(tamarin.GRADEPIPE_DISABLED):
-                self.logger.warn("GRADEPIPE_DISABLED file exists. Quitting...")
-                return False
-            elif os.path.exists(tamarin.GRADEPIPE_ACTIVE):
-                self.logger.warn("GRADEPIPE_ACTIVE file exits. Quitting...")
-                return False
-            
-        # dump PID into file
-        try:
-            self.logger.info("Started at %s.", datetime.datetime.now())
-            with open(tamarin.GRADEPIPE_ACTIVE, 'w') as outfile:
-                outfile.write(str(os.getpid()))
-            self.logger.debug("Wrote PID %d to ACTIVE file.", os.getpid())
-        except IOError:
-            self.logger.exception("Could not dump PID to file.")    
-            return False
-
-        # grading loop
-        try:
-            #loop over submitted files as long as there are more to grade
-            gradedCount = 0
-            failedCount = 0
-            badFiles = []
-            gf = GradeFile()
-
-            while True:
-                # get most recent list 
-                submitted = tamarin.getSubmittedFilenames(self.gradeOnly)
-                submitted = [f for f in submitted if f not in badFiles]
-
-                if not submitted: 
-                    break
-                        
-                success = gf.run(args, os.path.basename(submitted[0]))
-                if success:
-                    gradedCount += 1
-                else:
-                    failedCount += 1
-                    if tamarin.LEAVE_PROBLEM_FILES_IN_SUBMITTED:
-                        badFiles.append(submitted[0])
-    
-            # done looping
-            self.logger.info("%d of %d files successfully graded.", 
-                             gradedCount, gradedCount + failedCount)
-        except:
-            self.logger.exception("Crashed unexpectedly!")
-
-        # cleanup PID file 
-        try:
-            os.remove(tamarin.GRADEPIPE_ACTIVE)
-            self.logger.debug("Removed PID %d's ACTIVE file.", os.getpid())      
-        except:
-            self.logger.exception("Could not clean up ACTIVE/PID file.")
-        
-        self.logger.info("Stopped at %s", datetime.datetime.now())
-        return True    
-
-
-class GradeFile(Process):
-    """
-    Not intended for direct use by Tamarin users or admins.
-    Thus, it should not be included in the process list for a SubmissionType.
-        
-    GradeFile deals with the task of grading a single submitted file.  It sets
-    up the gradezone, calls the appropriate processes for that file type, 
-    records the results into a grader output file, and them moves the file
-    into the graded directory (depending on the value of 
-    tamarin.LEAVE_PROBLEM_FILES_IN_SUBMITTED).                
-    
-    """    
-    def __init__(self, required=False):
-        """
-        Failing to grade one file doesn't mean we can't try the next one.
-        """
-        super().__init__(required)
-
-    def run(self, args, filenameInSubmitted=None):
-        """
-        Grades the given submitted file.
-        
-        The given filename must be located in SUBMITTED_ROOT.  If this 
-        convenience argument is omitted, will look in 
-        args['GradeFile.filenameInSubmitted'] instead.  If that is missing too,
-        will raise a ValueError. 
-        
-        args must be a valid dictionary, though it can be empty.  The passed
-        args value will be unaffected.  That is, each GradeFile subprocess
-        will receive a fresh/reset copy of the passed args.  
-        
-        Sets the following args fields:
-        * GradeFile.filenameInSubmitted - timestamped filename in SUBMITTED
-        * GradeFile.filename - name of original submission, now GRADEZONE
-        * GradeFile.name - everything up to first .
-        * GradeFile.ext - everything after first .
-        * GradeFile.path - full path to file's GRADEZONE location
-        * GradeFile.username - username as appears in filename
-        * GradeFile.user - username, but all lowercase
-        * GradeFile.assignment - for which this file was submitted
-        
-        Clears the gradezone and copies the submitted file (under its 
-        original, non-timestamped name) into the zone.  Then opens a grader 
-        output file and runs all process appropriate for that assignment's 
-        type.  
-
-        The grader output file starts with <div class="grader">.
-        
-        Then, for each process, records any grade or output if either is not 
-        None. If recording, the process gets its own <div class="graderName">
-        section were Name is the process's class name.  
-        
-        The grade will then be recorded as 
-        <p><span class="displayName">display name:</span> grade</p>.
-        If there is no grade, the rest of the line still gets printed
-        in order to identify the output. 
-        
-        Any output will then follow.  If the first character is a '<',
-        it is assumed that the output is appropriately HTML-formatted. 
-        If not, it will be HTML-escaped and displayed in a <pre> format.  
-        In this case, it is recommended to keep lines to fewer than 80 
-        chars long.  
-        
-        Finally, the current process's div will be closed with a </div>.  
-        
-        Whether a process's run passes or fails does not affect output.
-        It simply determines whether or not the next process should be 
-        invoked.  So, if a Process is going to fail and wants the student
-        to know why, it should document it somehow in its self.output.
-        
-        After running all processes, the overall grade is stored in a 
-        'GRADE_START_TAG grade GRADE_END_TAG' line (without the spaces).  
-        If any grade is 'ERR', the final grade is 'ERR'.  Otherwise, if at 
-        least one grade was a number, the grade is the sum of all numerical 
-        grades.  If none were numbers, the grade is 'OK', unless there was 
-        at least one 'X'.  This means the grade is 'OK' if there were no 
-        processes that returned a grade.
-        
-        Finally, the grader output file ends with another </div>. 
-         
-        """
-        import tamarin
-        from core_type import TamarinError, Assignment, SubmittedFile   
-        
-        args = dict(args)  # don't want to mangle version passed to each run 
-                
-        # check args
-        if 'GradeFile.filenameInSubmitted' not in args:
-            args['GradeFile.filenameInSubmitted'] = filenameInSubmitted
-        if not args['GradeFile.filenameInSubmitted']:
-            raise ValueError("'GradeFile.filenameInSubmitted' not provided.")
-        fInS = args['GradeFile.filenameInSubmitted']
-
-        try: 
-            # check filename exists and grab details
-            self.logger.debug("%s - started grading...", fInS)
-            submitted = SubmittedFile(fInS)
-            assignment = Assignment(submitted.assignment)
-            processes = assignment.type.processes
-
-            # save details into args for other sub-processes to use
-            fn = submitted.originalFilename
-            args['GradeFile.filename'] = fn
-            args['GradeFile.name'] = fn.split('.', 1)[0]
-            args['GradeFile.ext'] = fn.split('.', 1)[1]
-            args['GradeFile.username'] = submitted.username
-            args['GradeFile.user'] = submitted.username.lower()
-            args['GradeFile.assignment'] =  submitted.assignment
-            args['GradeFile.path'] = os.path.join(tamarin.GRADEZONE_ROOT, fn)
-            
-            # sanity check (for manually uploaded files)
-            if args['GradeFile.ext'] != assignment.type.fileExt:
-                raise TamarinError('GRADING_ERROR', 
-                                   "File's extension does not match that " 
-                                   "required by " + assignment.name)
-            
-            # copy file into a clean gradezone
-            try:
-                self.clearGradeZone()
-                shutil.copy(submitted.path, args['GradeFile.path'])
-                self.logger.debug("%s copied into a clean gradezone.", fn)
-            except:
-                raise TamarinError('UNPREPABLE_GRADEZONE')
-            
-            # open a grader output file
-            try:
-                # first, delete any old grader files for this submission
-                outName = submitted.filename.replace("." + submitted.fileExt, 
-                                        "-*." + tamarin.GRADER_OUTPUT_FILE_EXT)
-                outName = os.path.join(assignment.path, outName)
-                for file in glob.glob(outName):
-                    os.remove(file)
-                    
-                outName = outName.replace('-*.', '-.')  # grade-less form
-                graderOut = open(outName, 'w')
-                print('<div class="grader">', file=graderOut)
-            except:
-                self.logger.exception("Could not rm old or write new results.")
-                raise TamarinError('COULD_NOT_STORE_RESULTS', outName)
-
-            grades = []
-            passed = True
-            try:              
-                # run all processes on the submission                
-                for p in processes:
-                    success = p.run(args)                    
-                    if p.grade or p.output:
-                        print('<div class="' + p.name + '">', file=graderOut)
-                        print('<p><span class="displayName">' + p.displayName +
-                              ':</span>', end='', file=graderOut)
-                            
-                        # save grade summary
-                        if p.grade:
-                            if not re.match(tamarin.GRADE_RE + '$', 
-                                            str(p.grade)):
-                                raise TamarinError('INVALID_GRADE_FORMAT',
-                                                   p.name + ' => "' + 
-                                                   p.grade + '"')
-                            try:
-                                # convert p.grade to number it really is
-                                p.grade = round(float(p.grade), 
-                                                tamarin.GRADE_PRECISION)
-                            except ValueError:
-                                pass  # p.grade wasn't a number, so nevermind
-                            grades.append(p.grade)
-                            
-                            #print color-coded non-numeric grades
-                            if isinstance(p.grade, str):
-                                g = '<span class="'
-                                g += 'success' if p.grade == 'OK' else 'fail'
-                                g += '">' + p.grade + '</span>' 
-                            else:
-                                g = str(p.grade)
-                            print(' ' + g, end='', file=graderOut)
-                        
-                        print('</p>', file=graderOut)    
-                            
-                        # save any output
-                        if p.output:
-                            if p.output[0] == '<':
-                                # already formatted
-                                print(p.output, file=graderOut)
-                            else:
-                                print('<pre>\n' + html.escape(p.output, 
-                                                            quote=False) + 
-                                      '</pre>', file=graderOut)
-                        print('</div>', file=graderOut)
-                        
-                    if not success and p.required:
-                        self.logger.warn("%s required but failed, so "
-                                          "aborting grading run", p.name)
-                        passed = False
-                        break
-                
-                # process grades now that we have them all
-                if any(map(lambda x: x == 'ERR', grades)):
-                    grade = 'ERR' 
-                elif any(map(lambda x: isinstance(x, float), grades)):
-                    grade = 0
-                    for g in grades:
-                        if isinstance(g, float):
-                            grade += g
-                else:
-                    grade = 'X' if 'X' in grades else 'OK'
-                                
-            except TamarinError as err:
-                self.logger.error("%r", err)
-                grade = 'ERR'
-                passed = False
-                # Future: send this through printError on way to file?
-                print('<pre>' + repr(err) + '</pre>', file=graderOut)
-            except:
-                self.logger.exception('A grading process just crashed!')
-                grade = 'ERR'
-                passed = False
-                print('<pre>TamarinError: GRADING_CRASH.</pre>', 
-                      file=graderOut)
-            finally:
-                print(tamarin.GRADE_START_TAG + str(grade) + 
-                      tamarin.GRADE_END_TAG, file=graderOut)
-                print('</div>', file=graderOut)
-                graderOut.close()
-
-            # done grading this file (whether successful or not)
-            if isinstance(grade, float):
-                grade = round(grade, tamarin.GRADE_PRECISION)
-            
-            # save results
-            try:                
-                newName = outName.replace('-.', '-' + str(grade) + '.')
-                shutil.move(outName, newName)
-                
-                if passed or not tamarin.LEAVE_PROBLEM_FILES_IN_SUBMITTED:
-                    newLoc = os.path.join(assignment.path, submitted.filename)
-                    shutil.move(submitted.path, newLoc)  
-            except:
-                self.logger.exception("Could not rename/move final results.")
-                raise TamarinError('COULD_NOT_STORE_RESULTS', outName)
-
-            # SUCCESS!
-            self.logger.info("%s -> %s", fInS, grade)
-            return passed
-
-        except TamarinError as err:
-            self.logger.error("%r", err)
-            return False
-        except:
-            self.logger.exception("Unexpected crash!")
-            return False
-       
-    def clearGradeZone(self):
-        """ Recursively deletes all files and directories in the GRADEZONE. """
-        from tamarin import GRADEZONE_ROOT
-        zoneFiles = glob.glob(GRADEZONE_ROOT + '/*')
-        for zf in zoneFiles:
-            #remove both directories and files
-            if os.path.isdir(zf):
-                shutil.rmtree(zf)
-            else:
-                os.remove(zf)
-
-
-class CopyGrader(Process):
-    """ 
-    Copies the grader files for this assignment into the GRADEZONE. 
-    
-    It is recommended that grader files be pre-compiled and copied after
-    compiling the submission.  This way, the submission cannot overwrite
-    the grader files.  If the submission needs some of the grader files
-    in order to compile, then copy the graders, compile the submission,
-    and copy the graders again (to be sure you still have the original
-    versions).
-    """
-    
-    def __init__(self, required=True, 
-                 displayName="Copying grader files into gradezone",
-                 rootGrader=True, assignmentGrader=True):
-        """
-        If rootGrader is True, will copy any files found in GRADERS_ROOT
-        into the gradezone.  If there aren't any files there, the run will 
-        fail. Copies files only, not directories.
-        
-        If assignmentGrader=True, will copy any files found in GRADERS_ROOT/X,
-        where X is the assignment name.  If the folder is not there or is
-        empty, the run will fail.  Will copy whole directories trees if 
-        present.  Since any assignment copying always happens seconds, it is
-        possible to overwrite any default rootGrader files with 
-        assignment-specific versions.
-        
-        It is an error to set both rootGrader and assignmentGrader to False,
-        since then there's nothing to copy.  This will result in an exception
-        when running.
-        """
-        super().__init__(required=required, displayName=displayName)
-        self.rootGrader = rootGrader
-        self.assignmentGrader = assignmentGrader
-        
-    def run(self, args):
-        """
-        If rootGrader, copies that first.  If assignmentGrader, requires 
-        args['GradeFile.assignment'] for the assignment name.  Will copy
-        those graders too.
-        
-        See __init__ for more docs.
-        """
-        import tamarin
-        from core_type import TamarinError
-            
-        if not self.rootGrader and not self.assignmentGrader:
-            self.logger.error("Both rootGrader and assignmentGrader are "
-                              "False.")
-            raise TamarinError('INVALID_PROCESS_CONFIGURATION', self.name)
-        
-        if self.rootGrader:
-            try:
-                graderFiles = glob.glob(os.path.join(tamarin.GRADERS_ROOT,'*'))
-                # files only; no dirs
-                graderFiles = [gf for gf in graderFiles if os.path.isfile(gf)]
-                if not graderFiles:
-                    self.logger.error("No rootGrader files to copy.")
-                    raise TamarinError('GRADER_ERROR', self.name)
-                for gf in graderFiles:
-                        shutil.copy(gf, tamarin.GRADEZONE_ROOT)
-                self.logger.debug("Copied %d root grader file(s) "
-                                  "into gradezone.", len(graderFiles))
-            except TamarinError:
-                raise
-            except:
-                self.logger.exception('Could not copy rootGrader files')
-                raise TamarinError('GRADER_CRASH', self.name)
-
-        if self.assignmentGrader:
-            try:
-                assignLoc = os.path.join(tamarin.GRADERS_ROOT, 
-                                         args['GradeFile.assignment'])
-                if not os.path.exists(assignLoc):
-                    self.logger.error('No GRADERS/%s location to copy from.', 
-                                      args['GradeFile.assignment'])
-                    raise TamarinError('GRADER_ERROR', self.name)
-                
-                graderFiles = glob.glob(os.path.join(assignLoc,'*'))
-                if not graderFiles:
-                    self.logger.error("No assignmentGrader files to copy.")
-                    raise TamarinError('GRADER_ERROR', self.name)
-                for gf in graderFiles:
-                    #do a recursive copy of any directories
-                    if os.path.isdir(gf):
-                        # remove anything already there so copy will succeed; 
-                        # ignore errors if not there
-                        shutil.rmtree(os.path.join(tamarin.GRADEZONE_ROOT, 
-                                                   os.path.basename(gf)), True)
-                        shutil.copytree(gf,os.path.join(tamarin.GRADEZONE_ROOT,
-                                                   os.path.basename(gf)), True)
-                    else:
-                        shutil.copy(gf, tamarin.GRADEZONE_ROOT)
-                self.logger.debug("Copied %d assignment grader file(s) "
-                                  "into gradezone.", len(graderFiles))
-            except TamarinError:
-                raise
-            except:
-                self.logger.exception('Could not copy assignmentGrader files')
-                raise TamarinError('GRADER_CRASH', self.name)
-        
-        return True
-
-class DisplayFiles(Process):
-    """
-    Displays the contents of the given glob of text files.
-    
-    A text file submission is automatically shown by Tamarin, so this process 
-    is only necessary when you want to show the contents of unzipped files.
-    Will search gradezone for the given list of file globs, displaying each
-    file found using a "preformatted" display format.
-    
-    Adds (as a list) the set of actual filenames (relative to GRADEZONE)
-    to args['DisplayFiles.filenames'] 
-    
-    """
-    # FUTURE: Loop through SUBMISSION_TYPEs to look at file exts to determine
-    # formatting?  Neither looking at type keys or looping through possible
-    # duplicates is entirely satisfactory.
-    #
-    # FUTURE: Flag for recursive file printing.
-    #    
-    def __init__(self, *globs, required=False, displayName="Displaying files"):
-        super().__init__(required, displayName)
-        self.grade = 'OK'
-        self.globs = globs
-        
-    def run(self, args):
-        """ 
-        Adds each glob-matching file name to output.
-        If at least one found, grade is OK (returns True), 
-        else X (returns False: no files displayed).
-        """
-        import tamarin
-        files = set()
-        self.output = ''
-        
-        for g in self.globs:
-            batch = glob.glob(os.path.join(tamarin.GRADEZONE_ROOT, g))
-            for file in batch:
-                self.output += '<div class="file">\n'
-                fn = file.replace(tamarin.GRADEZONE_ROOT, '.')
-                files.add(fn)
-                self.output += '<h4>' + fn + '</h4>\n'
-                with open(file, 'r') as filein:
-                    content = filein.read()
-                    content = html.escape(content, quote=False)
-                    self.output += '<pre>' + content + '</pre>\n</div>\n'
-        
-        # record results
-        args['DisplayFiles.filenames'] = list(files)
-        self.logger.debug("Displayed " + str(len(files)) + " files from " + 
-                          str(self.globs))
-        if len(files) == 0:
-            self.grade = 'X'
-            self.output = None
-        return len(files) > 0
-        
-
-class JavaCompiler(Process):
-    """ 
-    Compiles the submitted file using javac. 
-    """
-    
-    def __init__(self, javacPath, required=True, displayName="Compiled",
-                 grade='OK', all=False):
-        """
-        Requires the path to the javac compiler.  If all is True, compiles
-        all .java files currently in gradezone (top level only).
-        """
-        super().__init__(required, displayName)
-        self.javac = javacPath
-        self.grade = grade
-        self.all = all
-    
-    def run(self, args):
-        """
-        Compiles the file named in args['GradeFile.file'].  It is assumed
-        that this will be a .java file.
-        
-        Returns True and leaves self.grade as set in the constructor 
-        if the file compiled.  Otherwise, sets self.grade to 0 if it was a 
-        number or to 'X' if it wasn't and returns False.
-        
-        Also sets 'JavaCompiler.compiled' to True or False.
-        """
-        # Future: Allow a compile *.java somehow?  
-        # And maybe support packages someday?
-        import tamarin
-        from core_type import TamarinError
-        if self.all:
-            cmd = self.javac + ' ' + '*.java'
-        else:
-            cmd = self.javac + ' ' + args['GradeFile.filename']
-        try:
-            compiler = subprocess.Popen(cmd,
-                                        stdout=subprocess.PIPE, 
-                                        stderr=subprocess.STDOUT,
-                                        cwd=tamarin.GRADEZONE_ROOT,
-                                        universal_newlines=True,
-                                        shell=True) # to expand *.java on linux
-            #only need stdout of (stdout, stderr)
-            self.output = compiler.communicate()[0]  # may just be warnings
-        except:
-            self.logger.exception("Couldn't spawn javac process")
-            raise TamarinError('GRADER_ERROR', self.name)
-
-        if self.all:
-            javas = glob.glob(os.path.join(tamarin.GRADEZONE_ROOT, '*.java'))
-            args['JavaCompiler.compiled'] = True
-            for file in javas:
-                # XXX: Breaks if have a different non-public class in .java
-                if not os.path.exists(file.replace('.java', '.class')):
-                    args['JavaCompiler.compiled'] = False
-                    self.grade = 'X' if isinstance(self.grade, str) else 0 
-                    self.logger.debug("%s did not compile", 
-                                      os.path.basename(file))
-                    return False
-            return True        
-        else:
-            compiled = args['GradeFile.filename'].replace('.java', '.class')
-            if os.path.exists(os.path.join(tamarin.GRADEZONE_ROOT, compiled)):
-                self.logger.debug("Compiled %s", args['GradeFile.filename'])
-                args['JavaCompiler.compiled'] = True
-                return True
-
-        # did not compile    
-        self.grade = 'X' if isinstance(self.grade, str) else 0 
-        self.logger.debug("%s did not compile", args['GradeFile.filename'])
-        args['JavaCompiler.compiled'] = False
-        return False
-
-
-class JavaGrader(Process):
-    """ 
-    Invokes the assignment-specific TamaringGrader.java-based grader.
-    Assumes the grader is already compiled and named XXGrader.class,
-    where XX is the assignment name.  The grader will also need the
-    .class files generated by TamarinGrader.java. (These can often
-    be stored in the GRADERS_ROOT directory.)
-    """
-    
-    def __init__(self, javaPath, required=True, displayName="Tamarin grader"):
-        """
-        Requires the path to the java executable.
-        """
-        super().__init__(required, displayName)
-        self.java = javaPath
-        
-    def run(self, args):
-        """
-        Requires args['GradeFile.filename'], args['GradeFile.assignment'],
-        and args['JavaCompiler.compiled'].  
-        """
-        import tamarin
-        from core_type import TamarinError
-        
-        self.logger.debug("Grading %s with %sGrader", 
-                          args['GradeFile.filename'], 
-                          args['GradeFile.assignment'])
-        graderName = args['GradeFile.assignment'] + 'Grader'
-        if not os.path.exists(os.path.join(tamarin.GRADEZONE_ROOT, 
-                                           graderName + '.class')):
-            raise TamarinError('GRADER_ERROR', 
-                               graderName + ".class is not in the gradezone.")
-        try:            
-            compiled = 1 if args['JavaCompiler.compiled'] else 0
-            subfile = args['GradeFile.filename']
-            cmd = (self.java, graderName, subfile, str(compiled))
-            grader = subprocess.Popen(cmd, 
-                                      stdout=subprocess.PIPE, 
-                                      stderr=subprocess.PIPE,
-                                      cwd=tamarin.GRADEZONE_ROOT,
-                                      universal_newlines=True)
-            (self.output, stderr) = grader.communicate()
-        except:
-            self.logger.exception("Couldn't spawn Java grader process")
-            raise TamarinError('GRADER_ERROR', self.name)
-          
-        #make sure grader returned something
-        try:
-            self.grade = float(stderr)
-            return True
-        except ValueError:
-            if self.output:
-                self.output += '\n\n'
-            else:
-                self.output = ''
-            self.output += 'GRADER_ERROR: The Tamarin grader did not '
-            self.output += 'return a valid grade on stderr.\n'
-            self.output += 'Instead, its dying words were: \n'
-            self.output += str(stderr) + '\n'
-            self.grade = 'ERR'
-            return False
-
-class Unzip(Process):
-    """
-    Unzips the file specified by args['GradeFile.path'] in the gradezone.
-    """
-    
-    def __init__(self, required=False, displayName="Unzipping files"):
-        super().__init__(required, displayName)
-        self.grade = 'OK'
-        
-    def run(self, args):
-        """
-        Unzips the file. Is careful to prevent any absolute paths or symlinks 
-        that would allow for  extraction of files to outside the gradezone.  
-        If any of such files exist, they are reported to stdout and simply 
-        skipped.  If any files are skipped or if no files are unzipped, will
-        return False as per a failure.  However, this process is not required
-        by default, so grading will likely try to continue.
-    
-        Prints a list of all unzipped and skipped files. Also stores that list 
-        of extracted files into args['Unzip.extracted'].
-        """
-        import tamarin
-        zf = zipfile.ZipFile(args['GradeFile.path'], 'r')
-        if not zf.namelist():
-            self.output = '[No files found in zipped archive.]\n'
-            self.grade = 'X'
-        else:
-            self.output = ''
-        safe = self.validMembers(zf.namelist())
-        try:
-            zf.extractall(path=tamarin.GRADEZONE_ROOT, members=safe)
-            args['Unzip.extracted'] = safe
-            self.logger.debug('Unzipped ' + str(len(safe)) + ' of ' +
-                                        str(len(zf.namelist())) + ' files')
-        except IOError as e:
-            self.output += ('...\nABORTING: Could not correctly extract '
-                            'one of the files.\n')
-            self.output += ('This is probably due to the zipped file '
-                'being corrupted or containing a symlink.\n')
-            self.logger.warn('Unzip ' + args['GradeFile.filename'] + ' aborted'
-                             ' with: ' + str(e))
-            self.logger.debug('If GRADZONE permissions are correct, error is '
-                              'likely due to a symlink/error in zip file.')
-            self.grade = 'X'
-            return False
-        finally:
-            zf.close()
-        # problem/False if no files or if we skipped on
-        if len(safe) == 0 or len(safe) != len(zf.namelist()):
-            self.grade = 'X'
-            return False
-        else:
-            return True
-        
-
-    def validMembers(self, members):
-        # thanks in part to: http://stackoverflow.com/questions/10060069/
-        safe = []
-        base = os.path.realpath(os.path.abspath('.'))
-        for m in members:
-            self.output += m
-            extracting = os.path.join(base, m)
-            extracting = os.path.realpath(os.path.abspath(extracting))
-            if not extracting.startswith(base):
-                #would extract to other dir
-                self.output += ' [SKIPPED: Would extract to outside of ' +\
-                    'gradezone.]\n'
-            else:
-                self.output += '\n'
-                safe.append(m)
-        return safe
-
-
-class VerifyMainFile(Process):
-    """
-    Verifies--usually after an Unzip--that a given main file exists in the
-    gradezone.  If it does exit, replaces args['GradeFile.filename'] with the
-    new name.  Note that this leaves all other GradeFile arguments untouched!
-    
-    The nameTemplate can include any '{$Something.other}', for which replacment
-    values will be pulled from args when run.  Most commonly useful will 
-    probably be ${GradeFile.user}, etc.  (A special version of string.Template 
-    is used to include dots in the identifiers, excluding the first character.)
-    
-    """
-    
-    def __init__(self, nameTemplate, required=True, 
-                 displayName="Verifying main file"):
-        super().__init__(required, displayName)
-        self.grade = 'OK'
-        self.name = nameTemplate
-        
-    def run(self, args): 
-        import tamarin
-        import string
-        
-        class Temp(string.Template):
-            idpattern = '[_a-z][_a-z0-9.]*'
-        template = Temp(self.name)
-        
-        try:
-            mainfile = template.substitute(args)
-        except KeyError as e:
-            self.logger.error("While producing template: %s", e)
-            raise
-        
-        if os.path.exists(os.path.join(tamarin.GRADEZONE_ROOT, mainfile)):
-            self.logger.info("Found %s", mainfile)
-            args['GradeFile.filename'] = mainfile
-            self.grade = 'OK'
-            return True
-        else:
-            self.logger.warn("Did not find %s", mainfile)
-            self.output = "Did not find required main file: " + mainfile 
-            self.grade = 'X'
-            return False
+
+## core_grade.py
+
+"""
+Defines gradepipe grading processes.
+
+Contains the Process class, which defines a single step to be executed
+during a gradepipe session.  This superclass defines the interface for all
+other specific processes to implement.
+
+Also contains all specific processes implemented so far.
+
+Part of Tamarin, by Zach Tomaszewski.  
+Created: 14 Jul 2012.
+"""
+
+import copy
+import datetime
+import glob
+import hashlib
+import html
+import json
+import logging
+import re
+import os
+import shutil
+import subprocess
+import threading
+import time
+import zipfile
+
+# can't import tamarin here due to circular dependency; imported in methods
+#from core_type import TamarinErrror 
+
+class Process:
+    """
+    A Process simplifies the work of executing a step in the grading flow.
+    It is possible to execute Python code or invoke an external tool.
+    Any Process subclass has access to a common logger.
+    
+    See method documentation for further details.  Also, see GradeFile for
+    an example of how the variables and methods of a Process are often used.
+    
+    The staging class variable marks Process classes that only prepare files
+    in the gradezone.  When tamarin.GRADEPIPE_PREFETCH is True, a copy of
+    each staging process at the start of a SubmissionType's process list 
+    may be run on the next submission in a different gradezone while the 
+    current submission is still being graded.  A staging process must 
+    therefore only work within args['GradeFile.zone'].
+          
+    """
+    staging = False
+    
+    def __init__(self, required=True, displayName=None):
+        """
+        Initializes this Process.  Subclasses may add additional required
+        parameters, but should always invoke this superclass constructor. 
+        
+        Sets up these public instance variables:
+        * required (from parameter)
+        * name (name of the constructing subclass)
+        * displayName (from parameter, if given; else name)
+        * grade (None)
+        * output (None)
+        * logger
+        
+        self.required (taken from the parameter) specifies whether this 
+        process must pass its run before carrying on to the next one in the 
+        current grading sequence. That is, if this process fails to pass its
+        run, should this abort the rest of the grading sequence for this 
+        submitted file? 
+        
+        self.grade is the grade resulting from the run of this process.  
+        The value must match the format of tamarin.GRADE_RE, which means 
+        a float or 'OK' or 'X' (or 'ERR').  If left as None, grading 
+        is not relevant to this process.  (For example, the process might
+        be only informational or simply involve copying files around in
+        preparation for another process.) 
+        
+        self.output is any content that should be displayed to the student
+        in the generated grader output file.  
+        
+        self.name is the most-specific class name of this Process.
+        
+        self.displayName is a longer or more coherent name shown in grader 
+        output to the student.  Defaults to self.name if not given.
+        
+        self.logger is the logger specific to the particular Process class
+        and can be used to record information that would be useful in 
+        debugging or when monitoring the process.  See the Python logging
+        module for more information.  Logged data does NOT go into output
+        passed on to the student.  
+        
+        """
+        self.required = required
+        self.name = type(self).__name__
+        self.displayName = displayName if displayName else self.name
+        self.grade = None
+        self.output = None
+        self.logger = logging.getLogger('Process.' + self.name)
+
+    def run(self, args):
+        """
+        Executes this Process.
+        
+        Passes in a dict as args.  This dictionary is shared by all Processes
+        in a grading sequence, so every Process should document what keys it
+        requires and what changes it might make.  This mechanism allows 
+        different processes to recording important information (such as 
+        return codes, etc.) for other later processes to access.  To avoid
+        unexpected name clashes, every Process should prefix its class name 
+        to any keys it uses.  For example, if a GradeFile process wants to add
+        a 'filename key, it should instead add 'GradeFile.filename'. 
+            
+        This method should then return either True or False.  If True, the
+        run sufficiently accomplished its goals.  If False, the run failed to 
+        achieve what was required of either it or the submitted work.  
+        For example, a Compile process would return False if the files did 
+        not actually compile.
+        
+        For errors in the process itself, an exception--preferably a
+        TamarinError--should be thrown.
+        
+        The difference between a run failure (returning False) and an error
+        (throwing an exception) is that failure will still result in grade
+        and output being reported to the student.  Also, if the process was not
+        required, the gradepipe will try to continue with the next Process.  
+        On the other hand, an error means the Process itself crashed, which 
+        will halt the gradepipe for the current file and be reported as a 
+        Tamarin-level error.
+        
+        This run(args) method must be overridden in any implementing subclass.
+        """
+        pass
+
+
+class GradePipe(Process):
+    """
+    Not intended for direct use by Tamarin users or admins.
+    Thus, it should not be included in the process list for a SubmissionType.
+        
+    GradePipe is something of a "meta process".  It is normally started 
+    when gradepipe.py is executed.               
+    
+    """
+    def __init__(self, required=True, fileControlled=True, 
+                 logLevel='INFO', gradeOnly=None, prewarm=False):
+        """
+        If fileControlled is True, this GradePipe will respect the files
+        set in tamarin.py on whether or not it should run.  That is, it
+        will abort if another GrapePipe is running (tamarin.GRADEPIPE_ACTIVE)
+        or disabled (tamarin.GRADEPIPE_DISABLED).  If False, it will always
+        run.
+        
+        logLevel controls the level of logging.  Should be one of the 
+        standard levels from Python's logging module.  'DEBUG' is basically
+        'verbose' mode. 
+        
+        If gradeOnly is given, will grade only those submitted files 
+        whose basenames includes the given substring.
+        
+        If prewarm is True, this GradePipe will get ready for any upcoming
+        deadlines and then keep running until they are past (see Prewarm).
+        
+        """
+        super().__init__(required)
+        self.fileControlled = fileControlled
+        self.logLevel = logLevel
+        self.gradeOnly = gradeOnly
+        self.prewarm = prewarm
+    
+    def run(self, args=None):
+        """
+        Grades all files in tamarin.SUBMITTED_ROOT.
+        
+        Will abort with False if fileControlled and a file state indicates
+        it should not run.  
+        
+        If running, sets up logging for all sub-processes.  Will then loop
+        through all submitted files, running GradeFile on each one, and return
+        True.
+
+        Before grading the first file for an assignment, runs a Preflight on
+        that assignment.  If the queue is at least QUICK_PHASE_QUEUE_LENGTH
+        long, first gives each file of a two-phase SubmissionType a
+        provisional grading before fully grading any of them.
+        
+        If tamarin.GRADEPIPE_BATCH_WINDOW is set, files for the same 
+        assignment are batched together (see getNextInBatch) so that each
+        can reuse the grader files staged in the gradezone for the last.
+        
+        If tamarin.GRADEPIPE_PREFETCH is True, the next file is staged in the
+        other gradezone (see GradeFile.stage) while each file is graded.
+        
+        If prewarming, runs a Prewarm first.  Then, while any deadline is 
+        near, waits for more submissions rather than stopping when the
+        queue is empty.
+        
+        Whenever the queue is empty, does any GRADEPIPE_MAINTENANCE (see
+        Maintenance) still left to do, stopping as soon as a new file 
+        arrives to be graded.
+        """
+        import tamarin
+        
+        if not args:
+            args = dict()
+                
+        # set up top-level Process logger in order to capture all logging
+        topLogger = logging.getLogger('Process')
+        handler = logging.StreamHandler()
+        formatter = logging.Formatter(fmt='{name}-{levelname}: {message}', 
+                                      style='{')
+        handler.setFormatter(formatter)
+        topLogger.addHandler(handler)
+        topLogger.setLevel(self.logLevel)
+        
+        # make sure we should even run.
+        if self.fileControlled:            
+            if os.path.exists(tamarin.GRADEPIPE_DISABLED):
+                self.logger.warn("GRADEPIPE_DISABLED file exists. Quitting...")
+                return False
+            elif os.path.exists(tamarin.GRADEPIPE_ACTIVE):
+                self.logger.warn("GRADEPIPE_ACTIVE file exits. Quitting...")
+                return False
+            
+        # dump PID into file
+        try:
+            self.logger.info("Started at %s.", datetime.datetime.now())
+            with open(tamarin.GRADEPIPE_ACTIVE, 'w') as outfile:
+                outfile.write(str(os.getpid()))
+            self.logger.debug("Wrote PID %d to ACTIVE file.", os.getpid())
+        except IOError:
+            self.logger.exception("Could not dump PID to file.")    
+            return False
+
+        # grading loop
+        try:
+            #loop over submitted files as long as there are more to grade
+            gradedCount = 0
+            failedCount = 0
+            badFiles = []
+            blocked = set()  # assignments that failed their preflight
+            quickTried = set()
+            quickCount = 0
+            gf = GradeFile()
+            quickGf = GradeFile(provisional=True)
+            preflight = Preflight()
+            lastAssignment = None
+            skipped = {}  # file -> times passed over by batching
+            reorderedCount = 0
+            reusedCount = CopyGrader.reusedCount
+            reusedBytes = CopyGrader.reusedBytes
+            zones = [tamarin.GRADEZONE_ROOT]
+            if tamarin.GRADEPIPE_PREFETCH:
+                zones.append(tamarin.GRADEZONE_PREFETCH_ROOT)
+                os.makedirs(tamarin.GRADEZONE_PREFETCH_ROOT, exist_ok=True)
+            stager = GradeFile()
+            prefetch = None  # (file, zone, thread, result) being staged
+            prefetchedCount = 0
+            maintenance = Maintenance()
+            prewarm = Prewarm() if self.prewarm else None
+            if prewarm:
+                prewarm.run(args)
+
+            def getQueue():
+                """ Returns the submitted files still to be graded. """
+                return [f for f in 
+                        tamarin.getSubmittedFilenames(self.gradeOnly) 
+                        if f not in badFiles and 
+                        self.getAssignmentName(f) not in blocked]
+
+            while True:
+                # any staging must be done before the zones are touched again
+                if prefetch:
+                    prefetch[2].join()
+                
+                # get most recent list 
+                submitted = getQueue()
+
+                if not submitted: 
+                    if not maintenance.run(args, getQueue):
+                        continue  # a new file arrived
+                    if prewarm and self.keepWaiting(prewarm, args):
+                        blocked.clear()  # graders may have been fixed
+                        continue
+                    break
+                
+                # under load, give quick feedback on everything first
+                nextFile = submitted[0]
+                quick = False
+                if len(submitted) >= tamarin.QUICK_PHASE_QUEUE_LENGTH:
+                    pending = self.getQuickPhasePending(submitted)
+                    pending = [f for f in pending if f not in quickTried]
+                    if pending:
+                        nextFile = pending[0]
+                        quick = True
+                
+                # otherwise, stick with the same assignment where possible
+                if not quick and tamarin.GRADEPIPE_BATCH_WINDOW:
+                    nextFile = self.getNextInBatch(submitted, lastAssignment,
+                                                   skipped)
+                    if nextFile != submitted[0]:
+                        reorderedCount += 1
+                
+                # use any staging already done for this file 
+                staged = None
+                zone = zones[0]
+                if prefetch and prefetch[0] == nextFile and not quick and \
+                        prefetch[3] and prefetch[3][0]:
+                    staged = prefetch[3][0]
+                    zone = prefetch[1]
+                prefetch = None
+                spareZone = zones[-1] if zone == zones[0] else zones[0]
+                # preflight must not disturb what is already staged
+                args['GradeFile.zone'] = spareZone if staged else zone
+                
+                # make sure the graders work before grading any students
+                assignName = self.getAssignmentName(nextFile)
+                try:
+                    cleared = not assignName or preflight.run(args, 
+                                                              assignName)
+                except Exception:
+                    # such as an invalid assignment; affects only its files
+                    self.logger.exception("%s - could not run its "
+                                          "preflight.", assignName)
+                    cleared = False
+                if not cleared:
+                    self.logger.error("%s failed its preflight, so leaving "
+                                      "its submissions in the queue.", 
+                                      assignName)
+                    blocked.add(assignName)
+                    continue
+                
+                if quick:
+                    quickTried.add(nextFile)
+                    quickGf.run(args, os.path.basename(nextFile))
+                    quickCount += 1
+                    continue
+                
+                # stage the likely next file in the other zone meanwhile
+                following = self.predictNext(submitted, nextFile, assignName,
+                                             skipped)
+                if len(zones) > 1 and following:
+                    result = []
+                    thread = threading.Thread(target=lambda: result.append(
+                                stager.stage(args, os.path.basename(following),
+                                             spareZone)))
+                    thread.start()
+                    prefetch = (following, spareZone, thread, result)
+                        
+                if staged:
+                    prefetchedCount += 1
+                success = gf.run(args, os.path.basename(nextFile), staged)
+                lastAssignment = assignName
+                if success:
+                    gradedCount += 1
+                else:
+                    failedCount += 1
+                    if tamarin.LEAVE_PROBLEM_FILES_IN_SUBMITTED:
+                        badFiles.append(nextFile)
+    
+            # done looping
+            self.logger.info("%d of %d files successfully graded.", 
+                             gradedCount, gradedCount + failedCount)
+            if quickCount:
+                self.logger.info("%d files given a quick provisional check "
+                                 "first.", quickCount)
+            if tamarin.GRADEPIPE_BATCH_WINDOW:
+                self.logger.info("%d files graded early to batch them by "
+                                 "assignment; %d staged grader files "
+                                 "(%.1f KB) reused rather than copied.",
+                                 reorderedCount, 
+                                 CopyGrader.reusedCount - reusedCount,
+                                 (CopyGrader.reusedBytes - reusedBytes) / 1024)
+            if tamarin.GRADEPIPE_PREFETCH:
+                self.logger.info("%d files staged while the previous file "
+                                 "was graded.", prefetchedCount)
+        except:
+            self.logger.exception("Crashed unexpectedly!")
+            if prefetch:
+                prefetch[2].join()
+
+        # cleanup PID file 
+        try:
+            os.remove(tamarin.GRADEPIPE_ACTIVE)
+            self.logger.debug("Removed PID %d's ACTIVE file.", os.getpid())      
+        except:
+            self.logger.exception("Could not clean up ACTIVE/PID file.")
+        
+        self.logger.info("Stopped at %s", datetime.datetime.now())
+        return True    
+
+    def keepWaiting(self, prewarm, args):
+        """
+        Called by a prewarming GradePipe when the queue is empty.  If a
+        deadline is still near (and the gradepipe has not been disabled),
+        gets ready for any newly upcoming deadlines, waits 
+        PREWARM_POLL_SECONDS, and returns True.  Otherwise, returns False.
+        """
+        import tamarin
+        if self.fileControlled and os.path.exists(tamarin.GRADEPIPE_DISABLED):
+            self.logger.warn("GRADEPIPE_DISABLED file exists. Quitting...")
+            return False
+        if not prewarm.run(args):
+            self.logger.info("No deadlines near, so no longer waiting for "
+                             "submissions.")
+            return False
+        time.sleep(tamarin.PREWARM_POLL_SECONDS)
+        return True
+
+    def getAssignmentName(self, submittedPath):
+        """
+        Returns the assignment name embedded in the given submitted file's
+        name, or None if the filename is not a valid submitted filename.
+        """
+        import tamarin
+        match = re.match(tamarin.SUBMITTED_RE, os.path.basename(submittedPath))
+        return match.group(2) if match else None
+
+    def getNextInBatch(self, submitted, lastAssignment, skipped):
+        """
+        Returns the next file to fully grade from the given list of submitted
+        file paths.  This is the first file among the first 
+        GRADEPIPE_BATCH_WINDOW files that is for lastAssignment, the 
+        assignment just graded.  If there is no such file--or if the file at
+        the head of the list has already been passed over 
+        GRADEPIPE_BATCH_WINDOW times--returns the head of the list instead.
+        
+        skipped is a dict of file paths to the number of times each has been
+        passed over so far, which this method updates.
+        """
+        import tamarin
+        
+        head = submitted[0]
+        window = tamarin.GRADEPIPE_BATCH_WINDOW
+        if lastAssignment and skipped.get(head, 0) < window:
+            for f in submitted[:window]:
+                if self.getAssignmentName(f) == lastAssignment:
+                    if f != head:
+                        skipped[head] = skipped.get(head, 0) + 1
+                    return f
+        skipped.pop(head, None)
+        return head
+
+    def predictNext(self, submitted, current, currentAssignment, skipped):
+        """
+        Given the list of submitted file paths from which current is about
+        to be graded, returns the file most likely to be fully graded after
+        it, or None if there are no others.  (The prediction may be wrong
+        if new files arrive or a quick phase or preflight intervenes.)
+        """
+        import tamarin
+        remaining = [f for f in submitted if f != current]
+        if not remaining:
+            return None
+        if tamarin.GRADEPIPE_BATCH_WINDOW:
+            return self.getNextInBatch(remaining, currentAssignment, 
+                                       dict(skipped))
+        return remaining[0]
+
+    def getQuickPhasePending(self, submitted):
+        """
+        Given a list of submitted file paths, returns those whose assignment
+        has a two-phase SubmissionType but that do not yet have a provisional
+        grader output file in PROVISIONAL_ROOT.  Order is preserved.
+        """
+        import tamarin
+        from core_type import getAssignment, TamarinError
+        
+        # grader output filenames, minus the grade and any -HC flags
+        checked = set()
+        if os.path.isdir(tamarin.PROVISIONAL_ROOT):
+            for fn in os.listdir(tamarin.PROVISIONAL_ROOT):
+                match = re.match(tamarin.GRADED_RE, fn)
+                if match:
+                    checked.add(match.group(1) + match.group(2) + '-' + 
+                                match.group(3))
+        
+        pending = []
+        quickTypes = {}  # assignment name -> has quickProcesses?
+        for f in submitted:
+            match = re.match(tamarin.SUBMITTED_RE, os.path.basename(f))
+            if not match:
+                continue
+            assignName = match.group(2)
+            if assignName not in quickTypes:
+                try:
+                    assignment = getAssignment(assignName)
+                    quickTypes[assignName] = bool(
+                                        assignment.type.quickProcesses)
+                except TamarinError:
+                    # let full grading report the problem
+                    quickTypes[assignName] = False
+            stem = match.group(1) + assignName + '-' + match.group(3)
+            if quickTypes[assignName] and stem not in checked:
+                pending.append(f)
+        return pending
+
+
+class GradeFile(Process):
+    """
+    Not intended for direct use by Tamarin users or admins.
+    Thus, it should not be included in the process list for a SubmissionType.
+        
+    GradeFile deals with the task of grading a single submitted file.  It sets
+    up the gradezone, calls the appropriate processes for that file type, 
+    records the results into a grader output file, and them moves the file
+    into the graded directory (depending on the value of 
+    tamarin.LEAVE_PROBLEM_FILES_IN_SUBMITTED).                
+    
+    A provisional GradeFile instead runs only the quickProcesses of a 
+    two-phase SubmissionType.  It records its results into PROVISIONAL_ROOT
+    and leaves the file in SUBMITTED_ROOT to be fully graded later.  
+    
+    """    
+    def __init__(self, required=False, provisional=False):
+        """
+        Failing to grade one file doesn't mean we can't try the next one.
+        """
+        super().__init__(required)
+        self.provisional = provisional
+
+    def run(self, args, filenameInSubmitted=None, staged=None):
+        """
+        Grades the given submitted file.
+        
+        The given filename must be located in SUBMITTED_ROOT.  If this 
+        convenience argument is omitted, will look in 
+        args['GradeFile.filenameInSubmitted'] instead.  If that is missing too,
+        will raise a ValueError. 
+        
+        args must be a valid dictionary, though it can be empty.  The passed
+        args value will be unaffected.  That is, each GradeFile subprocess
+        will receive a fresh/reset copy of the passed args.  
+        
+        If given, staged is what stage returned for this file, in which case
+        the file is graded in the zone where it was staged.
+        
+        Sets the following args fields:
+        * GradeFile.filenameInSubmitted - timestamped filename in SUBMITTED
+        * GradeFile.filename - name of original submission, now GRADEZONE
+        * GradeFile.name - everything up to first .
+        * GradeFile.ext - everything after first .
+        * GradeFile.path - full path to file's GRADEZONE location
+        * GradeFile.username - username as appears in filename
+        * GradeFile.user - username, but all lowercase
+        * GradeFile.assignment - for which this file was submitted
+        * GradeFile.zone - gradezone directory to use (default: GRADEZONE_ROOT)
+        
+        Clears the gradezone and copies the submitted file (under its 
+        original, non-timestamped name) into the zone.  Then opens a grader 
+        output file and runs all process appropriate for that assignment's 
+        type.  The output is written under a hidden temporary name and only 
+        renamed into place (replacing any old grader output) once grading
+        is done, while holding the submission's lock (see 
+        core_storage.lockSubmission).
+
+        The grader output file starts with <div class="grader">.
+        
+        Then, for each process, records any grade or output if either is not 
+        None. If recording, the process gets its own <div class="graderName">
+        section were Name is the process's class name.  
+        
+        The grade will then be recorded as 
+        <p><span class="displayName">display name:</span> grade</p>.
+        If there is no grade, the rest of the line still gets printed
+        in order to identify the output. 
+        
+        Any output will then follow.  If the first character is a '<',
+        it is assumed that the output is appropriately HTML-formatted. 
+        If not, it will be HTML-escaped and displayed in a <pre> format.  
+        In this case, it is recommended to keep lines to fewer than 80 
+        chars long.  
+        
+        Finally, the current process's div will be closed with a </div>.  
+        
+        Whether a process's run passes or fails does not affect output.
+        It simply determines whether or not the next process should be 
+        invoked.  So, if a Process is going to fail and wants the student
+        to know why, it should document it somehow in its self.output.
+        
+        After running all processes, the overall grade is stored in a 
+        'GRADE_START_TAG grade GRADE_END_TAG' line (without the spaces).  
+        If any grade is 'ERR', the final grade is 'ERR'.  Otherwise, if at 
+        least one grade was a number, the grade is the sum of all numerical 
+        grades.  If none were numbers, the grade is 'OK', unless there was 
+        at least one 'X'.  This means the grade is 'OK' if there were no 
+        processes that returned a grade.
+        
+        Finally, the grader output file ends with another </div>. 
+        
+        The same results are also saved as JSON in a result sidecar file 
+        (see getResultPath and SubmittedFile.loadResult) next to the grader
+        output, so that they can be read without parsing the HTML.  This
+        is a dict of:
+        
+        * grade - the final grade (before any later changes by a human)
+        * passed - whether grading passed, as returned by this method
+        * provisional - whether these are only provisional results
+        * processes - a list of dicts, one for each Process run, of its
+            name, displayName, grade, passed, and duration (in seconds, or 
+            None if run earlier by stage), and the start and end offsets of 
+            its section of the grader output (None if it had no section)
+        * gradeStart, gradeEnd - the offsets of the final grade line
+        * highlighted - True, since the output is already highlighted (see
+            runProcesses), unlike that of older versions of Tamarin
+        
+        Offsets are byte positions in the (uncompressed) grader output.
+         
+        """
+        import tamarin
+        import core_index
+        import core_journal
+        import core_storage
+        from core_type import TamarinError, getAssignment, SubmittedFile
+        from core_type import GradedFile
+        
+        args = dict(args)  # don't want to mangle version passed to each run 
+                
+        # check args
+        if 'GradeFile.filenameInSubmitted' not in args:
+            args['GradeFile.filenameInSubmitted'] = filenameInSubmitted
+        if not args['GradeFile.filenameInSubmitted']:
+            raise ValueError("'GradeFile.filenameInSubmitted' not provided.")
+        fInS = args['GradeFile.filenameInSubmitted']
+
+        try: 
+            # check filename exists and grab details
+            self.logger.debug("%s - started grading...", fInS)
+            submitted = SubmittedFile(fInS)
+            assignment = getAssignment(submitted.assignment)
+            if self.provisional:
+                processes = assignment.type.quickProcesses
+                outDir = tamarin.PROVISIONAL_ROOT
+                os.makedirs(outDir, exist_ok=True)
+            else:
+                processes = assignment.type.processes
+                outDir = assignment.getUserDir(submitted.username)
+                os.makedirs(outDir, exist_ok=True)
+
+            if staged:
+                # already done, including any leading staging processes
+                args.update(staged['args'])
+                done = staged['done']
+                self.logger.debug("%s already staged in %s.", 
+                                  args['GradeFile.filename'], 
+                                  args['GradeFile.zone'])
+            else:
+                # save details into args for other sub-processes to use
+                self.prepareArgs(args, submitted.originalFilename, assignment)
+                done = ()
+                
+                # copy file into a clean gradezone
+                try:
+                    self.prepareZone(args, submitted, assignment)
+                    self.logger.debug("%s copied into a clean gradezone.", 
+                                      args['GradeFile.filename'])
+                except:
+                    raise TamarinError('UNPREPABLE_GRADEZONE')
+            
+            # open a grader output file
+            try:
+                # written under a hidden temporary name until fully graded
+                stem = submitted.filename[:-len(submitted.fileExt) - 1]
+                ext = core_storage.getGraderOutputExt()
+                outName = os.path.join(outDir, '.' + stem + '-.' + ext)
+                resultName = self.getResultPath(outDir, submitted)
+                graderOut = core_storage.openFile(outName, 'w')
+                print('<div class="grader">', file=graderOut)
+                if self.provisional:
+                    print('<p class="provisional"><i>These results are '
+                          'only from a quick check.  Your submission is '
+                          'still waiting to be fully graded.</i></p>', 
+                          file=graderOut)
+            except:
+                self.logger.exception("Could not rm old or write new results.")
+                raise TamarinError('COULD_NOT_STORE_RESULTS', outName)
+
+            results = {}
+            try:
+                grade, passed = self.runProcesses(processes, args, graderOut,
+                                                  done, results)
+            finally:
+                graderOut.close()
+
+            # done grading this file (whether successful or not)
+            if isinstance(grade, float):
+                grade = round(grade, tamarin.GRADE_PRECISION)
+            
+            # save results, replacing any old ones for this submission
+            try:                
+                with core_storage.lockSubmission(submitted.filename):
+                    old = glob.glob(os.path.join(outDir, stem + '-*.' + 
+                                    tamarin.GRADER_OUTPUT_FILE_EXT + '*'))
+                    old = [f for f in old if core_storage.matchGraderOutput(f)]
+                    newName = os.path.join(outDir, stem + '-' + str(grade) + 
+                                           '.' + ext)
+                    results = dict(results, grade=grade, passed=passed, 
+                                   provisional=self.provisional)
+                    self.writeResults(resultName, results)
+                    review = os.path.join(outDir, stem + '.' + 
+                                          tamarin.REVIEW_FILE_EXT)
+                    if old and os.path.exists(review):
+                        # earlier reviews were of the output being replaced
+                        with open(review, 'a') as fileout:
+                            fileout.write(json.dumps({'regrade': True, 
+                                'timestamp': tamarin.convertTimeToTimestamp()})
+                                + '\n')
+                    if len(old) == 1:
+                        # so that exactly one output is there throughout
+                        os.rename(old[0], newName)
+                        os.replace(outName, newName)
+                    else:
+                        os.replace(outName, newName)
+                        for file in old:
+                            if file != newName:
+                                os.remove(file)
+                    
+                    if not self.provisional and (passed or not 
+                            tamarin.LEAVE_PROBLEM_FILES_IN_SUBMITTED):
+                        newLoc = os.path.join(outDir, submitted.filename)
+                        shutil.move(submitted.path, newLoc)  
+                        graded = GradedFile(submitted.filename)
+                        core_index.recordGraded(graded)
+                        core_journal.record('regrade' if old else 'grade', 
+                                            graded)
+                        # full results now replace any provisional ones
+                        provisional = submitted.getProvisionalOutputPath()
+                        if provisional:
+                            os.remove(provisional)
+                        provisional = self.getResultPath(
+                                            tamarin.PROVISIONAL_ROOT, submitted)
+                        if os.path.exists(provisional):
+                            os.remove(provisional)
+            except:
+                self.logger.exception("Could not rename/move final results.")
+                raise TamarinError('COULD_NOT_STORE_RESULTS', outName)
+
+            # SUCCESS!
+            self.logger.info("%s -> %s%s", fInS, grade, 
+                             ' (provisional)' if self.provisional else '')
+            return passed
+
+        except TamarinError as err:
+            self.logger.error("%r", err)
+            return False
+        except:
+            self.logger.exception("Unexpected crash!")
+            return False
+
+    def prepareArgs(self, args, filename, assignment):
+        """
+        Fills in the GradeFile.* args fields (see run) for grading the given
+        original (non-timestamped) filename as a submission to the given 
+        Assignment.  The filename must match tamarin.UPLOADED_RE.
+        
+        Raises a TamarinError('GRADING_ERROR') if the file's extension 
+        does not match that required by the assignment.
+        """
+        import tamarin
+        from core_type import TamarinError
+        
+        match = re.match(tamarin.UPLOADED_RE, filename)
+        args['GradeFile.filename'] = filename
+        args['GradeFile.name'] = filename.split('.', 1)[0]
+        args['GradeFile.ext'] = filename.split('.', 1)[1]
+        args['GradeFile.username'] = match.group(1)
+        args['GradeFile.user'] = match.group(1).lower()
+        args['GradeFile.assignment'] = assignment.name
+        args.setdefault('GradeFile.zone', tamarin.GRADEZONE_ROOT)
+        args['GradeFile.path'] = os.path.join(args['GradeFile.zone'], filename)
+        
+        # sanity check (for manually uploaded files)
+        if args['GradeFile.ext'] != assignment.type.fileExt:
+            raise TamarinError('GRADING_ERROR', 
+                               "File's extension does not match that " 
+                               "required by " + assignment.name)
+
+    def prepareZone(self, args, submitted, assignment):
+        """
+        Clears args['GradeFile.zone'] and copies the given SubmittedFile into
+        it as args['GradeFile.path'].  If the gradepipe is batching by
+        assignment, any unchanged grader files staged there for the same
+        assignment are kept.
+        """
+        import tamarin
+        keep = None
+        if tamarin.GRADEPIPE_BATCH_WINDOW:
+            keep = CopyGrader.getStaged(assignment.name)
+        self.clearGradeZone(keep, args['GradeFile.zone'])
+        shutil.copy(submitted.path, args['GradeFile.path'])
+
+    def stage(self, args, filenameInSubmitted, zone):
+        """
+        Prepares the given submitted file to be graded later in the given
+        gradezone directory, usually while another file is being graded in
+        a different zone.  Copies the file into a clean zone and then runs a
+        copy of each staging Process (see Process.staging) that starts the 
+        process list of the file's SubmissionType.  
+        
+        Returns a dict to pass to run when grading this file, with the keys
+        'args' (the args so far) and 'done' (a list of (process, success, 
+        error) tuples for the processes already run).  Returns None if the
+        file could not be staged, in which case run will report why.
+        """
+        from core_type import getAssignment, SubmittedFile
+        
+        args = dict(args)
+        args['GradeFile.filenameInSubmitted'] = filenameInSubmitted
+        args['GradeFile.zone'] = zone
+        try:
+            submitted = SubmittedFile(filenameInSubmitted)
+            assignment = getAssignment(submitted.assignment)
+            self.prepareArgs(args, submitted.originalFilename, assignment)
+            self.prepareZone(args, submitted, assignment)
+        except:
+            self.logger.debug("Could not stage %s.", filenameInSubmitted, 
+                              exc_info=True)
+            return None
+        
+        done = []
+        for p in assignment.type.processes:
+            if not p.staging:
+                break
+            p = copy.copy(p)  # the original may be grading another file
+            try:
+                success = p.run(args)
+            except Exception as err:
+                done.append((p, False, err))
+                break
+            done.append((p, success, None))
+            if not success and p.required:
+                break
+        self.logger.debug("%s staged in %s.", filenameInSubmitted, zone)
+        return {'args': args, 'done': done}
+
+    def runProcesses(self, processes, args, graderOut, done=(), 
+                     results=None):
+        """
+        Runs the given processes in order on the file already copied into 
+        the gradezone, as described by args.  Records each process's 
+        results into the open graderOut file, followed by the final grade
+        line and the closing </div>.  (See run for the format used.)
+        
+        done may hold the (process, success, error) results of the first
+        few processes if they were already run by stage.  The results of
+        these copies are recorded instead of running those processes again.
+        
+        If results is given, it is a dict to fill with the details of each
+        process and the offsets of the grade line.  (See run for the format
+        used in the result sidecar.)
+        
+        Each process's output is highlighted as it is written (see 
+        core_view.highlight), so the views need not do so every time.
+        
+        Returns a (grade, passed) tuple, where passed is False if a required
+        process failed or if grading crashed.
+        """
+        import tamarin
+        import core_view
+        from core_type import TamarinError
+        
+        grades = []
+        passed = True
+        if results is None:
+            results = {}
+        results['processes'] = []
+        results['highlighted'] = True
+        try:              
+            # run all processes on the submission                
+            for i, p in enumerate(processes):
+                duration = None
+                if i < len(done):
+                    p, success, error = done[i]
+                    if error:
+                        raise error
+                else:
+                    started = time.time()
+                    success = p.run(args)                    
+                    duration = round(time.time() - started, 3)
+                details = {'name': p.name, 'displayName': p.displayName,
+                           'grade': None, 'passed': bool(success), 
+                           'duration': duration, 'start': None, 'end': None}
+                results['processes'].append(details)
+                if p.grade or p.output:
+                    details['start'] = graderOut.tell()
+                    print('<div class="' + p.name + '">', file=graderOut)
+                    print('<p><span class="displayName">' + p.displayName +
+                          ':</span>', end='', file=graderOut)
+                        
+                    # save grade summary
+                    if p.grade:
+                        if not re.match(tamarin.GRADE_RE + '$', 
+                                        str(p.grade)):
+                            raise TamarinError('INVALID_GRADE_FORMAT',
+                                               p.name + ' => "' + 
+                                               p.grade + '"')
+                        try:
+                            # convert p.grade to number it really is
+                            p.grade = round(float(p.grade), 
+                                            tamarin.GRADE_PRECISION)
+                        except ValueError:
+                            pass  # p.grade wasn't a number, so nevermind
+                        grades.append(p.grade)
+                        
+                        #print color-coded non-numeric grades
+                        if isinstance(p.grade, str):
+                            g = '<span class="'
+                            g += 'success' if p.grade == 'OK' else 'fail'
+                            g += '">' + p.grade + '</span>' 
+                        else:
+                            g = str(p.grade)
+                        print(' ' + g, end='', file=graderOut)
+                    
+                    print('</p>', file=graderOut)    
+                        
+                    # save any output, highlighted once here for all views
+                    if p.output:
+                        if p.output[0] == '<':
+                            # already formatted
+                            output = p.output
+                        else:
+                            output = '<pre>\n' + html.escape(p.output, 
+                                                        quote=False) + '</pre>'
+                        graderOut.write(core_view.highlight(output + '\n'))
+                    print('</div>', file=graderOut)
+                    details['end'] = graderOut.tell()
+                details['grade'] = p.grade or None
+                    
+                if not success and p.required:
+                    self.logger.warn("%s required but failed, so "
+                                      "aborting grading run", p.name)
+                    passed = False
+                    break
+            
+            # process grades now that we have them all
+            if any(map(lambda x: x == 'ERR', grades)):
+                grade = 'ERR' 
+            elif any(map(lambda x: isinstance(x, float), grades)):
+                grade = 0
+                for g in grades:
+                    if isinstance(g, float):
+                        grade += g
+            else:
+                grade = 'X' if 'X' in grades else 'OK'
+                            
+        except TamarinError as err:
+            self.logger.error("%r", err)
+            grade = 'ERR'
+            passed = False
+            # Future: send this through printError on way to file?
+            print('<pre>' + repr(err) + '</pre>', file=graderOut)
+        except:
+            self.logger.exception('A grading process just crashed!')
+            grade = 'ERR'
+            passed = False
+            print('<pre>TamarinError: GRADING_CRASH.</pre>', 
+                  file=graderOut)
+        finally:
+            results['gradeStart'] = graderOut.tell()
+            print(tamarin.GRADE_START_TAG + str(grade) + 
+                  tamarin.GRADE_END_TAG, file=graderOut)
+            results['gradeEnd'] = graderOut.tell()
+            print('</div>', file=graderOut)
+        return grade, passed
+
+    @staticmethod
+    def getResultPath(outDir, submitted):
+        """
+        Returns the path of the result sidecar for the given SubmittedFile
+        when its grader output is written into outDir.  This is named as 
+        the submission, but with a RESULT_FILE_EXT extension.
+        """
+        import tamarin
+        stem = submitted.filename[:-len(submitted.fileExt)]
+        return os.path.join(outDir, stem + tamarin.RESULT_FILE_EXT)
+    
+    @staticmethod
+    def writeResults(path, results):
+        """ 
+        Saves the given results dict as JSON into the given result sidecar
+        path.  Written to a temporary file first and then moved into place.
+        """
+        temp = os.path.join(os.path.dirname(path), 
+                            '.' + os.path.basename(path))
+        with open(temp, 'w') as fileout:
+            json.dump(results, fileout, separators=(',', ':'))
+        os.replace(temp, path)
+       
+    def clearGradeZone(self, keep=None, zone=None):
+        """ 
+        Recursively deletes all files and directories in the GRADEZONE, or 
+        in the given zone directory instead.
+        
+        keep may map gradezone file paths to the signature each file had
+        when staged there (see CopyGrader.getSignature).  Any such file that
+        is still unchanged is left in place to be reused.
+        """
+        from tamarin import GRADEZONE_ROOT
+        zoneFiles = glob.glob((zone or GRADEZONE_ROOT) + '/*')
+        for zf in zoneFiles:
+            #remove both directories and files
+            if os.path.isdir(zf):
+                shutil.rmtree(zf)
+            elif keep and zf in keep and \
+                    CopyGrader.getSignature(zf) == keep[zf]:
+                continue
+            else:
+                os.remove(zf)
+
+
+class Preflight(Process):
+    """
+    Not intended for direct use by Tamarin users or admins.
+    Thus, it should not be included in the process list for a SubmissionType.
+    
+    Preflight checks that an assignment's graders work before any student 
+    submissions for that assignment are graded.  It does this by grading the
+    assignment's reference solution (see tamarin.REFERENCE_SOLUTION_DIR) 
+    using all of the processes of that assignment's SubmissionType.
+    
+    The results--the grade earned, the runtime, and the peak memory used--are
+    cached in tamarin.PREFLIGHT_ROOT along with a fingerprint of the grader
+    files.  The reference solution is only graded again when that fingerprint
+    changes.
+    
+    """
+    def __init__(self, required=True):
+        super().__init__(required)
+
+    def run(self, args, assignmentName=None):
+        """
+        Returns whether the given assignment's submissions may be graded.
+        If the assignment name is omitted, will use args['GradeFile.assignment']
+        instead.
+        
+        Assignments without a reference solution always pass.  Otherwise, 
+        returns the cached result if the graders have not changed since it 
+        was computed.  If they have, grades the reference solution again 
+        (which clears the gradezone) and caches the new result.
+        
+        The reference solution passes if all of its required processes pass
+        and it earns either an OK or at least the assignment's maxScore.
+        """
+        import tamarin
+        from core_type import getAssignment
+        
+        if not assignmentName:
+            assignmentName = args['GradeFile.assignment']
+        reference = self.getReferenceSolution(assignmentName)
+        if not reference:
+            return True
+        
+        fingerprint = self.getFingerprint(assignmentName)
+        results = self.load(assignmentName)
+        if results and results['fingerprint'] == fingerprint:
+            return results['passed']
+        
+        self.logger.info("%s - grading reference solution %s...", 
+                         assignmentName, os.path.basename(reference))
+        assignment = getAssignment(assignmentName)
+        os.makedirs(tamarin.PREFLIGHT_ROOT, exist_ok=True)
+        grade, passed, seconds, memory = self.measure(assignment, reference, 
+                                                      args)
+        if isinstance(grade, str):
+            passed = passed and grade == 'OK'
+        else:
+            passed = passed and grade >= assignment.maxScore
+
+        results = {
+            'assignment': assignmentName,
+            'fingerprint': fingerprint,
+            'reference': os.path.basename(reference),
+            'grade': grade,
+            'passed': passed,
+            'seconds': round(seconds, 2),
+            'memory': memory,
+            'checked': tamarin.convertTimeToTimestamp(),
+        }
+        GradeFile.writeResults(self.getResultsPath(assignmentName), results)
+        self.logger.info("%s - reference solution -> %s (%s) in %.2fs, "
+                         "grader peak memory %s KB", assignmentName, grade, 
+                         'passed' if passed else 'FAILED', seconds, memory)
+        return passed
+
+    def measure(self, assignment, reference, args):
+        """
+        Grades the given reference solution, returning a tuple of 
+        (grade, passed, seconds, memory).  memory is the peak resident set
+        size (in KB on Linux) of the largest grader subprocess (such as a 
+        compiler or JVM) that was run, which is what each submission will 
+        need.  It is None if no subprocesses were run or if this cannot be 
+        measured on this platform.
+        
+        Where possible, grading is done in a forked child process, which
+        then reports the usage of only those subprocesses it waited for.
+        (The child itself shares the gradepipe's memory, so its own usage
+        would say more about the gradepipe than about the graders.)
+        """
+        start = time.time()
+        if not hasattr(os, 'fork'):
+            grade, passed = self.gradeReference(assignment, reference, args)
+            return grade, passed, time.time() - start, None
+        
+        readEnd, writeEnd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            # child: grade, report back through the pipe, and quit
+            try:
+                os.close(readEnd)
+                grade, passed = self.gradeReference(assignment, reference, 
+                                                    args)
+                import resource
+                usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+                with os.fdopen(writeEnd, 'w') as pipeOut:
+                    json.dump([grade, passed, usage.ru_maxrss or None], 
+                              pipeOut)
+            finally:
+                os._exit(0)
+        
+        os.close(writeEnd)
+        with os.fdopen(readEnd, 'r') as pipeIn:
+            reported = pipeIn.read()
+        os.waitpid(pid, 0)
+        seconds = time.time() - start
+        try:
+            grade, passed, memory = json.loads(reported)
+        except ValueError:
+            self.logger.error("Reference solution grading died without "
+                              "reporting a grade.")
+            grade, passed, memory = 'ERR', False, None
+        return grade, passed, seconds, memory
+
+    def gradeReference(self, assignment, reference, args):
+        """
+        Grades the reference solution at the given path in a clean gradezone,
+        writing the grader output into PREFLIGHT_ROOT.  Returns a tuple of
+        (grade, passed).
+        """
+        import tamarin
+        gf = GradeFile()
+        args = dict(args)
+        outName = os.path.join(tamarin.PREFLIGHT_ROOT, assignment.name + 
+                               '.' + tamarin.GRADER_OUTPUT_FILE_EXT)
+        try:
+            gf.prepareArgs(args, os.path.basename(reference), assignment)
+            gf.clearGradeZone(zone=args['GradeFile.zone'])
+            shutil.copy(reference, args['GradeFile.path'])
+            # so that only complete output is ever left in PREFLIGHT_ROOT
+            temp = os.path.join(tamarin.PREFLIGHT_ROOT, 
+                                '.' + os.path.basename(outName))
+            with open(temp, 'w') as graderOut:
+                print('<div class="grader">', file=graderOut)
+                graded = gf.runProcesses(assignment.type.processes, args, 
+                                         graderOut)
+            os.replace(temp, outName)
+            return graded
+        except:
+            self.logger.exception("Could not grade reference solution.")
+            return 'ERR', False
+
+    def getReferenceSolution(self, assignmentName):
+        """
+        Returns the path to the given assignment's reference solution, or 
+        None if it does not have one.
+        """
+        import tamarin
+        refDir = os.path.join(tamarin.GRADERS_ROOT, assignmentName, 
+                              tamarin.REFERENCE_SOLUTION_DIR)
+        solutions = []
+        for f in sorted(glob.glob(os.path.join(refDir, '*'))):
+            match = re.match(tamarin.UPLOADED_RE, os.path.basename(f))
+            if match and match.group(2) == assignmentName:
+                solutions.append(f)
+        if len(solutions) > 1:
+            self.logger.warn("%s has %d reference solutions; using %s.", 
+                             assignmentName, len(solutions), solutions[0])
+        return solutions[0] if solutions else None
+    
+    def getFingerprint(self, assignmentName):
+        """
+        Returns a fingerprint of everything that determines the outcome of a
+        preflight run: the assignment's directory name; the process list of
+        its SubmissionType (each process's class and settings); and the 
+        name, size, and modification time of every file in GRADERS_ROOT and
+        in the assignment's grader folder (including the reference solution).
+        
+        Raises the same TamarinErrors as getAssignment if the assignment is
+        invalid.
+        """
+        import tamarin
+        from core_type import getAssignment
+        
+        assignment = getAssignment(assignmentName)
+        details = [assignment.dir]
+        for p in assignment.type.processes:
+            # grade and output change as each file is graded
+            settings = sorted((key, repr(value)) for key, value in 
+                              vars(p).items() 
+                              if key not in ('grade', 'output', 'logger'))
+            details.append((type(p).__name__, settings))
+        files = [f for f in glob.glob(os.path.join(tamarin.GRADERS_ROOT, '*'))
+                 if os.path.isfile(f)]
+        assignLoc = os.path.join(tamarin.GRADERS_ROOT, assignmentName)
+        for dirpath, dirnames, filenames in os.walk(assignLoc):
+            files.extend(os.path.join(dirpath, fn) for fn in filenames)
+        for f in sorted(files):
+            stat = os.stat(f)
+            details.append((os.path.relpath(f, tamarin.GRADERS_ROOT), 
+                            stat.st_size, stat.st_mtime_ns))
+        return hashlib.sha1(repr(details).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def getResultsPath(assignmentName):
+        """ Returns the path of the given assignment's cached results. """
+        import tamarin
+        return os.path.join(tamarin.PREFLIGHT_ROOT, assignmentName + '.json')
+
+    @staticmethod
+    def load(assignmentName):
+        """
+        Returns the cached preflight results for the given assignment as a
+        dict (see run for the keys), or None if there are none.
+        """
+        try:
+            with open(Preflight.getResultsPath(assignmentName), 'r') as infile:
+                return json.load(infile)
+        except (IOError, ValueError):
+            return None
+
+
+class Prewarm(Process):
+    """
+    Not intended for direct use by Tamarin users or admins.
+    Thus, it should not be included in the process list for a SubmissionType.
+    
+    Prewarm gets the gradepipe ready for the surge of submissions that
+    arrives just before an assignment's deadline.  An assignment is 
+    "surging" from PREWARM_LEAD_MINUTES before its deadline until 
+    PREWARM_LINGER_MINUTES after it.  
+    
+    """
+    def __init__(self, required=False):
+        super().__init__(required)
+        self.warmed = set()
+
+    def run(self, args=None):
+        """
+        Gets ready for every surging assignment that has not been readied by
+        this Prewarm already.  This means running a Preflight, which grades
+        the reference solution if the graders have changed, and then reading
+        in every grader file so that it is in the OS's file cache when 
+        CopyGrader needs it.
+        
+        Returns a list of the names of all surging assignments, which will be
+        empty if no deadline is near.
+        """
+        import tamarin
+        if args is None:
+            args = dict()
+        
+        surging = self.getSurging()
+        for name in surging:
+            if name in self.warmed:
+                continue
+            self.warmed.add(name)
+            self.logger.info("%s - due soon, so getting ready.", name)
+            if not Preflight().run(dict(args), name):
+                self.logger.error("%s failed its preflight!", name)
+            
+            count = 0
+            for graderDir in (tamarin.GRADERS_ROOT, 
+                              os.path.join(tamarin.GRADERS_ROOT, name)):
+                for dirpath, dirnames, filenames in os.walk(graderDir):
+                    if dirpath == tamarin.GRADERS_ROOT:
+                        dirnames[:] = []  # other assignments' graders
+                    for fn in filenames:
+                        with open(os.path.join(dirpath, fn), 'rb') as infile:
+                            while infile.read(65536):
+                                pass
+                        count += 1
+            self.logger.debug("%s - read %d grader files.", name, count)
+        return surging
+
+    def getSurging(self, now=None):
+        """
+        Returns a list of the names of the assignments whose deadlines are 
+        near enough to the given datetime (by default, now) that they may 
+        see a surge of submissions.
+        """
+        import tamarin
+        from core_type import getAssignment, TamarinError
+        
+        if not now:
+            now = datetime.datetime.now()
+        lead = datetime.timedelta(minutes=tamarin.PREWARM_LEAD_MINUTES)
+        linger = datetime.timedelta(minutes=tamarin.PREWARM_LINGER_MINUTES)
+        surging = []
+        for name in tamarin.getAssignments():
+            try:
+                due = tamarin.convertTimestampToTime(getAssignment(name).due)
+            except TamarinError:
+                continue
+            if due - lead <= now <= due + linger:
+                surging.append(name)
+        return surging
+
+
+class Maintenance(Process):
+    """
+    Not intended for direct use by Tamarin users or admins.
+    Thus, it should not be included in the process list for a SubmissionType.
+    
+    Maintenance does the housekeeping tasks listed in GRADEPIPE_MAINTENANCE
+    while the gradepipe has nothing else to do.  Each task is a generator
+    method that yields after each small step of work, so that the 
+    gradepipe can stop between any two steps to grade a new submission and
+    then resume where it left off.
+    
+    """
+    # task name -> generator method
+    TASKS = {'index': 'buildIndex', 
+             'users': 'cacheUsers',
+             'janitor': 'sweep',
+             'journal': 'compactJournal',
+             'compress': 'compressOutputs',
+             'dedupe': 'dedupeFiles',
+             'render': 'renderSubmissions'}
+    
+    def __init__(self, required=False):
+        super().__init__(required)
+        self.pending = None  # remaining steps of all tasks
+
+    def run(self, args=None, getQueue=None):
+        """
+        Does the remaining steps of every task, in order, until all are 
+        done.  After each step, calls getQueue (if given), and stops early 
+        if it returns any files to grade.  
+        
+        Returns True if every task is done, or False if stopped early.
+        """
+        if self.pending is None:
+            self.pending = self.getSteps()
+        for name in self.pending:
+            if getQueue and getQueue():
+                self.logger.info("Pausing %s maintenance to grade new "
+                                 "submissions.", name)
+                return False
+        return True
+
+    def getSteps(self):
+        """
+        Generates the name of the current task after each step of each task
+        in GRADEPIPE_MAINTENANCE.  A task that fails is logged and skipped.
+        """
+        import tamarin
+        for name in tamarin.GRADEPIPE_MAINTENANCE:
+            if name not in self.TASKS:
+                self.logger.error("No such maintenance task: %s", name)
+                continue
+            started = time.time()
+            steps = 0
+            try:
+                for step in getattr(self, self.TASKS[name])():
+                    steps += 1
+                    yield name
+            except Exception:
+                self.logger.exception("%s maintenance failed.", name)
+                continue
+            self.logger.info("Finished %s maintenance (%d steps) in %.2fs.",
+                             name, steps, time.time() - started)
+
+    def buildIndex(self):
+        """ Builds the submission index if it is in use but missing. """
+        import tamarin
+        import core_index
+        if (tamarin.USE_SUBMISSION_INDEX and 
+                not os.path.exists(tamarin.SUBMISSION_INDEX)):
+            core_index.connect()
+            yield
+
+    def cacheUsers(self):
+        """ Updates USERS_CACHE (if set) if the USERS_FILE has changed. """
+        import tamarin
+        if tamarin.USERS_CACHE:
+            tamarin.getUserDirectory()
+            yield
+
+    def sweep(self):
+        """ 
+        Deletes old files, one at a time, as per core_janitor (including 
+        from the gradezones, which are not in use while the queue is empty).
+        """
+        import core_janitor
+        total = 0
+        for path, size in core_janitor.iterSweep(inGradepipe=True):
+            total += size
+            yield
+        self.logger.debug("Janitor freed %.1f KB.", total / 1024)
+
+    def compactJournal(self):
+        """ Compacts the event journal, if in use. """
+        import tamarin
+        import core_journal
+        if tamarin.USE_EVENT_JOURNAL and os.path.exists(tamarin.EVENT_JOURNAL):
+            kept, dropped = core_journal.compact()
+            self.logger.debug("Journal compacted to %d events.", kept)
+            yield
+
+    def compressOutputs(self):
+        """
+        Converts the grader output files of each assignment, one at a time,
+        to match COMPRESS_GRADER_OUTPUT.  Then rebuilds the submission index
+        if any were converted and the index is in use.
+        """
+        import tamarin
+        import core_index
+        import core_storage
+        from core_type import getAssignment
+        converted = 0
+        for name in tamarin.getAssignments():
+            for path in core_storage.convertGraderOutputs(getAssignment(name)):
+                converted += 1
+                yield
+        if converted and tamarin.USE_SUBMISSION_INDEX:
+            core_index.rebuild()
+            yield
+
+    def dedupeFiles(self):
+        """
+        Stores each loose submitted file, one at a time, in BLOB_ROOT (if 
+        set), and then removes any orphaned blobs.
+        """
+        import tamarin
+        import core_storage
+        if not tamarin.BLOB_ROOT:
+            return
+        for path in core_storage.getLooseFiles():
+            if os.path.isfile(path):
+                core_storage.storeBlob(path)
+                yield
+        core_storage.removeOrphanedBlobs()
+        yield
+
+    def renderSubmissions(self):
+        """
+        Renders and caches the HTML of each graded submission, one at a 
+        time, both as seen by students and in masterview, if 
+        FRAGMENT_CACHE_ROOT is set.  Those already cached are left as is.
+        """
+        import tamarin
+        import core_view
+        from core_type import getAssignment
+        if not tamarin.FRAGMENT_CACHE_ROOT:
+            return
+        for name in tamarin.getAssignments():
+            assignment = getAssignment(name)
+            for path in assignment.glob('*.' + assignment.type.fileExt):
+                filename = os.path.basename(path)
+                if re.match(tamarin.SUBMITTED_RE, filename):
+                    for master in (False, True):
+                        core_view.renderSubmission(filename, master)
+                        yield
+
+
+class CopyGrader(Process):
+    """ 
+    Copies the grader files for this assignment into the GRADEZONE. 
+    This is a staging process.
+    
+    It is recommended that grader files be pre-compiled and copied after
+    compiling the submission.  This way, the submission cannot overwrite
+    the grader files.  If the submission needs some of the grader files
+    in order to compile, then copy the graders, compile the submission,
+    and copy the graders again (to be sure you still have the original
+    versions).
+    
+    When the gradepipe batches submissions by assignment (see 
+    tamarin.GRADEPIPE_BATCH_WINDOW), grader files left intact in the
+    gradezone by the previous submission to the same assignment are reused
+    rather than copied again.  (Directories are always copied again.)
+    """
+    
+    staging = True
+    
+    # gradezone path -> (assignment, source signature, zone signature) of
+    # every grader file copied so far, shared by all CopyGrader instances
+    staged = {}
+    # totals of the files that did not need to be copied again 
+    reusedCount = 0
+    reusedBytes = 0
+    # guards the above, which the prefetch thread (see GradePipe.prefetch)
+    # uses at the same time as the main one
+    lock = threading.Lock()
+    
+    def __init__(self, required=True, 
+                 displayName="Copying grader files into gradezone",
+                 rootGrader=True, assignmentGrader=True):
+        """
+        If rootGrader is True, will copy any files found in GRADERS_ROOT
+        into the gradezone.  If there aren't any files there, the run will 
+        fail. Copies files only, not directories.
+        
+        If assignmentGrader=True, will copy any files found in GRADERS_ROOT/X,
+        where X is the assignment name.  If the folder is not there or is
+        empty, the run will fail.  Will copy whole directories trees if 
+        present.  Since any assignment copying always happens seconds, it is
+        possible to overwrite any default rootGrader files with 
+        assignment-specific versions.
+        
+        It is an error to set both rootGrader and assignmentGrader to False,
+        since then there's nothing to copy.  This will result in an exception
+        when running.
+        """
+        super().__init__(required=required, displayName=displayName)
+        self.rootGrader = rootGrader
+        self.assignmentGrader = assignmentGrader
+        
+    def run(self, args):
+        """
+        If rootGrader, copies that first.  If assignmentGrader, requires 
+        args['GradeFile.assignment'] for the assignment name.  Will copy
+        those graders too.
+        
+        See __init__ for more docs.
+        """
+        import tamarin
+        from core_type import TamarinError
+            
+        if not self.rootGrader and not self.assignmentGrader:
+            self.logger.error("Both rootGrader and assignmentGrader are "
+                              "False.")
+            raise TamarinError('INVALID_PROCESS_CONFIGURATION', self.name)
+        
+        if self.rootGrader:
+            try:
+                graderFiles = glob.glob(os.path.join(tamarin.GRADERS_ROOT,'*'))
+                # files only; no dirs
+                graderFiles = [gf for gf in graderFiles if os.path.isfile(gf)]
+                if not graderFiles:
+                    self.logger.error("No rootGrader files to copy.")
+                    raise TamarinError('GRADER_ERROR', self.name)
+                copied = 0
+                for gf in graderFiles:
+                    copied += self.copyGraderFile(gf, args)
+                self.logger.debug("Copied %d root grader file(s) into "
+                                  "gradezone; reused %d.", copied, 
+                                  len(graderFiles) - copied)
+            except TamarinError:
+                raise
+            except:
+                self.logger.exception('Could not copy rootGrader files')
+                raise TamarinError('GRADER_CRASH', self.name)
+
+        if self.assignmentGrader:
+            try:
+                assignLoc = os.path.join(tamarin.GRADERS_ROOT, 
+                                         args['GradeFile.assignment'])
+                if not os.path.exists(assignLoc):
+                    self.logger.error('No GRADERS/%s location to copy from.', 
+                                      args['GradeFile.assignment'])
+                    raise TamarinError('GRADER_ERROR', self.name)
+                
+                graderFiles = glob.glob(os.path.join(assignLoc,'*'))
+                # never hand the reference solution to a submission
+                graderFiles = [gf for gf in graderFiles if
+                               os.path.basename(gf) !=
+                               tamarin.REFERENCE_SOLUTION_DIR]
+                if not graderFiles:
+                    self.logger.error("No assignmentGrader files to copy.")
+                    raise TamarinError('GRADER_ERROR', self.name)
+                copied = 0
+                for gf in graderFiles:
+                    #do a recursive copy of any directories
+                    if os.path.isdir(gf):
+                        # remove anything already there so copy will succeed; 
+                        # ignore errors if not there
+                        shutil.rmtree(os.path.join(args['GradeFile.zone'], 
+                                                   os.path.basename(gf)), True)
+                        shutil.copytree(gf,os.path.join(args['GradeFile.zone'],
+                                                   os.path.basename(gf)), True)
+                        copied += 1
+                    else:
+                        copied += self.copyGraderFile(gf, args)
+                self.logger.debug("Copied %d assignment grader file(s) into "
+                                  "gradezone; reused %d.", copied, 
+                                  len(graderFiles) - copied)
+            except TamarinError:
+                raise
+            except:
+                self.logger.exception('Could not copy assignmentGrader files')
+                raise TamarinError('GRADER_CRASH', self.name)
+        
+        return True
+
+    def copyGraderFile(self, graderFile, args):
+        """
+        Copies the given grader file into args['GradeFile.zone'] for grading
+        a submission to args['GradeFile.assignment'].  However, if the copy 
+        staged there for the last submission to the same assignment is still
+        unchanged--as is the grader file itself--leaves it in place instead.
+        
+        Returns 1 if the file was copied, or 0 if it was reused.
+        """
+        assignmentName = args['GradeFile.assignment']
+        dest = os.path.join(args['GradeFile.zone'], 
+                            os.path.basename(graderFile))
+        sourceSig = self.getSignature(graderFile)
+        with CopyGrader.lock:
+            record = CopyGrader.staged.get(dest)
+        if record and record[0] == assignmentName and \
+                record[1] == sourceSig and \
+                self.getSignature(dest) == record[2]:
+            with CopyGrader.lock:
+                CopyGrader.reusedCount += 1
+                CopyGrader.reusedBytes += sourceSig[0]
+            return 0
+        shutil.copy(graderFile, dest)
+        with CopyGrader.lock:
+            CopyGrader.staged[dest] = (assignmentName, sourceSig, 
+                                       self.getSignature(dest))
+        return 1
+
+    @staticmethod
+    def getSignature(path):
+        """
+        Returns a tuple of the size, modification and change times, and inode
+        of the given file, any of which will differ if the file has been 
+        modified or replaced.  Returns None if there is no such file.
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_size, stat.st_mtime_ns, stat.st_ctime_ns, stat.st_ino)
+
+    @staticmethod
+    def getStaged(assignmentName):
+        """
+        Returns a dict of the gradezone paths of all grader files staged for
+        the given assignment, each mapped to its signature when staged.
+        """
+        with CopyGrader.lock:
+            staged = list(CopyGrader.staged.items())
+        return {path: record[2] for path, record in staged
+                if record[0] == assignmentName}
+
+class DisplayFiles(Process):
+    """
+    Displays the contents of the given glob of text files.
+    
+    A text file submission is automatically shown by Tamarin, so this process 
+    is only necessary when you want to show the contents of unzipped files.
+    Will search gradezone for the given list of file globs, displaying each
+    file found using a "preformatted" display format.
+    
+    Adds (as a list) the set of actual filenames (relative to GRADEZONE)
+    to args['DisplayFiles.filenames'] 
+    
+    This is a staging process.
+    
+    """
+    # FUTURE: Loop through SUBMISSION_TYPEs to look at file exts to determine
+    # formatting?  Neither looking at type keys or looping through possible
+    # duplicates is entirely satisfactory.
+    #
+    # FUTURE: Flag for recursive file printing.
+    #    
+    staging = True
+    
+    def __init__(self, *globs, required=False, displayName="Displaying files"):
+        super().__init__(required, displayName)
+        self.grade = 'OK'
+        self.globs = globs
+        
+    def run(self, args):
+        """ 
+        Adds each glob-matching file name to output.
+        If at least one found, grade is OK (returns True), 
+        else X (returns False: no files displayed).
+        """
+        files = set()
+        self.output = ''
+        
+        for g in self.globs:
+            batch = glob.glob(os.path.join(args['GradeFile.zone'], g))
+            for file in batch:
+                self.output += '<div class="file">\n'
+                fn = file.replace(args['GradeFile.zone'], '.')
+                files.add(fn)
+                self.output += '<h4>' + fn + '</h4>\n'
+                with open(file, 'r') as filein:
+                    content = filein.read()
+                    content = html.escape(content, quote=False)
+                    self.output += '<pre>' + content + '</pre>\n</div>\n'
+        
+        # record results
+        args['DisplayFiles.filenames'] = list(files)
+        self.logger.debug("Displayed " + str(len(files)) + " files from " + 
+                          str(self.globs))
+        if len(files) == 0:
+            self.grade = 'X'
+            self.output = None
+        return len(files) > 0
+        
+
+class JavaCompiler(Process):
+    """ 
+    Compiles the submitted file using javac. 
+    """
+    
+    def __init__(self, javacPath, required=True, displayName="Compiled",
+                 grade='OK', all=False):
+        """
+        Requires the path to the javac compiler.  If all is True, compiles
+        all .java files currently in gradezone (top level only).
+        """
+        super().__init__(required, displayName)
+        self.javac = javacPath
+        self.grade = grade
+        self.all = all
+    
+    def run(self, args):
+        """
+        Compiles the file named in args['GradeFile.file'].  It is assumed
+        that this will be a .java file.
+        
+        Returns True and leaves self.grade as set in the constructor 
+        if the file compiled.  Otherwise, sets self.grade to 0 if it was a 
+        number or to 'X' if it wasn't and returns False.
+        
+        Also sets 'JavaCompiler.compiled' to True or False.
+        """
+        # Future: Allow a compile *.java somehow?  
+        # And maybe support packages someday?
+        from core_type import TamarinError
+        if self.all:
+            cmd = self.javac + ' ' + '*.java'
+        else:
+            cmd = self.javac + ' ' + args['GradeFile.filename']
+        try:
+            compiler = subprocess.Popen(cmd,
+                                        stdout=subprocess.PIPE, 
+                                        stderr=subprocess.STDOUT,
+                                        cwd=args['GradeFile.zone'],
+                                        universal_newlines=True,
+                                        shell=True) # to expand *.java on linux
+            #only need stdout of (stdout, stderr)
+            self.output = compiler.communicate()[0]  # may just be warnings
+        except:
+            self.logger.exception("Couldn't spawn javac process")
+            raise TamarinError('GRADER_ERROR', self.name)
+
+        if self.all:
+            javas = glob.glob(os.path.join(args['GradeFile.zone'], '*.java'))
+            args['JavaCompiler.compiled'] = True
+            for file in javas:
+                # XXX: Breaks if have a different non-public class in .java
+                if not os.path.exists(file.replace('.java', '.class')):
+                    args['JavaCompiler.compiled'] = False
+                    self.grade = 'X' if isinstance(self.grade, str) else 0 
+                    self.logger.debug("%s did not compile", 
+                                      os.path.basename(file))
+                    return False
+            return True        
+        else:
+            compiled = args['GradeFile.filename'].replace('.java', '.class')
+            if os.path.exists(os.path.join(args['GradeFile.zone'], compiled)):
+                self.logger.debug("Compiled %s", args['GradeFile.filename'])
+                args['JavaCompiler.compiled'] = True
+                return True
+
+        # did not compile    
+        self.grade = 'X' if isinstance(self.grade, str) else 0 
+        self.logger.debug("%s did not compile", args['GradeFile.filename'])
+        args['JavaCompiler.compiled'] = False
+        return False
+
+
+class JavaGrader(Process):
+    """ 
+    Invokes the assignment-specific TamaringGrader.java-based grader.
+    Assumes the grader is already compiled and named XXGrader.class,
+    where XX is the assignment name.  The grader will also need the
+    .class files generated by TamarinGrader.java. (These can often
+    be stored in the GRADERS_ROOT directory.)
+    """
+    
+    def __init__(self, javaPath, required=True, displayName="Tamarin grader"):
+        """
+        Requires the path to the java executable.
+        """
+        super().__init__(required, displayName)
+        self.java = javaPath
+        
+    def run(self, args):
+        """
+        Requires args['GradeFile.filename'], args['GradeFile.assignment'],
+        and args['JavaCompiler.compiled'].  
+        """
+        from core_type import TamarinError
+        
+        self.logger.debug("Grading %s with %sGrader", 
+                          args['GradeFile.filename'], 
+                          args['GradeFile.assignment'])
+        graderName = args['GradeFile.assignment'] + 'Grader'
+        if not os.path.exists(os.path.join(args['GradeFile.zone'], 
+                                           graderName + '.class')):
+            raise TamarinError('GRADER_ERROR', 
+                               graderName + ".class is not in the gradezone.")
+        try:            
+            compiled = 1 if args['JavaCompiler.compiled'] else 0
+            subfile = args['GradeFile.filename']
+            cmd = (self.java, graderName, subfile, str(compiled))
+            grader = subprocess.Popen(cmd, 
+                                      stdout=subprocess.PIPE, 
+                                      stderr=subprocess.PIPE,
+                                      cwd=args['GradeFile.zone'],
+                                      universal_newlines=True)
+            (self.output, stderr) = grader.communicate()
+        except:
+            self.logger.exception("Couldn't spawn Java grader process")
+            raise TamarinError('GRADER_ERROR', self.name)
+          
+        #make sure grader returned something
+        try:
+            self.grade = float(stderr)
+            return True
+        except ValueError:
+            if self.output:
+                self.output += '\n\n'
+            else:
+                self.output = ''
+            self.output += 'GRADER_ERROR: The Tamarin grader did not '
+            self.output += 'return a valid grade on stderr.\n'
+            self.output += 'Instead, its dying words were: \n'
+            self.output += str(stderr) + '\n'
+            self.grade = 'ERR'
+            return False
+
+class Unzip(Process):
+    """
+    Unzips the file specified by args['GradeFile.path'] in the gradezone.
+    This is a staging process.
+    """
+    staging = True
+    
+    def __init__(self, required=False, displayName="Unzipping files"):
+        super().__init__(required, displayName)
+        self.grade = 'OK'
+        
+    def run(self, args):
+        """
+        Unzips the file. Is careful to prevent any absolute paths or symlinks 
+        that would allow for  extraction of files to outside the gradezone.  
+        If any of such files exist, they are reported to stdout and simply 
+        skipped.  If any files are skipped or if no files are unzipped, will
+        return False as per a failure.  However, this process is not required
+        by default, so grading will likely try to continue.
+    
+        Prints a list of all unzipped and skipped files. Also stores that list 
+        of extracted files into args['Unzip.extracted'].
+        """
+        zf = zipfile.ZipFile(args['GradeFile.path'], 'r')
+        if not zf.namelist():
+            self.output = '[No files found in zipped archive.]\n'
+            self.grade = 'X'
+        else:
+            self.output = ''
+        safe = self.validMembers(zf.namelist())
+        try:
+            zf.extractall(path=args['GradeFile.zone'], members=safe)
+            args['Unzip.extracted'] = safe
+            self.logger.debug('Unzipped ' + str(len(safe)) + ' of ' +
+                                        str(len(zf.namelist())) + ' files')
+        except IOError as e:
+            self.output += ('...\nABORTING: Could not correctly extract '
+                            'one of the files.\n')
+            self.output += ('This is probably due to the zipped file '
+                'being corrupted or containing a symlink.\n')
+            self.logger.warn('Unzip ' + args['GradeFile.filename'] + ' aborted'
+                             ' with: ' + str(e))
+            self.logger.debug('If GRADZONE permissions are correct, error is '
+                              'likely due to a symlink/error in zip file.')
+            self.grade = 'X'
+            return False
+        finally:
+            zf.close()
+        # problem/False if no files or if we skipped on
+        if len(safe) == 0 or len(safe) != len(zf.namelist()):
+            self.grade = 'X'
+            return False
+        else:
+            return True
+        
+
+    def validMembers(self, members):
+        # thanks in part to: http://stackoverflow.com/questions/10060069/
+        safe = []
+        base = os.path.realpath(os.path.abspath('.'))
+        for m in members:
+            self.output += m
+            extracting = os.path.join(base, m)
+            extracting = os.path.realpath(os.path.abspath(extracting))
+            if not extracting.startswith(base):
+                #would extract to other dir
+                self.output += ' [SKIPPED: Would extract to outside of ' +\
+                    'gradezone.]\n'
+            else:
+                self.output += '\n'
+                safe.append(m)
+        return safe
+
+
+class VerifyMainFile(Process):
+    """
+    Verifies--usually after an Unzip--that a given main file exists in the
+    gradezone.  If it does exit, replaces args['GradeFile.filename'] with the
+    new name.  Note that this leaves all other GradeFile arguments untouched!
+    
+    The nameTemplate can include any '{$Something.other}', for which replacment
+    values will be pulled from args when run.  Most commonly useful will 
+    probably be ${GradeFile.user}, etc.  (A special version of string.Template 
+    is used to include dots in the identifiers, excluding the first character.)
+    
+    This is a staging process.
+    
+    """
+    staging = True
+    
+    def __init__(self, nameTemplate, required=True, 
+                 displayName="Verifying main file"):
+        super().__init__(required, displayName)
+        self.grade = 'OK'
+        self.name = nameTemplate
+        
+    def run(self, args): 
+        import string
+        
+        class Temp(string.Template):
+            idpattern = '[_a-z][_a-z0-9.]*'
+        template = Temp(self.name)
+        
+        try:
+            mainfile = template.substitute(args)
+        except KeyError as e:
+            self.logger.error("While producing template: %s", e)
+            raise
+        
+        if os.path.exists(os.path.join(args['GradeFile.zone'], mainfile)):
+            self.logger.info("Found %s", mainfile)
+            args['GradeFile.filename'] = mainfile
+            self.grade = 'OK'
+            return True
+        else:
+            self.logger.warn("Did not find %s", mainfile)
+            self.output = "Did not find required main file: " + mainfile 
+            self.grade = 'X'
+            return False
         
\ No newline at end of file
@@ -0,0 +1,254 @@
+#!python3
+
+## core_index.py
+
+"""
+Maintains an SQLite index of every submission, so that views can find
+submissions without globbing GRADED_ROOT and SUBMITTED_ROOT and parsing
+filenames on every request.
+
+The index is stored in tamarin.SUBMISSION_INDEX and is only used if
+tamarin.USE_SUBMISSION_INDEX is True.  It holds one row for each submitted
+file: its user, assignment, and timestamp; whether it has been graded yet;
+its path; and, once graded, its grader output path, grade, and H/C flags.
+
+submit.py, GradeFile, and GradedFile.update (and so the masterview tools)
+keep the index up to date.  Each process (and thread) keeps one connection
+to it open for all of these.  If it is missing, it is rebuilt from the
+filesystem when next used.  If an update fails, the index is deleted so it
+will be rebuilt rather than left out of date.  To rebuild it after moving
+files around by hand, use the masterview tool or run this module as a
+script.
+
+Part of Tamarin.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+
+import tamarin
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS submissions (
+    filename TEXT PRIMARY KEY,
+    user TEXT NOT NULL,
+    assignment TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    graded INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    graderOutputPath TEXT,
+    grade TEXT,
+    humanVerified INTEGER NOT NULL DEFAULT 0,
+    humanComment INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS submissionsByAssignment
+    ON submissions (assignment, user, timestamp);
+CREATE INDEX IF NOT EXISTS submissionsByUser
+    ON submissions (user, timestamp);
+"""
+
+# this thread's open connection and the path it is to (see connect)
+shared = threading.local()
+
+def connect(populate=True):
+    """
+    Returns this thread's connection to the index, opening it if need be.
+    The connection is reused by every later call, so callers should not 
+    close it.
+    
+    If the index does not exist yet, creates its tables and then, if 
+    populate, builds it from the filesystem.  (If that fails, the index
+    is discarded again.)
+    """
+    path = tamarin.SUBMISSION_INDEX
+    conn = getattr(shared, 'conn', None)
+    if conn and shared.path == path and os.path.exists(path):
+        return conn
+    
+    close()
+    exists = os.path.exists(path)
+    conn = sqlite3.connect(path, timeout=30)
+    if not exists:
+        try:
+            conn.executescript(SCHEMA)
+            if populate:
+                rebuild(conn)
+        except:
+            conn.close()
+            discard()
+            raise
+    shared.conn = conn
+    shared.path = path
+    return conn
+
+def close():
+    """ Closes this thread's connection to the index, if it is open. """
+    conn = getattr(shared, 'conn', None)
+    shared.conn = None
+    if conn:
+        conn.close()
+
+def discard():
+    """ Deletes the index so that it will be rebuilt when next used. """
+    close()
+    try:
+        os.remove(tamarin.SUBMISSION_INDEX)
+    except OSError:
+        pass
+
+def rebuild(conn=None):
+    """
+    Recreates the index from the files currently in SUBMITTED_ROOT and in
+    each assignment directory.  Returns the number of submissions indexed.
+    """
+    from core_type import getAssignment, TamarinError
+    import core_storage
+
+    rows = []
+    for f in tamarin.getSubmittedFilenames():
+        match = re.match(tamarin.SUBMITTED_RE, os.path.basename(f))
+        if match:
+            rows.append(getRow(match, f))
+
+    for name in tamarin.getAssignments():
+        try:
+            assignment = getAssignment(name)
+        except TamarinError:
+            continue
+        outputs = {}
+        submissions = []
+        for path in assignment.glob('*'):
+            fn = os.path.basename(path)
+            graded = re.match(tamarin.GRADED_RE, fn)
+            if graded:
+                if core_storage.matchGraderOutput(fn):
+                    stem = graded.group(1) + graded.group(2) + '-' + \
+                           graded.group(3)
+                    outputs[stem] = path
+                continue
+            match = re.match(tamarin.SUBMITTED_RE, fn)
+            if match and match.group(4) == assignment.type.fileExt:
+                submissions.append((match, path))
+        for match, path in submissions:
+            stem = match.group(1) + match.group(2) + '-' + match.group(3)
+            rows.append(getRow(match, path, outputs.get(stem)))
+
+    if not conn:
+        conn = connect(populate=False)  # about to be populated here
+    with conn:
+        conn.execute('DELETE FROM submissions')
+        conn.executemany('INSERT OR REPLACE INTO submissions '
+                         'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+    return len(rows)
+
+def getRow(match, path, graderOutputPath=None):
+    """
+    Returns an index row for the submission at the given path, whose
+    filename produced the given SUBMITTED_RE match.  The submission is
+    considered graded if it is not in SUBMITTED_ROOT.
+    """
+    graded = os.path.dirname(path) != tamarin.SUBMITTED_ROOT
+    grade = None
+    verified = commented = False
+    if graderOutputPath:
+        found = re.match(tamarin.GRADED_RE, os.path.basename(graderOutputPath))
+        grade = found.group(4) or 'ERR'
+        flags = found.group(5) or ''
+        verified = 'H' in flags
+        commented = 'C' in flags
+    return (match.group(0), match.group(1).lower(), match.group(2),
+            match.group(3), int(graded), path, graderOutputPath, grade,
+            int(verified), int(commented))
+
+def store(row):
+    """
+    Adds or replaces the given row in the index, if the index is in use.
+    If the index cannot be updated, discards it.
+    """
+    if not tamarin.USE_SUBMISSION_INDEX:
+        return
+    try:
+        with connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO submissions '
+                         'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', row)
+    except sqlite3.Error:
+        discard()
+
+def recordSubmitted(filename):
+    """ Records the given file, just moved into SUBMITTED_ROOT. """
+    match = re.match(tamarin.SUBMITTED_RE, filename)
+    store(getRow(match, os.path.join(tamarin.SUBMITTED_ROOT, filename)))
+
+def recordGraded(gradedFile):
+    """ Records the current state of the given GradedFile. """
+    match = re.match(tamarin.SUBMITTED_RE, gradedFile.filename)
+    store(getRow(match, gradedFile.path, gradedFile.graderOutputPath))
+
+def getSubmissions(user=None, assignment=None, graded=True, submitted=True):
+    """
+    As tamarin.getSubmissions, but answered from the index.  Returns None
+    if the index could not be read, in which case it is discarded.
+    """
+    if not graded and not submitted:
+        return []
+    query = 'SELECT path FROM submissions WHERE 1'
+    params = []
+    if user:
+        query += ' AND user = ?'
+        params.append(user.lower())
+    if assignment:
+        query += ' AND assignment = ?'
+        params.append(assignment)
+    if not graded:
+        query += ' AND graded = 0'
+    if not submitted:
+        query += ' AND graded = 1'
+    query += ' ORDER BY timestamp, filename'
+    try:
+        return [row[0] for row in connect().execute(query, params)]
+    except sqlite3.Error:
+        discard()
+        return None
+
+def getRecords(user=None, assignment=None):
+    """
+    Returns a list of (filename, path, graded, graderOutputPath) tuples for
+    all submissions of the given user for the given assignment (either of 
+    which may be None for all).  Returns None if the index could not be 
+    read, in which case it is discarded.
+    """
+    query = ('SELECT filename, path, graded, graderOutputPath '
+             'FROM submissions WHERE 1')
+    params = []
+    if user:
+        query += ' AND user = ?'
+        params.append(user.lower())
+    if assignment:
+        query += ' AND assignment = ?'
+        params.append(assignment)
+    try:
+        return connect().execute(query, params).fetchall()
+    except sqlite3.Error:
+        discard()
+        return None
+
+def getGraderOutputPath(filename):
+    """
+    Returns the indexed grader output path of the given graded submission
+    filename, or None if it is not known.
+    """
+    try:
+        row = connect().execute('SELECT graderOutputPath FROM submissions '
+                                'WHERE filename = ? AND graded = 1',
+                                (filename,)).fetchone()
+    except sqlite3.Error:
+        discard()
+        return None
+    return row[0] if row else None
+
+
+if __name__ == "__main__":
+    # rebuild the index from the filesystem
+    print("Indexed", rebuild(), "submissions into", tamarin.SUBMISSION_INDEX)
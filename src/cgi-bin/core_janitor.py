@@ -0,0 +1,146 @@
+#!python3
+
+## core_janitor.py
+
+"""
+Cleans out old clutter from Tamarin's working directories, so that the
+directories scanned on every request stay small.  This includes files
+that were uploaded but never submitted, copies made by masterview's strip
+tool, provisional results for files never fully graded, and anything
+left in the gradezones or lock directory by a crash.  It also removes
+cached HTML (in FRAGMENT_CACHE_ROOT) of submissions that have since been 
+deleted or changed, such as by being archived.
+
+How long files are kept in each directory is set by
+tamarin.JANITOR_RETENTION_DAYS.  Files older than that (by modification
+time) are deleted, as are any subdirectories left empty.  The directories
+themselves are never removed.  Hidden temporary files (those starting
+with a '.') left by interrupted writes are also removed from GRADED_ROOT,
+SUBMITTED_ROOT, PREFLIGHT_ROOT, STRIPPED_ROOT, and FRAGMENT_CACHE_ROOT 
+once older than JANITOR_TEMP_DAYS.
+
+The gradezones are skipped while a gradepipe is running, unless it is
+that gradepipe itself that is running the janitor.  (See Maintenance, 
+which does so while the gradepipe's queue is empty if 'janitor' is in
+GRADEPIPE_MAINTENANCE.)
+
+To run the janitor from cron (or by hand), run this module as a script.
+Pass 'dry-run' to just report what would be deleted.
+
+Part of Tamarin.
+"""
+
+import os
+import sys
+import time
+
+import tamarin
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
+def getExpired(directory, days, hiddenOnly=False, now=None):
+    """
+    Returns a sorted list of the paths of all files under the given
+    directory that have not been modified in the given number of days.
+    If hiddenOnly, only includes files whose names start with a '.'.
+    Symbolic links are listed (if old enough) but never followed.
+    """
+    if now is None:
+        now = time.time()
+    cutoff = now - days * SECONDS_PER_DAY
+    expired = []
+    for dirpath, dirnames, filenames in os.walk(directory):
+        for fn in filenames:
+            if hiddenOnly and not fn.startswith('.'):
+                continue
+            path = os.path.join(dirpath, fn)
+            try:
+                if os.lstat(path).st_mtime < cutoff:
+                    expired.append(path)
+            except FileNotFoundError:
+                pass  # removed since listed
+    return sorted(expired)
+
+def removeEmptyDirs(directory):
+    """
+    Removes all empty subdirectories (at any depth) of the given directory,
+    but not the directory itself.  Returns the number removed.
+    """
+    removed = 0
+    for dirpath, dirnames, filenames in os.walk(directory, topdown=False):
+        if dirpath != directory and not os.listdir(dirpath):
+            try:
+                os.rmdir(dirpath)
+                removed += 1
+            except OSError:
+                pass  # something was just added
+    return removed
+
+def sweep(dryRun=False, inGradepipe=False, now=None):
+    """
+    Deletes all expired files, as described above.  If dryRun, nothing is
+    actually deleted.  inGradepipe should be True only if called by the
+    running gradepipe while it is idle, in which case the gradezones are
+    cleaned too.
+
+    Returns a list of (path, size) tuples of the files deleted (or that
+    would be deleted, if dryRun).
+    """
+    return list(iterSweep(dryRun, inGradepipe, now))
+
+def iterSweep(dryRun=False, inGradepipe=False, now=None):
+    """
+    Same as sweep, but generates each (path, size) tuple as that file is
+    deleted, so that the sweep can be paused between files.
+    """
+    zones = (tamarin.GRADEZONE_ROOT, tamarin.GRADEZONE_PREFETCH_ROOT)
+    zonesBusy = not inGradepipe and os.path.exists(tamarin.GRADEPIPE_ACTIVE)
+
+    targets = []
+    for directory, days in sorted(tamarin.JANITOR_RETENTION_DAYS.items()):
+        if days is None or (zonesBusy and directory in zones):
+            continue
+        targets.append((directory, days, False))
+    for directory in (tamarin.GRADED_ROOT, tamarin.SUBMITTED_ROOT, 
+                      tamarin.PREFLIGHT_ROOT, tamarin.STRIPPED_ROOT, 
+                      tamarin.FRAGMENT_CACHE_ROOT):
+        if directory:
+            targets.append((directory, tamarin.JANITOR_TEMP_DAYS, True))
+
+    for directory, days, hiddenOnly in targets:
+        if not os.path.isdir(directory):
+            continue
+        for path in getExpired(directory, days, hiddenOnly, now):
+            try:
+                size = os.lstat(path).st_size
+                if not dryRun:
+                    os.remove(path)
+            except FileNotFoundError:
+                continue
+            yield path, size
+        if not dryRun and not hiddenOnly:
+            removeEmptyDirs(directory)
+
+    if tamarin.FRAGMENT_CACHE_ROOT:
+        import core_view
+        for path in core_view.getStaleFragments():
+            try:
+                size = os.lstat(path).st_size
+                if not dryRun:
+                    os.remove(path)
+            except FileNotFoundError:
+                continue
+            yield path, size
+        if not dryRun:
+            removeEmptyDirs(tamarin.FRAGMENT_CACHE_ROOT)
+
+
+if __name__ == "__main__":
+    dryRun = 'dry-run' in sys.argv[1:]
+    swept = sweep(dryRun)
+    for path, size in swept:
+        print(('Would delete ' if dryRun else 'Deleted ') + path +
+              ' (' + str(size) + ' bytes)')
+    print('Would delete' if dryRun else 'Deleted', len(swept), 'files,',
+          sum(size for path, size in swept), 'bytes in total.')
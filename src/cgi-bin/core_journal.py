@@ -0,0 +1,191 @@
+#!python3
+
+## core_journal.py
+
+"""
+Keeps an append-only journal of every change to the state of a submission,
+so that caches and other views derived from the submissions can catch up
+on what has changed since they were built without rescanning the tree.
+
+The journal is stored in tamarin.EVENT_JOURNAL and is only kept if
+tamarin.USE_EVENT_JOURNAL is True.  Each line is one event as JSON: a dict
+of its sequence number ('seq'), the 'time' it happened, the kind of
+'event', and the 'filename' of the submission it happened to, plus the
+submission's state afterward (as per getState).  Events are:
+
+* submit - a file was submitted (by submit.py)
+* grade - a submission was graded for the first time (by GradeFile)
+* regrade - a submission was graded again, or its grade was changed by
+            a human (as by masterview.modifySubmission)
+* verify - a grade was marked (or unmarked) as human-verified
+* comment - a human added a comment
+* delete - a human deleted a comment
+
+Sequence numbers always increase, so a consumer only needs to remember the
+last one it has seen and then read the events after it (see readEvents).
+Since every event includes the full state of its submission, only the last
+event for each submission is needed to know its current state.  compact
+drops all the earlier ones to keep the journal short.  To compact the
+journal, run this module as a script with 'compact'.
+
+Appending an event locks the journal (where fcntl is available), so
+CGI requests and the gradepipe can all write to it at once.
+
+Part of Tamarin.
+"""
+
+import contextlib
+import json
+import os
+import sys
+
+try:
+    import fcntl  # not on Windows, so journal just isn't locked there
+except ImportError:
+    fcntl = None
+
+import tamarin
+
+# how far back from the end of the journal to first look for the last event
+TAIL_CHUNK_SIZE = 4096
+
+
+@contextlib.contextmanager
+def lock():
+    """
+    Opens and exclusively locks the journal (creating it if necessary),
+    returning the open binary file.  Writes always append to the journal.
+    If the journal is replaced (as by compact) while waiting for the lock,
+    the new journal is opened and locked instead.
+    """
+    os.makedirs(os.path.dirname(tamarin.EVENT_JOURNAL), exist_ok=True)
+    while True:
+        journal = open(tamarin.EVENT_JOURNAL, 'a+b')
+        if fcntl:
+            fcntl.flock(journal, fcntl.LOCK_EX)
+        try:
+            current = os.stat(tamarin.EVENT_JOURNAL).st_ino
+        except FileNotFoundError:
+            current = None
+        if current == os.fstat(journal.fileno()).st_ino:
+            break
+        journal.close()
+    try:
+        yield journal
+    finally:
+        journal.close()  # releases lock
+
+def getLastSequence(journal):
+    """
+    Returns the sequence number of the last event in the given open binary
+    journal file, or 0 if it is empty.  Only reads the end of the file.
+    """
+    size = journal.seek(0, os.SEEK_END)
+    chunk = TAIL_CHUNK_SIZE
+    while True:
+        start = max(0, size - chunk)
+        journal.seek(start)
+        lines = journal.read(size - start).splitlines()
+        if not lines:
+            return 0
+        if len(lines) > 1 or start == 0:
+            return json.loads(lines[-1].decode('utf-8'))['seq']
+        chunk *= 2  # last line longer than chunk, so look further back
+
+def getState(submission):
+    """
+    Returns a dict of the current state of the given SubmittedFile or
+    GradedFile, as recorded in each event.
+    """
+    from core_type import GradedFile
+    state = {'user': submission.username.lower(),
+             'assignment': submission.assignment,
+             'path': submission.path,
+             'graded': isinstance(submission, GradedFile)}
+    if state['graded']:
+        state.update({'graderOutputPath': submission.graderOutputPath,
+                      'grade': submission.grade,
+                      'verified': submission.humanVerified,
+                      'commented': submission.humanComment})
+    return state
+
+def record(event, submission, **details):
+    """
+    Appends an event of the given kind for the given SubmittedFile or
+    GradedFile to the journal, if the journal is in use.  Any details are
+    added to the event.  Returns the event's sequence number, or None if
+    it could not be recorded.
+    """
+    if not tamarin.USE_EVENT_JOURNAL:
+        return None
+    entry = getState(submission)
+    entry.update(details)
+    entry.update({'event': event, 'filename': submission.filename,
+                  'time': tamarin.convertTimeToTimestamp(seconds=True)})
+    try:
+        with lock() as journal:
+            entry['seq'] = getLastSequence(journal) + 1
+            journal.write(json.dumps(entry).encode('utf-8') + b'\n')
+    except (OSError, ValueError, KeyError):
+        # ValueError or KeyError if last event is malformed
+        return None
+    return entry['seq']
+
+def recordSubmitted(filename):
+    """ Records the given file, just moved into SUBMITTED_ROOT. """
+    from core_type import SubmittedFile
+    return record('submit', SubmittedFile(filename))
+
+def readEvents(since=0):
+    """
+    Generates every event in the journal with a sequence number greater
+    than since, oldest first.  Generates nothing if there is no journal.
+    """
+    try:
+        journal = open(tamarin.EVENT_JOURNAL, 'rb')
+    except FileNotFoundError:
+        return
+    with journal:
+        for line in journal:
+            if line.strip():
+                event = json.loads(line.decode('utf-8'))
+                if event['seq'] > since:
+                    yield event
+
+def compact():
+    """
+    Rewrites the journal to keep only the last event for each submission,
+    since that event holds the submission's current state.  The kept events
+    keep their sequence numbers (including the last one, so new events will
+    still be numbered after it).  Returns a (kept, dropped) tuple of event
+    counts.
+    """
+    with lock() as journal:
+        journal.seek(0)
+        events = [json.loads(line.decode('utf-8')) for line in journal
+                  if line.strip()]
+        last = {}
+        for event in events:
+            last[event['filename']] = event['seq']
+        kept = [e for e in events if last[e['filename']] == e['seq']]
+
+        temp = tamarin.EVENT_JOURNAL + '.tmp'
+        with open(temp, 'wb') as fileout:
+            for event in kept:
+                fileout.write(json.dumps(event).encode('utf-8') + b'\n')
+            fileout.flush()
+            os.fsync(fileout.fileno())
+        os.replace(temp, tamarin.EVENT_JOURNAL)
+    return len(kept), len(events) - len(kept)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ['compact']:
+        kept, dropped = compact()
+        print("Compacted", tamarin.EVENT_JOURNAL, "to", kept, "events;",
+              "dropped", dropped, "earlier ones.")
+    else:
+        # print the events after the given sequence number
+        since = int(sys.argv[1]) if sys.argv[1:] else 0
+        for event in readEvents(since):
+            print(json.dumps(event))
@@ -0,0 +1,588 @@
+#!python3
+
+## core_storage.py
+
+"""
+Tools for changing how graded submissions are stored on disk.
+
+If tamarin.SHARD_GRADED_BY_USER is True, each graded submission and its
+grader output files are stored in a subfolder for each user within the
+assignment folder.  Otherwise, they are all stored in the assignment folder
+itself.  Tamarin finds files in either place, so that setting can be changed
+at any time.  Then, run this module as a script to move any existing files
+into the new layout.  (You can also pass one or more assignment names to
+convert only those assignments.)
+
+Files are moved one at a time by renaming them, so Tamarin can stay online
+and the gradepipe can keep running while a tree is converted.  If the
+submission index is in use, it is rebuilt afterward.
+
+Once an assignment is closed, all of its files can be packed into a single
+zip archive (ARCHIVE_FILENAME) within its assignment folder.  This keeps 
+old terms from cluttering GRADED_ROOT with thousands of small files.  
+
+Archived files are still found by Assignment.glob (and so by GradedFile, 
+CourseSnapshot, etc.).  Each is given a path within the archive, such as
+.../A01-20380119-0314/archive.zip/JohndoeA01-20380119-0301.java, and is
+read straight from the archive when opened with openFile.  Archived files
+cannot be changed, though, so an assignment must be unpacked again before
+its grades or comments can be edited.
+
+To archive or unpack assignments from the command line, run this module as
+a script with 'archive' or 'unpack' followed by the assignment names.
+
+If tamarin.COMPRESS_GRADER_OUTPUT is True, new grader output files are 
+gzipped, with COMPRESSED_EXT appended to their names.  Both forms can be
+read (see openFile), so that setting can also be changed at any time.  To 
+then convert the existing grader output files, run this module as a script
+with 'compress' (optionally followed by assignment names).
+
+Each submission can be locked while its files are changed (see 
+lockSubmission), so that the gradepipe and the masterview tools can work 
+on different submissions at once but never on the same one.  Changed files
+are written under a temporary name and then renamed into place, so no one
+ever sees a half-written file.
+
+If tamarin.BLOB_ROOT is set, submitted files are stored by content: each 
+file is replaced by a hardlink to a blob in BLOB_ROOT named by its SHA-256
+(see storeBlob), so identical resubmissions take no extra space.  Since all the links share one copy, such files must only
+ever be replaced, never modified in place.  To store all existing 
+submissions this way (and remove any blobs no longer linked to), run this 
+module as a script with 'dedupe'.  Run it with 'blobstats' to report how 
+much space this saves.
+
+Part of Tamarin.
+"""
+
+import filecmp
+import contextlib
+import fnmatch
+import gzip
+import hashlib
+import io
+import os
+import re
+import shutil
+import sys
+import time
+import zipfile
+
+try:
+    import fcntl  # not on Windows, so submissions just aren't locked there
+except ImportError:
+    fcntl = None
+
+import tamarin
+
+ARCHIVE_FILENAME = 'archive.zip'
+COMPRESSED_EXT = '.gz'
+BLOB_CHUNK_SIZE = 64 * 1024
+
+# open Archives, keyed by path, each with the (size, mtime) it was opened at
+_archives = {}
+
+
+class Archive:
+    """
+    An archive of an assignment's files.  Use getArchive to get an instance.
+    
+    Only the zip's central directory is read when it is opened, which then 
+    serves as an index of the archived files.  Each file is only 
+    decompressed when it is opened.
+    
+    Details include:
+    * path - the path to the zip file itself
+    * zip - the open ZipFile
+    * members - a dict of each archived filename to its name within the zip
+    """
+    def __init__(self, path):
+        self.path = path
+        self.zip = zipfile.ZipFile(path)
+        self.members = {}
+        for name in self.zip.namelist():
+            if not name.endswith('/'):
+                self.members[name.rsplit('/', 1)[-1]] = name
+    
+    def getPath(self, member):
+        """ Returns the path of the given zip member within this archive. """
+        return os.path.join(self.path, *member.split('/'))
+    
+    def getPaths(self, pattern):
+        """
+        Returns the paths of the archived files whose filenames match the 
+        given glob pattern.
+        """
+        if not any(c in pattern for c in '*?['):
+            # just a filename, so no need to check them all
+            member = self.members.get(pattern)
+            return [self.getPath(member)] if member else []
+        return [self.getPath(self.members[fn]) for fn in 
+                fnmatch.filter(self.members, pattern)]
+    
+
+def getArchive(directory):
+    """
+    Returns the Archive in the given assignment directory, or None if there
+    is not one.  Archives are cached until their size or mtime changes.
+    """
+    path = os.path.join(directory, ARCHIVE_FILENAME)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        _archives.pop(path, None)
+        return None
+    signature = (stat.st_size, stat.st_mtime_ns)
+    if path not in _archives or _archives[path][0] != signature:
+        _archives[path] = (signature, Archive(path))
+    return _archives[path][1]
+
+def splitArchivePath(path):
+    """
+    If the given path is to a file within an archive, returns a tuple of 
+    the archive's directory and the file's name within the zip.  
+    Otherwise, returns None.
+    """
+    head, sep, tail = path.partition(os.sep + ARCHIVE_FILENAME + os.sep)
+    if not sep:
+        return None
+    return (head, tail.replace(os.sep, '/'))
+
+def isArchived(path):
+    """ Returns whether the given path is to a file within an archive. """
+    return splitArchivePath(path) is not None
+
+def exists(path):
+    """ As os.path.exists, but also supports paths within archives. """
+    split = splitArchivePath(path)
+    if not split:
+        return os.path.exists(path)
+    zipped = getArchive(split[0])
+    if not zipped:
+        return False
+    try:
+        zipped.zip.getinfo(split[1])
+        return True
+    except KeyError:
+        return False
+
+def openFile(path, mode='r', encoding=None):
+    """
+    Opens the given file as per open, but also handles files within an 
+    archive and compressed files (those ending in COMPRESSED_EXT).
+    
+    Mode must be one of 'r', 'rb', 'w', or 'wb', though archived files can
+    only be read.  In text mode, the given encoding is used (or the default
+    encoding, as for open, if None).  Compressed files are compressed as 
+    they are written and decompressed as they are read, so they can be 
+    streamed a line at a time.
+    """
+    split = splitArchivePath(path)
+    if split:
+        assert mode in ('r', 'rb'), 'Archived files cannot be written.'
+        zipped = getArchive(split[0])
+        if not zipped:
+            raise FileNotFoundError(path)
+        filein = zipped.zip.open(split[1])
+        if path.endswith(COMPRESSED_EXT):
+            filein = gzip.GzipFile(fileobj=filein)
+        if mode == 'rb':
+            return filein
+        return io.TextIOWrapper(filein, encoding=encoding)
+    elif path.endswith(COMPRESSED_EXT):
+        return gzip.open(path, mode if 'b' in mode else mode + 't', 
+                         encoding=encoding)
+    else:
+        return open(path, mode, encoding=encoding)
+
+@contextlib.contextmanager
+def lockSubmission(filename, shared=False):
+    """
+    Locks the submission with the given filename (or any file with the 
+    same user, assignment, and timestamp) until the end of the with block.
+    
+    Anything changing the submission's files should hold an exclusive lock;
+    anything that needs to see them in a consistent state can hold a 
+    shared lock instead, which many can hold at once.  These locks are only
+    advisory and are not reentrant: the same process must not lock the 
+    same submission again until it has released it.  Each lock is a file 
+    in LOCK_ROOT, which is removed by the last one to release it.
+    
+    Throws a TamarinError('BAD_GRADE_FILENAME') if filename is not the
+    name of a submission or grader output file.
+    """
+    from core_type import TamarinError
+    match = re.match(tamarin.SUBMITTED_RE, os.path.basename(filename)) or \
+            re.match(tamarin.GRADED_RE, os.path.basename(filename))
+    if not match:
+        raise TamarinError('BAD_GRADE_FILENAME', filename)
+    stem = match.group(1) + match.group(2) + '-' + match.group(3)
+    path = os.path.join(tamarin.LOCK_ROOT, stem + '.lock')
+    os.makedirs(tamarin.LOCK_ROOT, exist_ok=True)
+    while True:
+        lock = open(path, 'a')
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            current = os.stat(path).st_ino
+        except FileNotFoundError:
+            current = None
+        if current == os.fstat(lock.fileno()).st_ino:
+            break
+        lock.close()  # lock file removed while waiting, so try again
+    try:
+        yield
+    finally:
+        # remove lock file, unless someone else is using or waiting for it
+        try:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            os.remove(path)
+        except OSError:
+            pass
+        lock.close()  # releases lock
+
+def getGraderOutputExt():
+    """
+    Returns the file extension to use for new grader output files: 
+    GRADER_OUTPUT_FILE_EXT, plus COMPRESSED_EXT if COMPRESS_GRADER_OUTPUT.
+    """
+    if tamarin.COMPRESS_GRADER_OUTPUT:
+        return tamarin.GRADER_OUTPUT_FILE_EXT + COMPRESSED_EXT
+    return tamarin.GRADER_OUTPUT_FILE_EXT
+
+def matchGraderOutput(filename):
+    """
+    If the given filename (or path) is of a grader output file, whether 
+    compressed or not, returns its GRADED_RE match.  Otherwise, returns None.
+    """
+    match = re.match(tamarin.GRADED_RE, os.path.basename(filename))
+    if match and match.group(6) in (tamarin.GRADER_OUTPUT_FILE_EXT, 
+                        tamarin.GRADER_OUTPUT_FILE_EXT + COMPRESSED_EXT):
+        return match
+    return None
+
+def moveToLayout(assignment):
+    """
+    Moves every graded submission and grader output file for the given
+    Assignment into the directory given by Assignment.getUserDir, then
+    removes any per-user subdirectories left empty.  Skips any file that
+    would overwrite an existing file.
+
+    Returns a (moved, skipped) tuple of file counts.
+    """
+    moved = skipped = 0
+    for directory in assignment.getDirs():
+        for fn in sorted(os.listdir(directory)):
+            match = re.match(tamarin.GRADED_RE, fn) or \
+                    re.match(tamarin.SUBMITTED_RE, fn)
+            if not match or not os.path.isfile(os.path.join(directory, fn)):
+                continue
+            userDir = assignment.getUserDir(match.group(1))
+            if userDir == directory:
+                continue
+            dest = os.path.join(userDir, fn)
+            if os.path.exists(dest):
+                skipped += 1
+                continue
+            os.makedirs(userDir, exist_ok=True)
+            os.rename(os.path.join(directory, fn), dest)
+            moved += 1
+        if directory != assignment.path and not os.listdir(directory) and \
+                not tamarin.SHARD_GRADED_BY_USER:
+            os.rmdir(directory)
+    return moved, skipped
+
+def archive(assignment):
+    """
+    Packs all of the files of the given Assignment (including any in 
+    per-user subdirectories or in an existing archive) into its archive.
+    The loose files are then removed.  Rebuilds the submission index if 
+    it is in use.  Returns the number of loose files packed.
+    
+    Throws a TamarinError('ASSIGNMENT_NOT_CLOSED') if the assignment is
+    still accepting submissions or has submissions waiting to be graded.
+    """
+    from core_type import TamarinError
+    import core_index
+    
+    if not assignment.isTooLate() or \
+            tamarin.getSubmissions(assignment=assignment.name, graded=False):
+        raise TamarinError('ASSIGNMENT_NOT_CLOSED', assignment.name)
+    
+    path = os.path.join(assignment.path, ARCHIVE_FILENAME)
+    temp = path + '.tmp'
+    loose = []
+    for directory in assignment.getDirs():
+        for fn in sorted(os.listdir(directory)):
+            f = os.path.join(directory, fn)
+            if os.path.isfile(f) and f not in (path, temp):
+                loose.append(f)
+    
+    old = getArchive(assignment.path)
+    with zipfile.ZipFile(temp, 'w', zipfile.ZIP_DEFLATED) as fileout:
+        packed = set()
+        for f in loose:
+            name = os.path.relpath(f, assignment.path).replace(os.sep, '/')
+            fileout.write(f, name)
+            packed.add(name)
+        if old:
+            for info in old.zip.infolist():
+                if info.filename not in packed:
+                    fileout.writestr(info, old.zip.read(info))
+    os.replace(temp, path)
+    
+    # archive is now complete, so can remove what's been packed into it
+    for f in loose:
+        os.remove(f)
+    for directory in assignment.getDirs()[1:]:
+        if not os.listdir(directory):
+            os.rmdir(directory)
+    if tamarin.USE_SUBMISSION_INDEX:
+        core_index.rebuild()
+    return len(loose)
+
+def unpack(assignment):
+    """
+    Extracts all the files in the given Assignment's archive back into 
+    the assignment directory (skipping any that already exist there) and 
+    then deletes the archive.  Rebuilds the submission index if it is 
+    in use.  Returns the number of files extracted.
+    """
+    import core_index
+    
+    zipped = getArchive(assignment.path)
+    if not zipped:
+        return 0
+    base = os.path.realpath(assignment.path)
+    count = 0
+    for info in zipped.zip.infolist():
+        dest = os.path.realpath(os.path.join(base, *info.filename.split('/')))
+        if info.is_dir() or os.path.exists(dest) or \
+                os.path.commonpath([base, dest]) != base:
+            continue
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        with zipped.zip.open(info) as filein:
+            with open(dest, 'wb') as fileout:
+                shutil.copyfileobj(filein, fileout)
+        modified = time.mktime(info.date_time + (0, 0, -1))
+        os.utime(dest, (modified, modified))
+        count += 1
+    zipped.zip.close()
+    del _archives[zipped.path]
+    os.remove(zipped.path)
+    if tamarin.USE_SUBMISSION_INDEX:
+        core_index.rebuild()
+    return count
+
+def compressGraderOutputs(assignment):
+    """
+    Compresses (or decompresses, if not COMPRESS_GRADER_OUTPUT) every 
+    grader output file of the given Assignment that is not in that form 
+    already.  Archived files are skipped.  Rebuilds the submission index 
+    if it is in use.  Returns the number of files converted.
+    """
+    import core_index
+    
+    count = sum(1 for path in convertGraderOutputs(assignment))
+    if count and tamarin.USE_SUBMISSION_INDEX:
+        core_index.rebuild()
+    return count
+
+def convertGraderOutputs(assignment):
+    """
+    Converts the grader output files of the given Assignment as described
+    in compressGraderOutputs, generating the new path of each converted 
+    file in turn.  Does not update the submission index.
+    """
+    ext = getGraderOutputExt()
+    for directory in assignment.getDirs():
+        for fn in sorted(os.listdir(directory)):
+            match = matchGraderOutput(fn)
+            if not match or match.group(6) == ext:
+                continue
+            old = os.path.join(directory, fn)
+            new = old[:-len(match.group(6))] + ext
+            # hidden from globs until complete
+            temp = os.path.join(directory, '.' + os.path.basename(new))
+            with lockSubmission(fn):
+                if not os.path.exists(old):
+                    continue  # changed since listed
+                with openFile(old, 'rb') as filein:
+                    with openFile(temp, 'wb') as fileout:
+                        shutil.copyfileobj(filein, fileout)
+                shutil.copystat(old, temp)
+                os.rename(temp, new)
+                os.remove(old)
+            yield new
+
+def migrate(assignments=None):
+    """
+    Moves the graded files of the given assignment names (or of all
+    assignments, if None) into the current layout, as per moveToLayout.
+    Rebuilds the submission index if it is in use.  Returns a (moved,
+    skipped) tuple of total file counts.
+    """
+    from core_type import getAssignment
+    import core_index
+
+    moved = skipped = 0
+    for name in (assignments or tamarin.getAssignments()):
+        counts = moveToLayout(getAssignment(name))
+        moved += counts[0]
+        skipped += counts[1]
+    if moved and tamarin.USE_SUBMISSION_INDEX:
+        core_index.rebuild()
+    return moved, skipped
+
+def hashFile(path):
+    """ Returns the SHA-256 hex digest of the contents of the given file. """
+    sha = hashlib.sha256()
+    with open(path, 'rb') as filein:
+        for chunk in iter(lambda: filein.read(BLOB_CHUNK_SIZE), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def getBlobPath(digest):
+    """ Returns the path in BLOB_ROOT of the blob with the given digest. """
+    return os.path.join(tamarin.BLOB_ROOT, digest[:2], digest)
+
+def storeBlob(path):
+    """
+    Stores the contents of the (loose) file at the given path in BLOB_ROOT, 
+    if that is set.  If there is already a blob with the same contents, the 
+    file is replaced by a hardlink to it; otherwise, the file becomes the
+    new blob.  Returns the path of the blob, or None if BLOB_ROOT is not set
+    or the file could not be linked (such as if on another filesystem).
+    """
+    if not tamarin.BLOB_ROOT or isArchived(path):
+        return None
+    blob = getBlobPath(hashFile(path))
+    try:
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        try:
+            os.link(path, blob)
+        except FileExistsError:
+            if os.path.samefile(path, blob):
+                return blob
+            if not filecmp.cmp(path, blob, shallow=False):
+                return None  # blob was modified in place, so leave this be
+            # hidden from globs until complete
+            temp = os.path.join(os.path.dirname(path), 
+                                '.' + os.path.basename(path))
+            if os.path.exists(temp):
+                os.remove(temp)
+            os.link(blob, temp)
+            os.replace(temp, path)
+    except OSError:
+        return None
+    return blob
+
+def getBlobStats():
+    """
+    Returns a dict of statistics on the files in BLOB_ROOT: the number of 
+    'blobs', their total size ('stored' bytes), the number of files linked
+    to them ('files') and the total size of those ('logical' bytes), and 
+    the number and size ('orphaned' bytes) of 'orphans' that are no longer
+    linked to by any file.  'saved' is the number of bytes saved by storing
+    each linked blob only once.
+    """
+    stats = dict.fromkeys(['blobs', 'stored', 'files', 'logical', 
+                           'orphans', 'orphaned', 'saved'], 0)
+    if not tamarin.BLOB_ROOT or not os.path.isdir(tamarin.BLOB_ROOT):
+        return stats
+    for dirpath, dirnames, filenames in os.walk(tamarin.BLOB_ROOT):
+        for fn in filenames:
+            stat = os.stat(os.path.join(dirpath, fn))
+            stats['blobs'] += 1
+            stats['stored'] += stat.st_size
+            stats['files'] += stat.st_nlink - 1
+            stats['logical'] += stat.st_size * (stat.st_nlink - 1)
+            if stat.st_nlink == 1:
+                stats['orphans'] += 1
+                stats['orphaned'] += stat.st_size
+    stats['saved'] = stats['logical'] - (stats['stored'] - stats['orphaned'])
+    return stats
+
+def dedupe():
+    """
+    Stores every loose submitted file (in SUBMITTED_ROOT and each 
+    assignment's directories) in BLOB_ROOT, as per storeBlob.  Then
+    removes any orphaned blobs no longer linked to by any file, such as 
+    after an assignment is archived.  Returns a (stored, removed) tuple of
+    file counts.
+    """
+    if not tamarin.BLOB_ROOT:
+        return 0, 0
+    stored = sum(1 for f in getLooseFiles() 
+                 if os.path.isfile(f) and storeBlob(f))
+    return stored, removeOrphanedBlobs()
+
+def getLooseFiles():
+    """
+    Returns a list of the paths of every loose submitted file: those in 
+    SUBMITTED_ROOT and each assignment's directories.  (Copies made by the
+    strip tool are left out, since the janitor expires them by their 
+    modification times, which any file linked to a blob shares.)
+    """
+    from core_type import getAssignment
+
+    files = [os.path.join(tamarin.SUBMITTED_ROOT, fn) 
+             for fn in os.listdir(tamarin.SUBMITTED_ROOT)
+             if re.match(tamarin.SUBMITTED_RE, fn)]
+    for name in tamarin.getAssignments():
+        assignment = getAssignment(name)
+        for directory in assignment.getDirs():
+            files.extend(os.path.join(directory, fn) 
+                         for fn in os.listdir(directory)
+                         if fn.endswith('.' + assignment.type.fileExt) and
+                         re.match(tamarin.SUBMITTED_RE, fn))
+    return files
+
+def removeOrphanedBlobs():
+    """
+    Removes any blobs in BLOB_ROOT no longer linked to by any file, such as
+    after an assignment is archived.  Returns the number removed.
+    """
+    removed = 0
+    for dirpath, dirnames, filenames in os.walk(tamarin.BLOB_ROOT):
+        for fn in filenames:
+            if os.stat(os.path.join(dirpath, fn)).st_nlink == 1:
+                os.remove(os.path.join(dirpath, fn))
+                removed += 1
+    return removed
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] in (['archive'], ['unpack']):
+        from core_type import getAssignment
+        for name in sys.argv[2:]:
+            if sys.argv[1] == 'archive':
+                print("Packed", archive(getAssignment(name)), "files of", 
+                      name, "into its archive.")
+            else:
+                print("Unpacked", unpack(getAssignment(name)), "files of", 
+                      name, "from its archive.")
+    elif sys.argv[1:2] == ['compress']:
+        from core_type import getAssignment
+        form = 'compressed' if tamarin.COMPRESS_GRADER_OUTPUT else 'plain'
+        for name in (sys.argv[2:] or tamarin.getAssignments()):
+            print("Converted", compressGraderOutputs(getAssignment(name)), 
+                  "grader output files of", name, "to", form, "text.")
+    elif sys.argv[1:2] == ['dedupe']:
+        stored, removed = dedupe()
+        print("Stored", stored, "files by content in", tamarin.BLOB_ROOT, 
+              "and removed", removed, "orphaned blobs.")
+    elif sys.argv[1:2] == ['blobstats']:
+        stats = getBlobStats()
+        print(stats['files'], "files are stored as", stats['blobs'], 
+              "blobs in", tamarin.BLOB_ROOT)
+        print("Files total", stats['logical'], "bytes; blobs total", 
+              stats['stored'], "bytes, so", stats['saved'], "bytes saved.")
+        if stats['orphans']:
+            print(stats['orphans'], "blobs (" + str(stats['orphaned']), 
+                  "bytes) are orphaned; run 'dedupe' to remove them.")
+    else:
+        layout = 'per-user' if tamarin.SHARD_GRADED_BY_USER else 'flat'
+        moved, skipped = migrate(sys.argv[1:])
+        print("Moved", moved, "files into the", layout, "layout.", end=' ')
+        print("Skipped", skipped, "files that already existed there.")
@@ -1,765 +1,1221 @@
-
-## core_type.py
-
-"""
-The definition of core classes used by Tamarin.
-Except for Process and subclasses, which are in core_grade.
-
-Part of Tamarin, by Zach Tomaszewski.  
-Created: 30 Jun 2012.
-"""
-
-import datetime
-import glob
-import math
-import os.path
-import re
-
-
-class TamarinError(Exception):
-    """
-    Represents some sort of error status code, usually in the 400s or 500s.
-    See STATUS for more.
-    """
-
-    def __init__(self, key, details=None):
-        """
-        The first argument given should be a legal STATUS key for the 
-        specific error.  Additional details may also be given as an 
-        extra argument.
-        
-        If key is not valid, it may be treated as a special error message
-        instead.
-        
-        Arguments may later be retrieved either as Exception args or 
-        instance variables.
-        """
-        Exception.__init__(self, key, details)
-        self.key = key
-        self.details = details
-
-    def __repr__(self):
-        return 'TamarinError(' + repr(self.key) + ', ' + \
-                repr(self.details) + ')'
-
-
-class SubmissionType:
-    
-    # Future considerations:
-    # * More than one possible file ext, such as for html and htm?
-    # * More than one submission type per assignment?
-    # * Currently check at upload: initial cap.  Convert to an UploadCheck
-    #   system similar to Process system, where can run multiple checks
-    #   based only on filename and filecontents before accepting upload?
-    #   Warn or Refuse.
-    #   Examples: warn about useing "package" declaration in code, ...? 
-    
-    """
-    Determines how Tamarin processes submissions of the given type.
-    
-    Each Assignment has an single associated SubmissionType, as determined by
-    the SUBMISSION_TYPES global.  Each SubmissionType contains the following
-    details:
-
-    * fileExt  - the required file extension, such 'java' or 'txt' or 'zip'
-    * encoding - If specified, all submissions must be plain text of the given
-                 encoding.  ('utf-8' is the default.  However, if your compiler
-                 doesn't support "Unicode" source code files or if you want to
-                 be strictly traditional, 'ascii' works well.)  If set to None,
-                 submissions are assumed to be a binary file and so are not 
-                 displayed by Tamarin.
-    * preformatted - If True, displays text in <PRE> tag, appropriate for code.
-                     Otherwise, allows for line-wrapping, better for text.
-    * initialCap - Whether filename must start with an initial capital letter.
-    * processes - an ordered list of Process objects that determine how each
-                  submission is processed for grading purposes.  If list is
-                  None or empty, does nothing except take the submission.   
-    """
-    def __init__(self, fileExt, encoding='UTF-8', preformatted=True,
-                 initialCap=False, processes=[]):
-        self.fileExt = fileExt
-        self.encoding = encoding
-        self.preformatted = preformatted
-        self.initialCap = initialCap        
-        self.processes = processes
-
-
-class LatePolicy:
-    """
-    A policy that specifies grade changes based on a submission's timestamp.
-    
-    Each policy covers a specific timespan (range).  One end of the span is
-    the assignment's deadline.  Most ranges will then extend to after the 
-    deadline, but it is possible to specify a preceding time range in order 
-    to implement bonus points for early submission.  Each timespan corresponds
-    to a single rule that specifies how a final grade should be modified for 
-    submissions submitted during that timespan.  See __init__ for details of 
-    how to specify policies, including the format for a timespan range and the 
-    corresponding rule.  
-    
-    An assignment may have more than one LatePolicy.  This allows for both
-    a "negative" bonus point late policy for early submission as well as a
-    late policy.  It is also useful for different policies depending on the
-    degree of lateness.  (For example, 2 points off for the first 2 days late
-    and then 5 points off for up to 5 days late would require 2 separate 
-    policies.) If a submission falls within more than one overlapping timespan
-    specified by 2 or more policies, the rule of the shortest (ie, closest to 
-    the deadline) applicable timespan is applied.  It is an error to give an 
-    assignment more that one LatePolicy covering the exact same timespan.  
-    
-    If an assignment is submitted after the deadline and after the last 
-    post-deadline span (if any), it will not be accepted by Tamarin.  
-    The submission is too late.
-    
-    Once in the system, an assignment timestamped before the first pre-deadline
-    span (if any) is treated as having a timestamp of the start of that span.
-    Similarly, those timestamped after the last post-deadline span are treated
-    as if submitted at the final cutoff time.  For example, if an instructor 
-    manually uploads a submission timestamped after the final cutoff date, 
-    the longest span late policy will still be applied to that submission.
-    
-    LatePolicies have no effect on letter grades, such as ERR, OK, or X.
-    
-    """
-    def __init__(self, policy, deadline):
-        """
-        Constructs a LatePolicy according to the given policy string.
-
-        The deadline should be in Tamarin timestamp format.  
-                
-        Each policy should be a string in the form of: 'range:rule'
-        
-        A range has the following format: [+|-][[#d][#h][#m]|timestamp]
-        
-        That is, the range may optionally begin with either + or -.  
-        If the sign is omitted, + is assumed.  
-        
-        The sign may then be followed by a span specified in days, 
-        hours, and minutes.  This span is relative to the assignment deadline,
-        either earlier (if sign is -) or later (if sign is +).  A particular
-        unit may be omitted if unused; it will be assumed to be 0.  If more 
-        than 23 hours or 59 minutes are specified, the corresponding overflow 
-        into days and hours will be calculated.  At least one unit must be
-        given though: d for day, h for hours, or m for minutes.  If more
-        than one is used, they must be in that order.
-        
-        As an alternative to specifying a relative span, a specific timestamp
-        may be given. The sign is ignored in these cases. (Since LatePolicies 
-        usually apply across multiple assignments, specific timestamps are 
-        rare.  However, they can be handy to specify a final cutoff date for 
-        all assignments--such as the last day of the course.)  
-        
-        It is an error to have a 0 length span, either because the relative
-        span is of size 0 or if the timestamp given is equal to the deadline.
-        
-        If neither span nor timestamp is given, the end of the span is 
-        treated as year 0 for a - sign or year 9999 for a positive sign.
-                
-        The range is then separated from the associated rule by a colon (:).
-        
-        The rule is of the form: [+|-|=][#[%|$]][/[#d][#h][#m]]
-
-        That is, the rule may begin with a sign: +, -, or =.  If omitted,
-        = is assumed.  The sign specifies whether the grade should be 
-        increased by (+), decreased (-) by, or set equal to (=) the following
-        value. 
-        
-        The sign is followed by an integer value, which may be appended by 
-        either % or $.  Without a modifier, the value is treated as a raw 
-        point modifier.  If appended with a %, this is a percentage of the 
-        assignment's total possible score.  If appended with a $, 
-        it is a percentage of the submission's actual score.  (If the actual
-        score to be modified is not numeric, will default to % instead.)
-        
-        Optionally, the modifier may be followed by a / and relative span.
-        At least one value--whether day, hour, or minutes--must be given
-        after a /.  When such a span is given, the modifier is applied for 
-        each span that the assignment is late.  For example, /1d means apply
-        the modifier for each day.  Such as span does nothing if applied to 
-        an = modifier.  If this rule is associated with a -timespan ("bonus 
-        policy"), it is applied for each full span. Otherwise, it is applied 
-        for each partial span.
-        
-        The rule may be omitted.  In this case, the submission is marked late
-        (or early), but no grade change is applied.
-                
-        Examples:
-        +5d:-1/1d - For up to 5 days after the deadline, submissions suffer 
-        a penalty of 1 point off for each (partial) day.
-        
-        +48h:-10% - For 2 days after the deadline, any submission loses 10% 
-        of the assignment total.  (So, for a 5 point assignment, this would 
-        be -1 point.)  Equivalent to '2d:-10%' (if relying on the assumed 
-        + sign on the timespan).
-        
-        -3d:+5$/1d - An example of an "early bonus" policy, this grants a 
-        cumulative bonus of 5 percent of the submission's score for each full 
-        day early.
-        
-        20121221-1200:40$ - Using a timestamp to define the span, anything 
-        submitted after the deadline but before noon on 21 Dec 2012 will 
-        receive 40% of the score it would otherwise have received.  
-        (:=40$ or :-60$ would also have been equivalent rules, since = is 
-        assumed on rules without a sign.)
-        
-        1d: - Anything submitted for up to 1 day past the deadline is marked
-        as late but its grade is unaffected.
-        
-        Given only the policies above, any submissions later than the deadline
-        plus the given late period timespan would be refused by Tamarin.
-        
-        +:10% - Anything submitted after the deadline, no matter how late or 
-        how bad, is given 10% of the total possible assignment value.  
-        
-        : - Anything submitted after the deadline is late but still accepted.
-        
-        """
-        import tamarin
-        self.raw = policy
-        self.deadline = deadline
-        assert re.match(r'\d{8}-\d{4}', self.deadline)
-                
-        span_re = r'(\+|-)?((\d{8}-\d{4})|((\d+d)?(\d+h)?(\d+m)?))'
-        rule_re = r'(\+|-|=)?(\d*)([%$])?(/(\d+d)?(\d+h)?(\d+m)?)?'
-        parsed = re.match(span_re + ':' + rule_re, policy)
-        if not parsed:
-            raise TamarinError('INVALID_LATE_POLICY', policy)
-
-        (self.span_sign, unused_offset, self.span_timestamp, 
-         relative, self.span_day, self.span_hour, self.span_minute,
-         self.rule_sign, self.rule_value, self.rule_unit, 
-         self.rule_repeater, 
-         self.rule_day, self.rule_hour, self.rule_minute) = parsed.groups()
-        
-        #apply defaults and constrains
-        if not self.span_sign:
-            self.span_sign = '+'
-        
-        if self.span_timestamp:
-            self.end = self.span_timestamp
-        elif relative:
-            day = hour = minute = 0
-            sign = -1 if self.span_sign == '-' else 1           
-            if self.span_day:
-                day = int(self.span_day[:-1]) * sign
-            if self.span_hour:
-                hour = int(self.span_hour[:-1]) * sign
-            if self.span_minute:
-                minute = int(self.span_minute[:-1]) * sign
-            endDate = tamarin.convertTimestampToTime(deadline)            
-            shift = datetime.timedelta(days=day, hours=hour, minutes=minute)
-            self.end = tamarin.convertTimeToTimestamp(endDate + shift)
-        else:
-            if self.span_sign == '-':
-                self.end = '00000101-0000'
-            else: 
-                self.end = '99991231-2359'
-        
-        if self.end == self.deadline:
-            raise TamarinError('INVALID_LATE_POLICY', 
-                               "Parsable, but deadline == endpoint.")
-
-        if self.rule_sign or self.rule_value or self.rule_unit or \
-                self.rule_repeater:
-            #some part of a rule given, so lets see if it's all valid
-            if not self.rule_sign:
-                self.rule_sign = '='
-            if not self.rule_value:
-                raise TamarinError('INVALID_LATE_POLICY', 
-                                   "No grade change value given.")
-            self.rule_value = int(self.rule_value)
-            if self.rule_repeater and not self.rule_day and \
-                    not self.rule_hour and not self.rule_minute:
-                raise TamarinError('INVALID_LATE_POLICY', 
-                                   "Empty /modifier given: " + self.raw)
-            
-    def getGradeAdjustment(self, score, total, timestamp, allowNeg=True):
-        """
-        Given the submission's score, assignment total, and timestamp,
-        returns the adjustment based on this policy. Respects 
-        tamarin.GRADE_PRECISION.  
-        
-        Normally, returns the adjustment even if this is a penalty greater than
-        the score itself.  If allowNeg is False, any computed penalty is 
-        capped at -score.
-        
-        Remember, if passed a non-numeric score, any $ rules will convert to
-        % instead.  This way, a numeric value can always be returned.  
-                
-        """
-        import tamarin
-        if self.span_sign == '+':
-            assert self.deadline < timestamp
-            timestamp = min(timestamp, self.end)
-            timespan = (tamarin.convertTimestampToTime(timestamp) -
-                        tamarin.convertTimestampToTime(self.deadline)) 
-        else:
-            assert timestamp <= self.deadline
-            timestamp = max(timestamp, self.end)
-            timespan = (tamarin.convertTimestampToTime(self.deadline) -
-                        tamarin.convertTimestampToTime(timestamp)) 
-
-        if not self.rule_sign:
-            #no rule, which means do nothing to the grade
-            return 0 
-            
-        if not self.rule_unit:
-            modifier = self.rule_value 
-        elif self.rule_unit == '$' and \
-                (isinstance(score, int) or isinstance(score, float)):
-            modifier = (self.rule_value * score) / 100
-        else:   # self.rule_unit == '%', or '$' with non-numeric 
-            modifier = (self.rule_value * total) / 100
-                    
-        if self.rule_sign == '-':
-            modifier *= -1
-        
-        times = 1
-        if self.rule_repeater and not self.rule_sign == '=':
-            days = int(self.rule_day[:-1]) if self.rule_day else 0
-            hours = int(self.rule_hour[:-1]) if self.rule_hour else 0
-            minutes = int(self.rule_minute[:-1]) if self.rule_minute else 0
-            repeater = datetime.timedelta(days=days, hours=hours, 
-                                        minutes=minutes)
-            times = timespan / repeater
-            if self.span_sign == '+':
-                times = math.ceil(times)  #include any partial repeater span
-            else:
-                times = math.floor(times) #only complete repeater span
-            
-        gradeAdj = round(modifier * times, tamarin.GRADE_PRECISION)        
-        if not allowNeg and score + gradeAdj < 0:
-            gradeAdj = -score
-        return gradeAdj
-    
-    def isEarlyPolicy(self):
-        """ 
-        An early policy is one that covers a span before the deadline.
-        Returns False if this policy covers a span after the deadline.
-        """
-        return self.end < self.deadline
-
-    def __str__(self):
-        """ Returns the original late policy format string. """
-        return self.raw
-
-    def __repr__(self):
-        """ Shows the original late policy format string and deadline. """
-        return ''.join((self.__class__.__name__, 
-                       "('", self.raw, "', '", self.deadline, "')")) 
-
-    
-class Assignment:
-    """
-    Represents an assignment folder, as found in the GRADED_ROOT directory.
-
-    Thus, an Assignment instance includes the assignment's due date, 
-    total point value, submission type, etc. If the total point value 
-    or type is not defined explicitly by the directory name itself, 
-    ASSIGNMENT_TOTAL or ASSIGNMENT_TYPE is used instead. 
-    """
-    def __init__(self, assignment):
-        """
-        Given the assignment name in the form of ASSIGNMENT_RE, loads
-        the details of the assignment as an object.  Details include:
-
-        * name -- short general name, of the form A##a
-        * path -- the complete path to the assignment directory
-        * dir  -- just the directory name
-        * due  -- when the assignment is due (in Tamarin timestamp format)
-        * maxScore -- the max score or total value of this assignment
-        * type -- the required SubmissionType for submissions
-        * policies -- a sorted list of LatePolicies 
-
-        If the given assignment name is not of the correct format, throws an
-        AssertionError.
-
-        If the given assignment does not exist, throws a TamarinError
-        with one of the following keys: 'NO_SUCH_ASSIGNMENT',
-        'DUPLICATED_ASSIGNMENTS', 'BAD_ASSIGNMENT_DIR_FORMAT', or
-        'UNHANDLED_TYPE'.
-        """
-        import tamarin
-        assert re.match(tamarin.ASSIGNMENT_RE, assignment), \
-            'Bad assignment format given.'
-        assignDir = glob.glob(os.path.join(tamarin.GRADED_ROOT, 
-                                           assignment + '-*'))
-        if not assignDir:
-            raise TamarinError('NO_SUCH_ASSIGNMENT', assignment)
-        elif len(assignDir) > 1:
-            #more than one matching directory found
-            raise TamarinError('DUPLICATED_ASSIGNMENTS', assignment)
-
-        #load object (part 1/2)
-        self.name = assignment
-        self.path = assignDir[0]
-        self.dir = os.path.basename(self.path)
-        
-        #get details from dir name
-        assignmentFormat = assignment + r"-(\d{8}-\d{4})(-(\d+))?(-(\w+))?$"
-        match = re.match(assignmentFormat, self.dir)
-        if not match: 
-            raise TamarinError('BAD_ASSIGNMENT_DIR_FORMAT', self.dir)
-
-        #load object (part 2/2)
-        self.due = match.group(1)      
-        if match.group(3):
-            self.maxScore = int(match.group(3))
-        else:
-            self.maxScore = tamarin.ASSIGNMENT_TOTAL
-        if match.group(5):
-            typeName = str(match.group(5))
-        else:
-            typeName = tamarin.ASSIGNMENT_TYPE
-        if typeName in tamarin.SUBMISSION_TYPES:
-            self.type = tamarin.SUBMISSION_TYPES[typeName]
-        else:
-            raise TamarinError('UNDEFINED_TYPE', typeName)
-        
-        # load late polices: longest of all possible key matches
-        possible = [key for key in tamarin.LATE_POLICIES.keys() \
-                        if self.name.startswith(key)]
-        if possible:
-            key = sorted(possible, key=len)[-1]
-            if not tamarin.LATE_POLICIES[key]:
-                # corresponding key has no policy value
-                self.policies = None
-            elif isinstance(tamarin.LATE_POLICIES[key], str):
-                # key corresponds to a single policy, so put in list
-                self.policies = [LatePolicy(tamarin.LATE_POLICIES[key], 
-                                            self.due)]
-            else:
-                # multiple policies, so convert and sort for later
-                self.policies = [LatePolicy(p, self.due) for p in \
-                                    tamarin.LATE_POLICIES[key]]
-                self.policies.sort(key=lambda policy: policy.end)                
-        else:
-            self.policies = None
-
-    def __str__(self):
-        """ Returns just the short name of this assignment """
-        return str(self.name)
-    
-    def getLateOffset(self, submittedTimestamp=None):
-        """
-        Returns a string in the format of '+#d #h #m' showing the lateness of
-        the given Tamarin timestamp.
-        
-        If a timestamp is not given, will use the current time instead.
-        If the given timestamp is before this assignment's deadline, will
-        return a negative offset showing how early the submission is.
-        """
-        # convert to datetimes
-        import tamarin
-        submitted = tamarin.convertTimestampToTime(submittedTimestamp)
-        deadline = tamarin.convertTimestampToTime(self.due)
-        # to avoid dealing with negative timedeltas (which are weird)
-        if submitted <= deadline:
-            offset = deadline - submitted
-            sign = '-'
-        else:
-            offset = submitted - deadline
-            sign = '+'
-        hours = offset.seconds // 3600
-        minutes = (offset.seconds // 60) - (hours * 60)
-        return '{0}{1}d {2}h {3:02}m'.format(sign, offset.days, hours, minutes)
-
-    def getPolicy(self, submittedTimestamp=None):
-        """
-        Returns the appropriate policy associated with this assignment based
-        on the given timestamp.  If no timestamp is given, uses the current
-        time.  May return None if this assignment has no late policies, or if
-        the given timestamp is before the deadline but there is no early 
-        submission policy.
-        """
-        import tamarin
-        if not submittedTimestamp:
-            # use current time
-            submittedTimestamp = tamarin.convertTimeToTimestamp()        
-        timestamp = submittedTimestamp 
-
-        if not self.policies:
-            return None
-        elif self.isLate(timestamp):
-            if self.policies[-1].isEarlyPolicy():
-                # only have early policies, though, so none apply
-                return None
-            else:
-                # find last late policy that applies (even if past last one)
-                for policy in self.policies:
-                    if not policy.isEarlyPolicy() and timestamp <= policy.end:
-                        break
-                return policy                
-        else:
-            if not self.policies[0].isEarlyPolicy():
-                # submission is early, but only have late policies
-                return None
-            else:
-                #find closest-to-deadline early policy that applies (or first)
-                for policy in reversed(self.policies):
-                    if policy.isEarlyPolicy() and timestamp >= policy.end:
-                        break
-                return policy
-
-    def isLate(self, submittedTimestamp=None):
-        """
-        Determines whether the submittedTimestamp (in 'YYYYMMDD-HHMM' format)
-        occurs before this assignment's deadline.  If submittedTimestamp is 
-        None, uses the current time.
-        """
-        import tamarin
-        if not submittedTimestamp:
-            # use current time
-            submittedTimestamp = tamarin.convertTimeToTimestamp()
-        # nice thing about Tamarin timestamps is they also compare properly 
-        return submittedTimestamp > self.due
-    
-    def isTooLate(self, submittedTimestamp=None):
-        """
-        Determines whether the submittedTimestamp (in 'YYYYMMDD-HHMM' format)
-        occurs after this assignment's deadline AND after all late policies.  
-        If submittedTimestamp is None, uses the current time.
-        """
-        import tamarin
-        if not submittedTimestamp:
-            # use current time
-            submittedTimestamp = tamarin.convertTimeToTimestamp()
-        if self.policies:
-            # just look at last one (already sorted)
-            return submittedTimestamp > self.policies[-1].end
-        else:
-            return self.isLate()
-        
-
-class SubmittedFile:
-    """
-    Represents a file in SUBMITTED_ROOT that has completed its validation by 
-    submit.py and has been timestamped.  The file must exist in SUBMITTED_ROOT
-    unless virtualFile is True.
-    
-    Details include:
-    * filename   - the basename of the file
-    * path       - the full path of the file (including the filename)
-    * username   - username of the file's author/submitter, as taken from
-                   filename (so may not be all lowercase).
-    * assignment - the name of the assignment this file was submitted for
-                   (as str, not Assignment object)
-    * timestamp  - when the file was submitted, as a Tamarin timestamp
-    * fileExt    - the file extension
-    * originalFilename - the uploaded filename without the added embedded 
-                         timestamp    
-    """
-    def __init__(self, filename, virtualFile=False):
-        """
-        Constructs a SubmittedFile for the given base filename (no path).  
-        
-        If the given filename is not of the correct format, throws a
-        TamarinError('BAD_GRADE_FILENAME').
-        
-        The given file does must exist in a SUBMITTED_ROOT subdirectory or else 
-        throws a TamarinError('NO_SUBMITTED_FILE').
-        
-        """
-        import tamarin
-        #confirm format of filename        
-        fileMatch = re.match(tamarin.SUBMITTED_RE, filename)
-        if not fileMatch:
-            raise TamarinError('BAD_GRADE_FILENAME', filename)
-        self.filename = filename
-    
-        #check that file really exists.
-        self.path = os.path.join(tamarin.SUBMITTED_ROOT, filename)
-        if not virtualFile and not os.path.exists(self.path):
-            raise TamarinError('NO_SUBMITTED_FILE', filename)
-    
-        #load details from above match
-        self.username = fileMatch.group(1)
-        self.assignment = fileMatch.group(2)
-        self.timestamp = fileMatch.group(3)
-        self.fileExt = fileMatch.group(4)
-        self.originalFilename = fileMatch.group(1) + fileMatch.group(2) + \
-                                    '.' + fileMatch.group(4)
-                                    
-    def __str__(self):
-        """ Returns this submitted file's filename. """
-        return self.filename
-    
-    def __repr__(self):
-        return self.__class__.__name__ + "('" + self.filename + "')"
-
-
-class GradedFile(SubmittedFile):
-    """
-    Represents a file in a GRADED_ROOT subdirectory that has completed the 
-    grading process.  The corresponding file must exist in the appropriate
-    GRADED_ROOT subdirectory.
-    
-    Details are the same as for a SubmittedFile, plus:
-    
-    * assign - the Assignment object for the str in self.assignment
-    * graderOutputPath - the full path to the grader output file
-    * graderOutputFilename - just the base name of the grader output file
-    * grade - the grade from the grader file (or ERR if it can't be found)
-    * humanVerified - the grade has been verified by a human
-    * humanComment - whether a human has appended a comment to the output file
-    
-    """
-    def __init__(self, filename):
-        """
-        Constructs a new GradeFile for the given file.
-        
-        Throws the same TamarinErrors as a SubmittedFile.  
-        May also throw any of the errors from the Assignment constructor.
-    
-        """
-        import tamarin
-        #let superclass initialize everything
-        super().__init__(filename, virtualFile=True)
-        #now reset path variable
-        self.assign = Assignment(self.assignment)
-        self.path = os.path.join(self.assign.path, filename)
-        if not os.path.exists(self.path):
-            raise TamarinError('NO_SUBMITTED_FILE', filename)
-
-        #add new details            
-        self.graderOutputPath = self.path.replace("." + self.fileExt, 
-                                    "-*." + tamarin.GRADER_OUTPUT_FILE_EXT)
-        gradedGlob = glob.glob(self.graderOutputPath)
-        if not gradedGlob:
-            raise TamarinError('NO_GRADER_RESULTS', filename)
-        elif len(gradedGlob) > 1:
-            raise TamarinError('MULTIPLE_GRADER_RESULTS', filename)
-        self.graderOutputPath = gradedGlob[0]
-        self.graderOutputFilename = os.path.basename(self.graderOutputPath)
-
-        # pull grade from filename
-        found = re.match(tamarin.GRADED_RE, self.graderOutputFilename)
-        try:
-            self.grade = float(found.group(4))
-        except ValueError:
-            self.grade = str(found.group(4))
-            if not self.grade:
-                self.grade = 'ERR' #empty string, as on a grader failure
-
-        # human verified or comments?
-        human = found.group(5)
-        if human:
-            self.humanVerified = 'H' in human
-            self.humanComment = 'C' in human
-        else:
-            self.humanVerified = False
-            self.humanComment = False                
-                
-    def getLateOffset(self):
-        """ As per Assignment.getLateOffset for this submission. """
-        return self.assign.getLateOffset(self.timestamp)
-    
-    def getLateGradeAdjustment(self):
-        """
-        Returns the penalty or bonus due to the LatePolicy associated
-        with this assignment.  See LatePolicy.getGradeAdjustment.
-        Does not cap the late penalty (may be more than score itself).
-        Returns 0 if there is no late policy (as when isTooLate).
-        """
-        policy = Assignment(self.assignment).getPolicy(self.timestamp)
-        if not policy:
-            return 0
-        else:
-            return policy.getGradeAdjustment(self.grade, 
-                                             self.assign.maxScore,
-                                             self.timestamp)
-    
-    def getResubmissionGradeAdjustment(self, submissionCount=None):
-        """
-        Returns the penalty due to additional submissions for this assignment.
-
-        Penalty can be more than can be covered by the grade itself. 
-        Returns the penalty even for non-numeric grades. 
-        
-        The submissionCount is a performance boost.  If the number of 
-        submissions (including this one) is given here, will be used instead
-        of polling the file system to (re)collect the same data. 
-        
-        """
-        import tamarin
-        if not submissionCount:
-            # need to count the files here
-            files = tamarin.getSubmissions(user=self.username, 
-                                           assignment=self.assignment)
-            submissionCount = len(files)            
-
-        if submissionCount <= 1:
-            return 0
-        else:            
-            adj = (submissionCount - 1) * tamarin.RESUBMISSION_PENALTY
-            return round(adj, tamarin.GRADE_PRECISION)
-            
-    def getAdjustedGrade(self, submissionCount=None):
-        """ 
-        Returns this file's grade after adjustments for lateness or 
-        resubmissions.  See getLateGradedAjustment and 
-        getResubmissionGradeAdjustment.  Normalizes grade based on 
-        tamarin.GRADE_PRECISION.
-        
-        Non-numeric grades cannot be updated, and so these are returned
-        unchanged.  Also, does not allow for negative grades, so will 
-        return 0 instead if cumulative penalties are more than the grade.
-        
-        For the raw score returned by the grader, use self.grade directly.
-                
-        """
-        import tamarin
-        if isinstance(self.grade, str):
-            return self.grade
-        adjGrade = self.grade
-        adjGrade += self.getLateGradeAdjustment() 
-        adjGrade += self.getResubmissionGradeAdjustment(submissionCount)
-        adjGrade = round(adjGrade, tamarin.GRADE_PRECISION)
-        if adjGrade < 0:
-            adjGrade = 0
-        return adjGrade
-    
-    def isLate(self):
-        """ As per Assignment.isLate for this submission. """
-        self.assign.isLate(self.timestamp)
-
-    def isTooLate(self):
-        """ As per Assignment.isTooLate for this submission. """
-        self.assign.isTooLate(self.timestamp)
-    
-    def update(self):
-        """
-        Renames the corresponding file to correspond to current object state.
-         
-        Computes the correct grader output filename based on this graded
-        file's current details, including grade, comments, and verified
-        status.  If this is different than self.graderOutputFilename, 
-        graderOutputFilename is updated and the corresponding file is
-        renamed/moved.  graderOutputPath is also updated.
-        
-        Returns whether the file was actually renamed.
-        
-        """
-        import tamarin
-        
-        # construct current graderOutputFilename (gof)
-        gof = self.username + self.assignment 
-        gof += '-' + self.timestamp + '-' + str(self.grade)
-        if self.humanVerified or self.humanComment:
-            gof += '-'
-            if self.humanVerified:
-                gof += 'H'
-            if self.humanComment:
-                gof += 'C'
-        gof += '.' + tamarin.GRADER_OUTPUT_FILE_EXT
-        
-        if gof != self.graderOutputFilename:
-            # update file
-            gop = os.path.join(os.path.dirname(self.graderOutputPath), gof)
-            os.rename(self.graderOutputPath, gop)
-            self.graderOutputPath = gop
-            self.graderOutputFilename = gof
-            return True
-        else:
-            return False
-
+
+## core_type.py
+
+"""
+The definition of core classes used by Tamarin.
+Except for Process and subclasses, which are in core_grade.
+
+Part of Tamarin, by Zach Tomaszewski.  
+Created: 30 Jun 2012.
+"""
+
+import datetime
+import glob
+import json
+import math
+import os
+import os.path
+import re
+
+
+class TamarinError(Exception):
+    """
+    Represents some sort of error status code, usually in the 400s or 500s.
+    See STATUS for more.
+    """
+
+    def __init__(self, key, details=None):
+        """
+        The first argument given should be a legal STATUS key for the 
+        specific error.  Additional details may also be given as an 
+        extra argument.
+        
+        If key is not valid, it may be treated as a special error message
+        instead.
+        
+        Arguments may later be retrieved either as Exception args or 
+        instance variables.
+        """
+        Exception.__init__(self, key, details)
+        self.key = key
+        self.details = details
+
+    def __repr__(self):
+        return 'TamarinError(' + repr(self.key) + ', ' + \
+                repr(self.details) + ')'
+
+
+class SubmissionType:
+    
+    # Future considerations:
+    # * More than one possible file ext, such as for html and htm?
+    # * More than one submission type per assignment?
+    # * Currently check at upload: initial cap.  Convert to an UploadCheck
+    #   system similar to Process system, where can run multiple checks
+    #   based only on filename and filecontents before accepting upload?
+    #   Warn or Refuse.
+    #   Examples: warn about useing "package" declaration in code, ...? 
+    
+    """
+    Determines how Tamarin processes submissions of the given type.
+    
+    Each Assignment has an single associated SubmissionType, as determined by
+    the SUBMISSION_TYPES global.  Each SubmissionType contains the following
+    details:
+
+    * fileExt  - the required file extension, such 'java' or 'txt' or 'zip'
+    * encoding - If specified, all submissions must be plain text of the given
+                 encoding.  ('utf-8' is the default.  However, if your compiler
+                 doesn't support "Unicode" source code files or if you want to
+                 be strictly traditional, 'ascii' works well.)  If set to None,
+                 submissions are assumed to be a binary file and so are not 
+                 displayed by Tamarin.
+    * preformatted - If True, displays text in <PRE> tag, appropriate for code.
+                     Otherwise, allows for line-wrapping, better for text.
+    * initialCap - Whether filename must start with an initial capital letter.
+    * processes - an ordered list of Process objects that determine how each
+                  submission is processed for grading purposes.  If list is
+                  None or empty, does nothing except take the submission.   
+    * quickProcesses - If given, an ordered list of cheaper Process objects 
+                  used for a quick, provisional first phase of grading when 
+                  the grading queue is long.  (See QUICK_PHASE_QUEUE_LENGTH.)
+                  If None, submissions are only ever graded by processes.
+    """
+    def __init__(self, fileExt, encoding='UTF-8', preformatted=True,
+                 initialCap=False, processes=[], quickProcesses=None):
+        self.fileExt = fileExt
+        self.encoding = encoding
+        self.preformatted = preformatted
+        self.initialCap = initialCap        
+        self.processes = processes
+        self.quickProcesses = quickProcesses
+
+
+class LatePolicy:
+    """
+    A policy that specifies grade changes based on a submission's timestamp.
+    
+    Each policy covers a specific timespan (range).  One end of the span is
+    the assignment's deadline.  Most ranges will then extend to after the 
+    deadline, but it is possible to specify a preceding time range in order 
+    to implement bonus points for early submission.  Each timespan corresponds
+    to a single rule that specifies how a final grade should be modified for 
+    submissions submitted during that timespan.  See __init__ for details of 
+    how to specify policies, including the format for a timespan range and the 
+    corresponding rule.  
+    
+    An assignment may have more than one LatePolicy.  This allows for both
+    a "negative" bonus point late policy for early submission as well as a
+    late policy.  It is also useful for different policies depending on the
+    degree of lateness.  (For example, 2 points off for the first 2 days late
+    and then 5 points off for up to 5 days late would require 2 separate 
+    policies.) If a submission falls within more than one overlapping timespan
+    specified by 2 or more policies, the rule of the shortest (ie, closest to 
+    the deadline) applicable timespan is applied.  It is an error to give an 
+    assignment more that one LatePolicy covering the exact same timespan.  
+    
+    If an assignment is submitted after the deadline and after the last 
+    post-deadline span (if any), it will not be accepted by Tamarin.  
+    The submission is too late.
+    
+    Once in the system, an assignment timestamped before the first pre-deadline
+    span (if any) is treated as having a timestamp of the start of that span.
+    Similarly, those timestamped after the last post-deadline span are treated
+    as if submitted at the final cutoff time.  For example, if an instructor 
+    manually uploads a submission timestamped after the final cutoff date, 
+    the longest span late policy will still be applied to that submission.
+    
+    LatePolicies have no effect on letter grades, such as ERR, OK, or X.
+    
+    """
+    def __init__(self, policy, deadline):
+        """
+        Constructs a LatePolicy according to the given policy string.
+
+        The deadline should be in Tamarin timestamp format.  
+                
+        Each policy should be a string in the form of: 'range:rule'
+        
+        A range has the following format: [+|-][[#d][#h][#m]|timestamp]
+        
+        That is, the range may optionally begin with either + or -.  
+        If the sign is omitted, + is assumed.  
+        
+        The sign may then be followed by a span specified in days, 
+        hours, and minutes.  This span is relative to the assignment deadline,
+        either earlier (if sign is -) or later (if sign is +).  A particular
+        unit may be omitted if unused; it will be assumed to be 0.  If more 
+        than 23 hours or 59 minutes are specified, the corresponding overflow 
+        into days and hours will be calculated.  At least one unit must be
+        given though: d for day, h for hours, or m for minutes.  If more
+        than one is used, they must be in that order.
+        
+        As an alternative to specifying a relative span, a specific timestamp
+        may be given. The sign is ignored in these cases. (Since LatePolicies 
+        usually apply across multiple assignments, specific timestamps are 
+        rare.  However, they can be handy to specify a final cutoff date for 
+        all assignments--such as the last day of the course.)  
+        
+        It is an error to have a 0 length span, either because the relative
+        span is of size 0 or if the timestamp given is equal to the deadline.
+        
+        If neither span nor timestamp is given, the end of the span is 
+        treated as year 0 for a - sign or year 9999 for a positive sign.
+                
+        The range is then separated from the associated rule by a colon (:).
+        
+        The rule is of the form: [+|-|=][#[%|$]][/[#d][#h][#m]]
+
+        That is, the rule may begin with a sign: +, -, or =.  If omitted,
+        = is assumed.  The sign specifies whether the grade should be 
+        increased by (+), decreased (-) by, or set equal to (=) the following
+        value. 
+        
+        The sign is followed by an integer value, which may be appended by 
+        either % or $.  Without a modifier, the value is treated as a raw 
+        point modifier.  If appended with a %, this is a percentage of the 
+        assignment's total possible score.  If appended with a $, 
+        it is a percentage of the submission's actual score.  (If the actual
+        score to be modified is not numeric, will default to % instead.)
+        
+        Optionally, the modifier may be followed by a / and relative span.
+        At least one value--whether day, hour, or minutes--must be given
+        after a /.  When such a span is given, the modifier is applied for 
+        each span that the assignment is late.  For example, /1d means apply
+        the modifier for each day.  Such as span does nothing if applied to 
+        an = modifier.  If this rule is associated with a -timespan ("bonus 
+        policy"), it is applied for each full span. Otherwise, it is applied 
+        for each partial span.
+        
+        The rule may be omitted.  In this case, the submission is marked late
+        (or early), but no grade change is applied.
+                
+        Examples:
+        +5d:-1/1d - For up to 5 days after the deadline, submissions suffer 
+        a penalty of 1 point off for each (partial) day.
+        
+        +48h:-10% - For 2 days after the deadline, any submission loses 10% 
+        of the assignment total.  (So, for a 5 point assignment, this would 
+        be -1 point.)  Equivalent to '2d:-10%' (if relying on the assumed 
+        + sign on the timespan).
+        
+        -3d:+5$/1d - An example of an "early bonus" policy, this grants a 
+        cumulative bonus of 5 percent of the submission's score for each full 
+        day early.
+        
+        20121221-1200:40$ - Using a timestamp to define the span, anything 
+        submitted after the deadline but before noon on 21 Dec 2012 will 
+        receive 40% of the score it would otherwise have received.  
+        (:=40$ or :-60$ would also have been equivalent rules, since = is 
+        assumed on rules without a sign.)
+        
+        1d: - Anything submitted for up to 1 day past the deadline is marked
+        as late but its grade is unaffected.
+        
+        Given only the policies above, any submissions later than the deadline
+        plus the given late period timespan would be refused by Tamarin.
+        
+        +:10% - Anything submitted after the deadline, no matter how late or 
+        how bad, is given 10% of the total possible assignment value.  
+        
+        : - Anything submitted after the deadline is late but still accepted.
+        
+        """
+        import tamarin
+        self.raw = policy
+        self.deadline = deadline
+        assert re.match(r'\d{8}-\d{4}', self.deadline)
+                
+        span_re = r'(\+|-)?((\d{8}-\d{4})|((\d+d)?(\d+h)?(\d+m)?))'
+        rule_re = r'(\+|-|=)?(\d*)([%$])?(/(\d+d)?(\d+h)?(\d+m)?)?'
+        parsed = re.match(span_re + ':' + rule_re, policy)
+        if not parsed:
+            raise TamarinError('INVALID_LATE_POLICY', policy)
+
+        (self.span_sign, unused_offset, self.span_timestamp, 
+         relative, self.span_day, self.span_hour, self.span_minute,
+         self.rule_sign, self.rule_value, self.rule_unit, 
+         self.rule_repeater, 
+         self.rule_day, self.rule_hour, self.rule_minute) = parsed.groups()
+        
+        #apply defaults and constrains
+        if not self.span_sign:
+            self.span_sign = '+'
+        
+        if self.span_timestamp:
+            self.end = self.span_timestamp
+        elif relative:
+            day = hour = minute = 0
+            sign = -1 if self.span_sign == '-' else 1           
+            if self.span_day:
+                day = int(self.span_day[:-1]) * sign
+            if self.span_hour:
+                hour = int(self.span_hour[:-1]) * sign
+            if self.span_minute:
+                minute = int(self.span_minute[:-1]) * sign
+            endDate = tamarin.convertTimestampToTime(deadline)            
+            shift = datetime.timedelta(days=day, hours=hour, minutes=minute)
+            self.end = tamarin.convertTimeToTimestamp(endDate + shift)
+        else:
+            if self.span_sign == '-':
+                self.end = '00000101-0000'
+            else: 
+                self.end = '99991231-2359'
+        
+        if self.end == self.deadline:
+            raise TamarinError('INVALID_LATE_POLICY', 
+                               "Parsable, but deadline == endpoint.")
+
+        if self.rule_sign or self.rule_value or self.rule_unit or \
+                self.rule_repeater:
+            #some part of a rule given, so lets see if it's all valid
+            if not self.rule_sign:
+                self.rule_sign = '='
+            if not self.rule_value:
+                raise TamarinError('INVALID_LATE_POLICY', 
+                                   "No grade change value given.")
+            self.rule_value = int(self.rule_value)
+            if self.rule_repeater and not self.rule_day and \
+                    not self.rule_hour and not self.rule_minute:
+                raise TamarinError('INVALID_LATE_POLICY', 
+                                   "Empty /modifier given: " + self.raw)
+            
+    def getGradeAdjustment(self, score, total, timestamp, allowNeg=True):
+        """
+        Given the submission's score, assignment total, and timestamp,
+        returns the adjustment based on this policy. Respects 
+        tamarin.GRADE_PRECISION.  
+        
+        Normally, returns the adjustment even if this is a penalty greater than
+        the score itself.  If allowNeg is False, any computed penalty is 
+        capped at -score.
+        
+        Remember, if passed a non-numeric score, any $ rules will convert to
+        % instead.  This way, a numeric value can always be returned.  
+                
+        """
+        import tamarin
+        if self.span_sign == '+':
+            assert self.deadline < timestamp
+            timestamp = min(timestamp, self.end)
+            timespan = (tamarin.convertTimestampToTime(timestamp) -
+                        tamarin.convertTimestampToTime(self.deadline)) 
+        else:
+            assert timestamp <= self.deadline
+            timestamp = max(timestamp, self.end)
+            timespan = (tamarin.convertTimestampToTime(self.deadline) -
+                        tamarin.convertTimestampToTime(timestamp)) 
+
+        if not self.rule_sign:
+            #no rule, which means do nothing to the grade
+            return 0 
+            
+        if not self.rule_unit:
+            modifier = self.rule_value 
+        elif self.rule_unit == '$' and \
+                (isinstance(score, int) or isinstance(score, float)):
+            modifier = (self.rule_value * score) / 100
+        else:   # self.rule_unit == '%', or '$' with non-numeric 
+            modifier = (self.rule_value * total) / 100
+                    
+        if self.rule_sign == '-':
+            modifier *= -1
+        
+        times = 1
+        if self.rule_repeater and not self.rule_sign == '=':
+            days = int(self.rule_day[:-1]) if self.rule_day else 0
+            hours = int(self.rule_hour[:-1]) if self.rule_hour else 0
+            minutes = int(self.rule_minute[:-1]) if self.rule_minute else 0
+            repeater = datetime.timedelta(days=days, hours=hours, 
+                                        minutes=minutes)
+            times = timespan / repeater
+            if self.span_sign == '+':
+                times = math.ceil(times)  #include any partial repeater span
+            else:
+                times = math.floor(times) #only complete repeater span
+            
+        gradeAdj = round(modifier * times, tamarin.GRADE_PRECISION)        
+        if not allowNeg and score + gradeAdj < 0:
+            gradeAdj = -score
+        return gradeAdj
+    
+    def isEarlyPolicy(self):
+        """ 
+        An early policy is one that covers a span before the deadline.
+        Returns False if this policy covers a span after the deadline.
+        """
+        return self.end < self.deadline
+
+    def __str__(self):
+        """ Returns the original late policy format string. """
+        return self.raw
+
+    def __repr__(self):
+        """ Shows the original late policy format string and deadline. """
+        return ''.join((self.__class__.__name__, 
+                       "('", self.raw, "', '", self.deadline, "')")) 
+
+    
+class Assignment:
+    """
+    Represents an assignment folder, as found in the GRADED_ROOT directory.
+
+    Thus, an Assignment instance includes the assignment's due date, 
+    total point value, submission type, etc. If the total point value 
+    or type is not defined explicitly by the directory name itself, 
+    ASSIGNMENT_TOTAL or ASSIGNMENT_TYPE is used instead. 
+    """
+    def __init__(self, assignment):
+        """
+        Given the assignment name in the form of ASSIGNMENT_RE, loads
+        the details of the assignment as an object.  Details include:
+
+        * name -- short general name, of the form A##a
+        * path -- the complete path to the assignment directory
+        * dir  -- just the directory name
+        * due  -- when the assignment is due (in Tamarin timestamp format)
+        * maxScore -- the max score or total value of this assignment
+        * type -- the required SubmissionType for submissions
+        * policies -- a sorted list of LatePolicies 
+
+        If the given assignment name is not of the correct format, throws an
+        AssertionError.
+
+        If the given assignment does not exist, throws a TamarinError
+        with one of the following keys: 'NO_SUCH_ASSIGNMENT',
+        'DUPLICATED_ASSIGNMENTS', 'BAD_ASSIGNMENT_DIR_FORMAT', or
+        'UNHANDLED_TYPE'.
+        """
+        import tamarin
+        assert re.match(tamarin.ASSIGNMENT_RE, assignment), \
+            'Bad assignment format given.'
+        assignDir = glob.glob(os.path.join(tamarin.GRADED_ROOT, 
+                                           assignment + '-*'))
+        if not assignDir:
+            raise TamarinError('NO_SUCH_ASSIGNMENT', assignment)
+        elif len(assignDir) > 1:
+            #more than one matching directory found
+            raise TamarinError('DUPLICATED_ASSIGNMENTS', assignment)
+
+        #load object (part 1/2)
+        self.name = assignment
+        self.path = assignDir[0]
+        self.dir = os.path.basename(self.path)
+        
+        #get details from dir name
+        assignmentFormat = assignment + r"-(\d{8}-\d{4})(-(\d+))?(-(\w+))?$"
+        match = re.match(assignmentFormat, self.dir)
+        if not match: 
+            raise TamarinError('BAD_ASSIGNMENT_DIR_FORMAT', self.dir)
+
+        #load object (part 2/2)
+        self.due = match.group(1)      
+        if match.group(3):
+            self.maxScore = int(match.group(3))
+        else:
+            self.maxScore = tamarin.ASSIGNMENT_TOTAL
+        if match.group(5):
+            typeName = str(match.group(5))
+        else:
+            typeName = tamarin.ASSIGNMENT_TYPE
+        if typeName in tamarin.SUBMISSION_TYPES:
+            self.type = tamarin.SUBMISSION_TYPES[typeName]
+        else:
+            raise TamarinError('UNDEFINED_TYPE', typeName)
+        
+        # load late polices: longest of all possible key matches
+        possible = [key for key in tamarin.LATE_POLICIES.keys() \
+                        if self.name.startswith(key)]
+        if possible:
+            key = sorted(possible, key=len)[-1]
+            if not tamarin.LATE_POLICIES[key]:
+                # corresponding key has no policy value
+                self.policies = None
+            elif isinstance(tamarin.LATE_POLICIES[key], str):
+                # key corresponds to a single policy, so put in list
+                self.policies = [LatePolicy(tamarin.LATE_POLICIES[key], 
+                                            self.due)]
+            else:
+                # multiple policies, so convert and sort for later
+                self.policies = [LatePolicy(p, self.due) for p in \
+                                    tamarin.LATE_POLICIES[key]]
+                self.policies.sort(key=lambda policy: policy.end)                
+        else:
+            self.policies = None
+
+    def __str__(self):
+        """ Returns just the short name of this assignment """
+        return str(self.name)
+    
+    def getUserDir(self, username):
+        """
+        Returns the directory where the given user's submissions to this 
+        assignment should be stored once graded.  If SHARD_GRADED_BY_USER,
+        this is a subdirectory named for the (lowercase) user, which may not 
+        exist yet.  Otherwise, it is the assignment directory itself.
+        """
+        import tamarin
+        if tamarin.SHARD_GRADED_BY_USER:
+            return os.path.join(self.path, username.lower())
+        else:
+            return self.path
+    
+    def getDirs(self, username=None):
+        """
+        Returns a list of the existing directories that may contain graded 
+        submissions by the given user to this assignment, or by any user if 
+        username is None.  
+        
+        Since a tree may be only partly sharded (such as while core_storage
+        is converting it), this includes both the assignment directory 
+        itself and any per-user subdirectories.
+        """
+        if username:
+            userDir = os.path.join(self.path, username.lower())
+            userDirs = [userDir] if os.path.isdir(userDir) else []
+        else:
+            with os.scandir(self.path) as entries:
+                userDirs = sorted(e.path for e in entries if e.is_dir())
+        return [self.path] + userDirs
+    
+    def glob(self, pattern, username=None):
+        """
+        Returns the paths of all files for this assignment with filenames 
+        that match the given glob pattern.  Searches every directory given
+        by getDirs for the given username, as well as any archive of this 
+        assignment (see core_storage).  
+        
+        Archived files are given a path within the archive, and so must be 
+        opened with core_storage.openFile.  If a file is found both in the 
+        archive and outside of it, only the unarchived path is returned.
+        """
+        import core_storage
+        found = []
+        for directory in self.getDirs(username):
+            found.extend(glob.glob(os.path.join(directory, pattern)))
+        archive = core_storage.getArchive(self.path)
+        if archive:
+            loose = set(os.path.basename(f) for f in found)
+            found.extend(f for f in archive.getPaths(pattern) 
+                         if os.path.basename(f) not in loose)
+        return found
+    
+    def getLateOffset(self, submittedTimestamp=None):
+        """
+        Returns a string in the format of '+#d #h #m' showing the lateness of
+        the given Tamarin timestamp.
+        
+        If a timestamp is not given, will use the current time instead.
+        If the given timestamp is before this assignment's deadline, will
+        return a negative offset showing how early the submission is.
+        """
+        # convert to datetimes
+        import tamarin
+        submitted = tamarin.convertTimestampToTime(submittedTimestamp)
+        deadline = tamarin.convertTimestampToTime(self.due)
+        # to avoid dealing with negative timedeltas (which are weird)
+        if submitted <= deadline:
+            offset = deadline - submitted
+            sign = '-'
+        else:
+            offset = submitted - deadline
+            sign = '+'
+        hours = offset.seconds // 3600
+        minutes = (offset.seconds // 60) - (hours * 60)
+        return '{0}{1}d {2}h {3:02}m'.format(sign, offset.days, hours, minutes)
+
+    def getPolicy(self, submittedTimestamp=None):
+        """
+        Returns the appropriate policy associated with this assignment based
+        on the given timestamp.  If no timestamp is given, uses the current
+        time.  May return None if this assignment has no late policies, or if
+        the given timestamp is before the deadline but there is no early 
+        submission policy.
+        """
+        import tamarin
+        if not submittedTimestamp:
+            # use current time
+            submittedTimestamp = tamarin.convertTimeToTimestamp()        
+        timestamp = submittedTimestamp 
+
+        if not self.policies:
+            return None
+        elif self.isLate(timestamp):
+            if self.policies[-1].isEarlyPolicy():
+                # only have early policies, though, so none apply
+                return None
+            else:
+                # find last late policy that applies (even if past last one)
+                for policy in self.policies:
+                    if not policy.isEarlyPolicy() and timestamp <= policy.end:
+                        break
+                return policy                
+        else:
+            if not self.policies[0].isEarlyPolicy():
+                # submission is early, but only have late policies
+                return None
+            else:
+                #find closest-to-deadline early policy that applies (or first)
+                for policy in reversed(self.policies):
+                    if policy.isEarlyPolicy() and timestamp >= policy.end:
+                        break
+                return policy
+
+    def isLate(self, submittedTimestamp=None):
+        """
+        Determines whether the submittedTimestamp (in 'YYYYMMDD-HHMM' format)
+        occurs before this assignment's deadline.  If submittedTimestamp is 
+        None, uses the current time.
+        """
+        import tamarin
+        if not submittedTimestamp:
+            # use current time
+            submittedTimestamp = tamarin.convertTimeToTimestamp()
+        # nice thing about Tamarin timestamps is they also compare properly 
+        return submittedTimestamp > self.due
+    
+    def isTooLate(self, submittedTimestamp=None):
+        """
+        Determines whether the submittedTimestamp (in 'YYYYMMDD-HHMM' format)
+        occurs after this assignment's deadline AND after all late policies.  
+        If submittedTimestamp is None, uses the current time.
+        """
+        import tamarin
+        if not submittedTimestamp:
+            # use current time
+            submittedTimestamp = tamarin.convertTimeToTimestamp()
+        if self.policies:
+            # just look at last one (already sorted)
+            return submittedTimestamp > self.policies[-1].end
+        else:
+            return self.isLate(submittedTimestamp)
+
+
+# process-wide registry of loaded Assignments; see getAssignment
+_registry = {'key': None, 'assignments': {}}
+
+def getAssignment(assignment):
+    """
+    Returns an Assignment for the given assignment name, exactly as the 
+    Assignment constructor would (including throwing the same errors).
+    
+    However, the returned Assignment comes from a process-wide registry, 
+    so only the first request for each assignment has to find its directory 
+    and parse its late policies.  Since the instance is shared, callers 
+    must not modify it; construct an Assignment directly if you need to.
+    
+    The registry is cleared whenever the mtime of GRADED_ROOT changes 
+    (as it does when an assignment directory is added, removed, or renamed)
+    or when the assignment-related configuration in tamarin.py changes.
+    """
+    import tamarin
+    try:
+        mtime = os.stat(tamarin.GRADED_ROOT).st_mtime_ns
+    except OSError:
+        mtime = None
+    key = (tamarin.GRADED_ROOT, mtime, tamarin.ASSIGNMENT_TOTAL, 
+           tamarin.ASSIGNMENT_TYPE, id(tamarin.SUBMISSION_TYPES),
+           repr(tamarin.LATE_POLICIES))
+    if key != _registry['key']:
+        _registry['key'] = key
+        _registry['assignments'] = {}
+
+    loaded = _registry['assignments']
+    if assignment not in loaded:
+        try:
+            loaded[assignment] = Assignment(assignment)
+        except TamarinError as err:
+            # remember failures too, but throw a fresh error each time
+            loaded[assignment] = (err.key, err.details)
+    if isinstance(loaded[assignment], tuple):
+        raise TamarinError(*loaded[assignment])
+    return loaded[assignment]
+
+
+class UserDirectory:
+    """
+    An index of the users loaded from USERS_FILE.  
+    Use tamarin.getUserDirectory to get a cached instance.
+    
+    Details include:
+    * users - a dict of each lowercase username to a list of that user's 
+              other fields: [password, section, lastname, firstname]
+    * usernames - a sorted list of all usernames
+    * sections - a dict of each section to a sorted list of its usernames
+    """
+    def __init__(self, users):
+        """
+        Indexes the given users, which is a dict in the form returned by
+        tamarin.loadUserFile.
+        """
+        self.users = users
+        self.usernames = sorted(users)
+        self.sections = {}
+        for username in self.usernames:
+            self.sections.setdefault(users[username][1], []).append(username)
+    
+    def __contains__(self, username):
+        return username.lower() in self.users
+    
+    def __len__(self):
+        return len(self.users)
+    
+    def getDetails(self, username):
+        """
+        Returns the list of [password, section, lastname, firstname] for 
+        the given username (in any case).  Throws a TamarinError 
+        ('INVALID_USERNAME') if there is no such user.
+        """
+        try:
+            return self.users[username.lower()]
+        except KeyError:
+            raise TamarinError('INVALID_USERNAME')
+        
+
+class SubmittedFile:
+    """
+    Represents a file in SUBMITTED_ROOT that has completed its validation by 
+    submit.py and has been timestamped.  The file must exist in SUBMITTED_ROOT
+    unless virtualFile is True.
+    
+    Details include:
+    * filename   - the basename of the file
+    * path       - the full path of the file (including the filename)
+    * username   - username of the file's author/submitter, as taken from
+                   filename (so may not be all lowercase).
+    * assignment - the name of the assignment this file was submitted for
+                   (as str, not Assignment object)
+    * timestamp  - when the file was submitted, as a Tamarin timestamp
+    * fileExt    - the file extension
+    * originalFilename - the uploaded filename without the added embedded 
+                         timestamp    
+    """
+    def __init__(self, filename, virtualFile=False):
+        """
+        Constructs a SubmittedFile for the given base filename (no path).  
+        
+        If the given filename is not of the correct format, throws a
+        TamarinError('BAD_GRADE_FILENAME').
+        
+        The given file does must exist in a SUBMITTED_ROOT subdirectory or else 
+        throws a TamarinError('NO_SUBMITTED_FILE').
+        
+        """
+        import tamarin
+        #confirm format of filename        
+        fileMatch = re.match(tamarin.SUBMITTED_RE, filename)
+        if not fileMatch:
+            raise TamarinError('BAD_GRADE_FILENAME', filename)
+        self.filename = filename
+    
+        #check that file really exists.
+        self.path = os.path.join(tamarin.SUBMITTED_ROOT, filename)
+        if not virtualFile and not os.path.exists(self.path):
+            raise TamarinError('NO_SUBMITTED_FILE', filename)
+    
+        #load details from above match
+        self.username = fileMatch.group(1)
+        self.assignment = fileMatch.group(2)
+        self.timestamp = fileMatch.group(3)
+        self.fileExt = fileMatch.group(4)
+        self.originalFilename = fileMatch.group(1) + fileMatch.group(2) + \
+                                    '.' + fileMatch.group(4)
+                                    
+    def getProvisionalOutputPath(self):
+        """
+        Returns the full path to the provisional grader output file written
+        by the quick phase of a two-phase SubmissionType, or None if there is
+        no such file for this submission.
+        """
+        import tamarin
+        import core_storage
+        outputs = self.filename.replace('.' + self.fileExt, 
+                                        '-*.' + tamarin.GRADER_OUTPUT_FILE_EXT)
+        provisional = glob.glob(os.path.join(tamarin.PROVISIONAL_ROOT, 
+                                             outputs + '*'))  # or compressed
+        provisional = [p for p in provisional 
+                       if core_storage.matchGraderOutput(p)]
+        return provisional[0] if provisional else None
+
+    def getResultPath(self, provisional=False):
+        """
+        Returns the path to the result sidecar written by GradeFile for this
+        submission, which may not exist.  This is stored alongside this 
+        file, but with a RESULT_FILE_EXT extension.  If provisional, returns 
+        the path of the sidecar for the provisional grader output instead.
+        """
+        import tamarin
+        directory = tamarin.PROVISIONAL_ROOT if provisional else \
+                    os.path.dirname(self.path)
+        return os.path.join(directory, self.filename[:-len(self.fileExt)] + 
+                            tamarin.RESULT_FILE_EXT)
+
+    def loadResult(self, provisional=False):
+        """
+        Returns the dict of grading results in this file's result sidecar 
+        (see getResultPath and GradeFile.run), or None if there is no 
+        sidecar, such as for files graded by older versions of Tamarin.
+        """
+        import core_storage
+        try:
+            with core_storage.openFile(self.getResultPath(provisional)) \
+                    as filein:
+                return json.load(filein)
+        except (OSError, KeyError, ValueError):
+            # KeyError when not in an archive
+            return None
+
+    def __str__(self):
+        """ Returns this submitted file's filename. """
+        return self.filename
+    
+    def __repr__(self):
+        return self.__class__.__name__ + "('" + self.filename + "')"
+
+
+class GradedFile(SubmittedFile):
+    """
+    Represents a file in a GRADED_ROOT subdirectory that has completed the 
+    grading process.  The corresponding file must exist in the appropriate
+    GRADED_ROOT subdirectory.
+    
+    Details are the same as for a SubmittedFile, plus:
+    
+    * assign - the Assignment object for the str in self.assignment
+    * graderOutputPath - the full path to the grader output file
+    * graderOutputFilename - just the base name of the grader output file
+    * grade - the grade from the grader file (or ERR if it can't be found)
+    * humanVerified - the grade has been verified by a human
+    * humanComment - whether a human has appended a comment to the output file
+    
+    Comments and grade changes by humans are recorded in a separate review 
+    log (see appendReview).  (Older grader output files may also contain
+    comments directly.)
+    
+    """
+    def __init__(self, filename):
+        """
+        Constructs a new GradeFile for the given file.
+        
+        Throws the same TamarinErrors as a SubmittedFile.  
+        May also throw any of the errors from the Assignment constructor.
+    
+        """
+        import tamarin
+        import core_storage
+        #let superclass initialize everything
+        super().__init__(filename, virtualFile=True)
+        #now reset path variable
+        self.assign = getAssignment(self.assignment)
+        found = self.assign.glob(filename, self.username)
+        if not found:
+            raise TamarinError('NO_SUBMITTED_FILE', filename)
+        self.path = found[0]
+
+        #add new details            
+        self.graderOutputPath = self.path.replace("." + self.fileExt, 
+                                    "-*." + tamarin.GRADER_OUTPUT_FILE_EXT)
+        indexed = None
+        if tamarin.USE_SUBMISSION_INDEX:
+            import core_index
+            indexed = core_index.getGraderOutputPath(filename)
+        if indexed and core_storage.exists(indexed):
+            gradedGlob = [indexed]
+        else:
+            # output may be (briefly) in a different dir while sharding
+            # and may be compressed
+            gradedGlob = self.assign.glob(
+                            os.path.basename(self.graderOutputPath) + '*', 
+                            self.username)
+            gradedGlob = [f for f in gradedGlob 
+                          if core_storage.matchGraderOutput(f)]
+        self.loadGraderOutput(gradedGlob)
+
+    @classmethod
+    def fromRecord(cls, record, assignment):
+        """
+        Returns a GradedFile for the given graded SubmissionRecord, which 
+        must be a submission to the given Assignment.  Unlike the 
+        constructor, does not look for the files again.  Throws the same 
+        grader output errors as the constructor.
+        """
+        graded = cls.__new__(cls)
+        SubmittedFile.__init__(graded, record.filename, virtualFile=True)
+        graded.assign = assignment
+        graded.path = record.path
+        graded.loadGraderOutput(record.graderOutputPaths)
+        return graded
+
+    def loadGraderOutput(self, graderOutputPaths):
+        """
+        Given the list of paths to this file's grader output files (of which 
+        there must be exactly one), loads the details recorded in its name.
+        Otherwise, throws a TamarinError: 'NO_GRADER_RESULTS' or 
+        'MULTIPLE_GRADER_RESULTS'.
+        """
+        import tamarin
+        if not graderOutputPaths:
+            raise TamarinError('NO_GRADER_RESULTS', self.filename)
+        elif len(graderOutputPaths) > 1:
+            raise TamarinError('MULTIPLE_GRADER_RESULTS', self.filename)
+        self.graderOutputPath = graderOutputPaths[0]
+        self.graderOutputFilename = os.path.basename(self.graderOutputPath)
+
+        # pull grade from filename
+        found = re.match(tamarin.GRADED_RE, self.graderOutputFilename)
+        self.grade = self.parseGrade(found.group(4))
+
+        # human verified or comments?
+        human = found.group(5)
+        if human:
+            self.humanVerified = 'H' in human
+            self.humanComment = 'C' in human
+        else:
+            self.humanVerified = False
+            self.humanComment = False                
+                
+    @staticmethod
+    def parseGrade(grade):
+        """
+        Returns the given grade from a grader output filename as a float if
+        it is numeric, or else as a str.
+        """
+        try:
+            return float(grade)
+        except ValueError:
+            return grade or 'ERR'  #empty string, as on a grader failure
+    
+    def getLateOffset(self):
+        """ As per Assignment.getLateOffset for this submission. """
+        import tamarin
+        return self.assign.getLateOffset(
+                                    tamarin.getMinuteTimestamp(self.timestamp))
+    
+    def getLateGradeAdjustment(self):
+        """
+        Returns the penalty or bonus due to the LatePolicy associated
+        with this assignment.  See LatePolicy.getGradeAdjustment.
+        Does not cap the late penalty (may be more than score itself).
+        Returns 0 if there is no late policy (as when isTooLate).
+        """
+        import tamarin
+        timestamp = tamarin.getMinuteTimestamp(self.timestamp)
+        policy = self.assign.getPolicy(timestamp)
+        if not policy:
+            return 0
+        else:
+            return policy.getGradeAdjustment(self.grade, 
+                                             self.assign.maxScore,
+                                             timestamp)
+    
+    def getResubmissionGradeAdjustment(self, submissionCount=None):
+        """
+        Returns the penalty due to additional submissions for this assignment.
+
+        Penalty can be more than can be covered by the grade itself. 
+        Returns the penalty even for non-numeric grades. 
+        
+        The submissionCount is a performance boost.  If the number of 
+        submissions (including this one) is given here, will be used instead
+        of polling the file system to (re)collect the same data. 
+        
+        """
+        import tamarin
+        if not submissionCount:
+            # need to count the files here
+            files = tamarin.getSubmissions(user=self.username, 
+                                           assignment=self.assignment)
+            submissionCount = len(files)            
+
+        if submissionCount <= 1:
+            return 0
+        else:            
+            adj = (submissionCount - 1) * tamarin.RESUBMISSION_PENALTY
+            return round(adj, tamarin.GRADE_PRECISION)
+            
+    def getAdjustedGrade(self, submissionCount=None):
+        """ 
+        Returns this file's grade after adjustments for lateness or 
+        resubmissions.  See getLateGradedAjustment and 
+        getResubmissionGradeAdjustment.  Normalizes grade based on 
+        tamarin.GRADE_PRECISION.
+        
+        Non-numeric grades cannot be updated, and so these are returned
+        unchanged.  Also, does not allow for negative grades, so will 
+        return 0 instead if cumulative penalties are more than the grade.
+        
+        For the raw score returned by the grader, use self.grade directly.
+                
+        """
+        import tamarin
+        if isinstance(self.grade, str):
+            return self.grade
+        adjGrade = self.grade
+        adjGrade += self.getLateGradeAdjustment() 
+        adjGrade += self.getResubmissionGradeAdjustment(submissionCount)
+        adjGrade = round(adjGrade, tamarin.GRADE_PRECISION)
+        if adjGrade < 0:
+            adjGrade = 0
+        return adjGrade
+    
+    def isLate(self):
+        """ As per Assignment.isLate for this submission. """
+        import tamarin
+        return self.assign.isLate(tamarin.getMinuteTimestamp(self.timestamp))
+
+    def isTooLate(self):
+        """ As per Assignment.isTooLate for this submission. """
+        import tamarin
+        return self.assign.isTooLate(
+                                    tamarin.getMinuteTimestamp(self.timestamp))
+    
+    def getReviewPath(self):
+        """
+        Returns the path to this file's review log, which may not exist yet.
+        It is stored alongside the submission, but with a REVIEW_FILE_EXT 
+        extension.
+        """
+        import tamarin
+        return self.path[:-len(self.fileExt)] + tamarin.REVIEW_FILE_EXT
+    
+    def loadReview(self):
+        """
+        Returns the list of entries in this file's review log, oldest first.
+        Returns an empty list if there is no log.  See appendReview.
+        """
+        import core_storage
+        try:
+            with core_storage.openFile(self.getReviewPath()) as filein:
+                return [json.loads(line) for line in filein if line.strip()]
+        except (OSError, KeyError):
+            # KeyError when not in an archive
+            return []
+    
+    def appendReview(self, entry):
+        """
+        Appends the given entry, which is a dict, to this file's review log.
+        The current timestamp is added to the entry.  Entries may include:
+        
+        * grade - a new grade given by a human
+        * verified - whether the grade is now human-verified
+        * comment, id - the HTML of a new comment and its unique ID number
+        * deleteComment - the ID of a comment (either in this log or in the
+                          grader output itself) that has been deleted
+        * regrade - the grader output was replaced by a regrade, so all 
+                    earlier entries no longer apply (see GradeFile.run)
+        
+        Only appends to the log, so never rewrites earlier entries.
+        Throws a TamarinError('ARCHIVED_SUBMISSION') if this file is archived.
+        """
+        import tamarin
+        if self.isArchived():
+            raise TamarinError('ARCHIVED_SUBMISSION', self.filename)
+        entry = dict(entry, timestamp=tamarin.convertTimeToTimestamp())
+        with open(self.getReviewPath(), 'a') as fileout:
+            fileout.write(json.dumps(entry) + '\n')
+    
+    def isArchived(self):
+        """
+        Whether this file has been packed into its assignment's archive,
+        and so cannot be changed until the archive is unpacked.
+        """
+        import core_storage
+        return core_storage.isArchived(self.graderOutputPath)
+    
+    def update(self):
+        """
+        Renames the corresponding file to correspond to current object state.
+         
+        Computes the correct grader output filename based on this graded
+        file's current details, including grade, comments, and verified
+        status.  If this is different than self.graderOutputFilename, 
+        graderOutputFilename is updated and the corresponding file is
+        renamed/moved.  graderOutputPath is also updated, as is the 
+        submission index (if used).  A change to the grade is journaled as
+        a 'regrade' event and a change to the verified status as a 'verify'
+        event (see core_journal).  Any cached HTML of this submission is 
+        discarded (see core_view.renderSubmission).
+        
+        Returns whether the file was actually renamed.  Throws a 
+        TamarinError('ARCHIVED_SUBMISSION') if a change is needed but
+        this file is archived.
+        
+        """
+        import tamarin
+        import core_index
+        import core_journal
+        import core_view
+        
+        # construct current graderOutputFilename (gof)
+        gof = self.username + self.assignment 
+        gof += '-' + self.timestamp + '-' + str(self.grade)
+        if self.humanVerified or self.humanComment:
+            gof += '-'
+            if self.humanVerified:
+                gof += 'H'
+            if self.humanComment:
+                gof += 'C'
+        # keep current extension, which may be compressed or not
+        old = re.match(tamarin.GRADED_RE, self.graderOutputFilename)
+        gof += '.' + old.group(6)
+        
+        if gof != self.graderOutputFilename:
+            if self.isArchived():
+                raise TamarinError('ARCHIVED_SUBMISSION', self.filename)
+            # update file
+            gop = os.path.join(os.path.dirname(self.graderOutputPath), gof)
+            os.rename(self.graderOutputPath, gop)
+            self.graderOutputPath = gop
+            self.graderOutputFilename = gof
+            core_view.discardFragments(self)
+            core_index.recordGraded(self)
+            if self.grade != self.parseGrade(old.group(4)):
+                core_journal.record('regrade', self)
+            if self.humanVerified != ('H' in (old.group(5) or '')):
+                core_journal.record('verify', self)
+            return True
+        else:
+            return False
+
+
+class SubmissionRecord:
+    """
+    A compact summary of one submitted or graded file, as gathered by a 
+    CourseSnapshot.  Details include:
+    
+    * filename   - the basename of the submitted file
+    * path       - the full path of the submitted file
+    * username   - as taken from the filename (so may not be all lowercase)
+    * assignment - the name of the assignment (as a str)
+    * timestamp  - when the file was submitted, as a Tamarin timestamp
+    * graded     - whether the file is in GRADED_ROOT rather than SUBMITTED
+    * graderOutputPaths - a list of the paths of the file's grader output 
+                   files (normally exactly one if graded)
+    
+    Use GradedFile.fromRecord for the grade and other details of a graded
+    file.
+    """
+    __slots__ = ('filename', 'path', 'username', 'assignment', 'timestamp',
+                 'graded', 'graderOutputPaths')
+
+    def __init__(self, match, path, graded, graderOutputPaths=()):
+        """
+        Constructs a record for the file at the given path, given the 
+        match of its filename against SUBMITTED_RE.
+        """
+        self.filename = match.group(0)
+        self.path = path
+        self.username = match.group(1)
+        self.assignment = match.group(2)
+        self.timestamp = match.group(3)
+        self.graded = graded
+        self.graderOutputPaths = list(graderOutputPaths)
+
+    def __repr__(self):
+        return self.__class__.__name__ + "('" + self.filename + "')"
+
+
+class CourseSnapshot:
+    """
+    The submitted and graded files of every user for every assignment,
+    gathered in a single pass over GRADED_ROOT and SUBMITTED_ROOT (or in a
+    single query of the submission index, if it is used).  Views can then 
+    be rendered from this snapshot without going back to the filesystem 
+    for each user and assignment.
+    
+    Details include:
+    * assignments - a dict of every assignment name to its Assignment
+    * records - a dict of (lowercase username, assignment name) keys to a 
+                list of SubmissionRecords, sorted by timestamp
+    """
+    def __init__(self, user=None, assignment=None):
+        """
+        Gathers the submissions of the given user for the given assignment.
+        If either is None, gathers the submissions of all users or for 
+        all assignments.  (Assignments without submissions are still 
+        included in self.assignments.)
+        
+        Throws the same TamarinErrors as the Assignment constructor if any 
+        of the assignments are invalid.
+        """
+        import tamarin
+        self.user = user.lower() if user else None
+        self.assignments = {}
+        self.records = {}
+        
+        for name in ([assignment] if assignment else tamarin.getAssignments()):
+            self.assignments[name] = getAssignment(name)
+        
+        if not (tamarin.USE_SUBMISSION_INDEX and self.loadFromIndex()):
+            self.loadFromFilesystem()
+        for records in self.records.values():
+            records.sort(key=lambda r: r.timestamp)
+        
+    def add(self, record):
+        """ Adds the given record, if it is for a wanted user. """
+        user = record.username.lower()
+        if self.user and user != self.user:
+            return
+        self.records.setdefault((user, record.assignment), []).append(record)
+
+    def loadFromFilesystem(self):
+        """
+        Scans each assignment's directories (and archive, if any) and 
+        SUBMITTED_ROOT once, adding a record for every submission found.
+        """
+        import tamarin
+        import core_storage
+        for assignment in self.assignments.values():
+            outputs = {}  # submission filename minus ext -> output paths
+            found = []
+            for path in assignment.glob('*', self.user):
+                name = os.path.basename(path)
+                graded = re.match(tamarin.GRADED_RE, name)
+                if graded:
+                    if core_storage.matchGraderOutput(name):
+                        stem = graded.group(1) + graded.group(2) + \
+                               '-' + graded.group(3)
+                        outputs.setdefault(stem, []).append(path)
+                    continue
+                match = re.match(tamarin.SUBMITTED_RE, name)
+                if match and match.group(4) == assignment.type.fileExt:
+                    found.append((match, path))
+            for match, path in found:
+                stem = match.group(1) + match.group(2) + '-' + match.group(3)
+                self.add(SubmissionRecord(match, path, True, 
+                                          outputs.get(stem, ())))
+        
+        with os.scandir(tamarin.SUBMITTED_ROOT) as entries:
+            for entry in entries:
+                match = re.match(tamarin.SUBMITTED_RE, entry.name)
+                if match and match.group(2) in self.assignments and \
+                        match.group(4) == \
+                        self.assignments[match.group(2)].type.fileExt:
+                    self.add(SubmissionRecord(match, entry.path, False))
+
+    def loadFromIndex(self):
+        """
+        Adds a record for every matching submission in the submission 
+        index.  Returns False if the index could not be read.
+        """
+        import tamarin
+        import core_index
+        assignment = None
+        if len(self.assignments) == 1:
+            assignment = list(self.assignments)[0]
+        rows = core_index.getRecords(self.user, assignment)
+        if rows is None:
+            return False
+        for filename, path, graded, graderOutputPath in rows:
+            match = re.match(tamarin.SUBMITTED_RE, filename)
+            if match.group(2) in self.assignments:
+                self.add(SubmissionRecord(match, path, bool(graded),
+                            [graderOutputPath] if graderOutputPath else ()))
+        return True
+
+    def getSubmissions(self, user, assignment):
+        """
+        Returns the list of SubmissionRecords of the given user for the 
+        given assignment, sorted by timestamp.
+        """
+        return self.records.get((user.lower(), assignment), [])
@@ -1,318 +1,774 @@
-
-## core_view.py 
-
-"""
-A library of functions for constructing different views of graded 
-Tamarin data and files.  The display functions output HTML code but 
-do not construct complete HTML pages by themselves.
-
-Many of these functions include a "master" parameter. This will make 
-the displayed Grade for each submission (if shown in that view) a link
-that will allow the viewer to add a comment and modify the grade.  
-This is intended for use in masterview.py and so is False by default.
-
-See view.py and masterview.py for more.
-
-Part of Tamarin, by Zach Tomaszewski.  
-Created: 10 Sep 2008.
-"""
-
-import html
-import os
-import re
-
-import tamarin
-from core_type import TamarinError, SubmittedFile, GradedFile, Assignment
-
-def displaySubmission(filename, master=False):
-    """
-    Displays a single submitted file and its corresponding grader output.
-    
-    Filename means a UsernameA##-########-####.ext filename, which will 
-    correspond to a SubmittedFile or GradedFile.
-
-    If master is True, grade is a link to a modify/comment form and comments
-    include a delete option.
-    
-    Raises a TamarinError if the given file cannot be displayed.
-    """
-    # most likely to be graded, so check that first
-    try:
-        submittedFile = GradedFile(filename)
-    except TamarinError as err:
-        if err.key == 'NO_SUBMITTED_FILE':
-            # file not graded yet, so try submitted instead
-            submittedFile = SubmittedFile(filename)
-        else:
-            # some more serious error, so let it carry on
-            raise err
-    
-    print('<div class="submission">')
-    print('<h4>' + filename + '</h4>')
-    assignment = Assignment(submittedFile.assignment)
-
-    #how should we print this code?
-    usePre = assignment.type.preformatted
-    #print code
-    codefile = open(submittedFile.path, 'r')
-    if usePre:
-        print('<pre class="code">')
-    else:
-        print('<div class="code">')
-    
-    if not assignment.type.encoding:
-        #can't display the contents (binary)
-        print('[ binary file format (' + submittedFile.fileExt + '): '
-              'cannot display contents here ]')
-    else:
-        for line in codefile:
-            #replace angle brackets and such
-            line = html.escape(line)
-            #if as text, need a little line-break formatting
-            if not usePre:
-                line = line.replace("\n", "<br>\n")
-            print(line, end='')  #since still have \n in line itself
-    
-    if usePre:
-        print('</pre>')
-    else:
-        print('</div>')
-    codefile.close()
-
-    if isinstance(submittedFile, GradedFile):
-        #a graded file
-        with open(submittedFile.graderOutputPath, 'r') as gradeFile:
-            for line in gradeFile:  
-                
-                # add delete button to comments
-                if master and '<div class="comment' in line:
-                    cid = int(re.search(r'id="comment(\d+)"', line).group(1))
-                    line += ('<form action="' + tamarin.CGI_URL +
-                            'masterview.py" method="post" ' 
-                            'enctype="multipart/form-data" ' 
-                            'class="deleteComment">\n')
-                    line += ('<input type="hidden" name="submission" ' +
-                             'value="' + filename + '">\n')
-                    line += ('<input type="hidden" name="deleteComment" ' +
-                             'value="' + str(cid) + '">\n')
-                    line += ('<input type="submit" ' +
-                             'value="Delete Comment">\n')
-                    line += '</form>\n'           
-                
-                # grab grade line and mark tentative and/or convert to link
-                if tamarin.GRADE_START_TAG in line:
-                    match = re.match(tamarin.GRADE_START_TAG + 
-                                     r"\s*([^<]+)\s*" + tamarin.GRADE_END_TAG, 
-                                     line)
-                    line = tamarin.GRADE_START_TAG  # reconstruct the line
-                    if master:
-                        #make this a link to modifying the grade             
-                        line += '<a href="masterview.py?submission=' + \
-                                filename + '#append"'
-                        if tamarin.MASTER_LINKS_OPEN_NEW_WINDOW:
-                            line += ' target="_blank"'
-                        line += '>'
-                    
-                    line += match.group(1)  #grade
-                    if not submittedFile.humanVerified:
-                        line += tamarin.SHORT_UNVERIFIED_GRADE_LABEL
-
-                    if master:
-                        #end link
-                        line += '</a>'
-                    line += tamarin.GRADE_END_TAG + '\n' #end line
-        
-                # markup any grader output lines
-                if tamarin.HIGHLIGHT_PREFIX and \
-                        line.startswith(tamarin.HIGHLIGHT_PREFIX):
-                    #</span> comes after line break, which is slightly annoying
-                    line = '<span class="graderOutputLine">' + line + '</span>'
-                    for elem in tamarin.HIGHLIGHT_ELEMENTS:
-                        line = line.replace('[' + elem + ']', 
-                                            '[<span class="grader' + elem +
-                                               '">' + elem + '</span>]')
-        
-                print(line, end='')
-            #end for, then...
-            gradeFile.close()
-    else:
-        #only a submitted file
-        print('<div class="grader">')
-        print('<p><i>Submitted, but not yet graded.</i></p>')
-        print('</div>')
-    print('</div>')    
-
-def displayAssignmentSubmissions(user, assignmentName, 
-                                 brief=False, master=False):
-    """
-    Displays all the submissions the user made for this assignment.
-    
-    In brief mode, this will just be a list of files, including the grade
-    for each one.  Each listing will be a button (or link, if in master mode)
-    to the appropriate submission view.
-    
-    If in full mode (that is, brief=False), will show each submission expanded 
-    within this view.
-    
-    At the top off all submissions, will include a header listing the 
-    assignment and the final grade based on last submission and late policy
-    adjustments.
-    """
-    assignment = Assignment(assignmentName)
-    files = tamarin.getSubmissions(user=user, assignment=assignmentName)
-    
-    # calculate final grade and status for this assignment
-    # (Assuming that even ungraded and grader-error submissions count as
-    # submissions, we only need the grade of the last submission to have an 
-    # accurate final grade.)
-    grade = '<i>Not yet submitted.</i>'
-    reason = None
-
-    if files:
-        lastSubmit = files[-1]
-        if tamarin.SUBMITTED_ROOT in lastSubmit:
-            grade = '<i>Not yet graded.</i>'
-            lastFile = SubmittedFile(os.path.basename(lastSubmit))
-        else:
-            lastFile = GradedFile(os.path.basename(lastSubmit))
-            grade = lastFile.getAdjustedGrade(len(files))
-            lateness = lastFile.getLateGradeAdjustment()
-            resubmits = lastFile.getResubmissionGradeAdjustment(len(files))
-            
-            if lateness or resubmits:
-                # explain grade calcs
-                reason = '[= ' + str(lastFile.grade)
-                if lateness:
-                    reason += ' ' + str(lateness)
-                    offset = lastFile.getLateOffset()
-                    label = 'early' if offset[0] == '-' else 'late'
-                    reason += ' <i>(' + label + ' ' + offset + ')</i>'
-                if resubmits:
-                    reason += ' ' + str(resubmits)
-                    reason += ' <i>(' + str(len(files) - 1) + \
-                              '&nbsp;resubmits)</i>'
-                reason += ']'
-            elif lastFile.isLate():
-                # just a little informational timestamping
-                reason = '<small>' + lastFile.getLateOffset() + '</small>'
-            
-            # mark grade if not verified yet
-            if not lastFile.humanVerified:
-                grade = '<span class="unverified">' + str(grade) + \
-                        tamarin.UNVERIFIED_GRADE_LABEL + '</span>'
-    else:
-        #no files submitted at all yet
-        if assignment.isTooLate():
-            #can't submit, so grade goes to 0
-            grade = 0
-            reason = '<i>Too late to submit.</i>'
-
-    # print submission list header, starting with assignment grade
-    print('<div class="submissionList">')
-    print('<div class="assignment">')
-    print('<table class="assignment"><tr><td class="assignment">')
-    print('<b>' + assignment.name + '</b> &nbsp;')
-    print('<small>(Due: ' + assignment.due + '. ')
-    print('Total: ' + str(assignment.maxScore) + ' points.)</small></td>')
-    print('<td class="grade"><b>Grade:</b> ' + str(grade) + '</td>')
-    if reason:
-        print('<td class="reason">' + reason + '</td>')
-    print('</tr></table>')
-
-    #list contents
-    if files and brief:
-        print('<ul>')
-    for f in files:
-        if brief:
-            if master:
-                print('<li><a href="masterview.py?submission=' + 
-                      os.path.basename(f) + '"', end='')
-                if tamarin.MASTER_LINKS_OPEN_NEW_WINDOW:
-                    print(' target="_blank"', end='')
-                print('>' + os.path.basename(f) + '</a>', end=' ') 
-            else:
-                print('<li><input type="submit" name="submission" value="' + 
-                      os.path.basename(f) + '">', end=' ')
-            if tamarin.SUBMITTED_ROOT in f:
-                print('&nbsp; [<i>Not yet graded.</i>]')
-            else:
-                graded = GradedFile(os.path.basename(f))
-                shortGrade = str(graded.grade)
-                if not graded.humanVerified:
-                    shortGrade += tamarin.SHORT_UNVERIFIED_GRADE_LABEL
-                if graded.humanComment:
-                    shortGrade += tamarin.HUMAN_COMMENT_LABEL
-                print('&nbsp; [' + shortGrade + ']')
-        else:
-            displaySubmission(os.path.basename(f), master)
-          
-    #list footer
-    if files and brief:
-        print('</ul>')
-    print('</div></div>')
-            
-def displayUser(user, assignment=None, brief=True, master=False):
-    """
-    Displays the work of the given user.  
-    
-    If the name of the assignment is specified, it displays only that 
-    assignment. Otherwise, displays an assignmentSubmissions view for every 
-    assignment for this user. In other words, shows all the work this user 
-    has submitted (or not).
-    
-    A brief assignmentSubmissions view is on by default for this function.
-    
-    """
-    #get assignment list
-    if assignment:
-        assignment = Assignment(assignment)
-        assignments = [assignment.name]
-    else:
-        assignments = tamarin.getAssignments()
-    
-    #print user table
-    details = tamarin.getUserDetails(user)
-    print('<div class="user">')
-    print('<table class="user"><tr>')
-    print('<td class="user"><b>' + user.lower() + '</b>')
-    print('&nbsp; <small>(' + str(details[2]) + ' ' + str(details[1]) + 
-          ')</small></td>')
-    print('<td class="section">Section: ' + str(details[0]) + '</td>')
-    print('</tr></table>')
-      
-    for assign in assignments:
-        displayAssignmentSubmissions(user, assign, brief, master)      
-    print('</div>')
- 
-def displayAssignment(assignment, brief=False, master=False):
-    """
-    Displays the assignment submission lists for every user
-    for the given assignment.  (This is basically the "grading" view.)
-    """
-    # Future: add section filtering?
-    users = tamarin.getUsers()
-    for u in users:
-        displayUser(u, assignment, brief, master)  
-
-def modifySubmission(filename):
-    """
-    Extends displaySubmission to append a form for the master to append 
-    a comment and/or change the grade. Sends these change to appendComment 
-    (in masterview.py), which deals with the actual hassle of storing 
-    the changes.
-    """
-    # doesn't need grade link, but may want delete comment option, so master
-    displaySubmission(filename, master=True)
-    submittedFile = GradedFile(filename)
-    print('<form class="modify" action="masterview.py#bottom" method="post">')
-    print('<input type="hidden" name="submission" value="' + filename + '">')
-    print('<p id="append"><b>Comment to append:</b></p>')
-    print('<textarea name="comment" rows="4" cols="80"></textarea><br>')
-    print('<p><b>New grade:</b>')
-    print('<input type="text" name="grade" size="6"',) 
-    print('value="' + str(submittedFile.grade) + '">')
-    print('&nbsp; <b>Human verified:</b> ')
-    print('<input type="checkbox" name="verify" checked> &nbsp;')
-    print('<input type="submit" name="modify" value="Modify">')
-    print('</p></form>')
-
+
+## core_view.py 
+
+"""
+A library of functions for constructing different views of graded 
+Tamarin data and files.  The display functions output HTML code but 
+do not construct complete HTML pages by themselves.
+
+Many of these functions include a "master" parameter. This will make 
+the displayed Grade for each submission (if shown in that view) a link
+that will allow the viewer to add a comment and modify the grade.  
+This is intended for use in masterview.py and so is False by default.
+
+See view.py and masterview.py for more.
+
+Part of Tamarin, by Zach Tomaszewski.  
+Created: 10 Sep 2008.
+"""
+
+import contextlib
+import html
+import io
+import json
+import locale
+import os
+import re
+import urllib.parse
+
+import tamarin
+from core_type import TamarinError, SubmittedFile, GradedFile, getAssignment
+from core_type import CourseSnapshot
+import core_storage
+
+# Bump whenever printSubmission's output changes, so cached copies are redone
+FRAGMENT_VERSION = 2
+
+def displaySubmission(filename, master=False):
+    """
+    Displays a single submitted file and its corresponding grader output.
+    
+    Filename means a UsernameA##-########-####.ext filename, which will 
+    correspond to a SubmittedFile or GradedFile.
+
+    If master is True, grade is a link to a modify/comment form and comments
+    include a delete option.
+    
+    Raises a TamarinError if the given file cannot be displayed.
+    """
+    print(renderSubmission(filename, master), end='')
+
+def renderSubmission(filename, master=False):
+    """
+    Returns the HTML displayed by displaySubmission.  If FRAGMENT_CACHE_ROOT
+    is set, this is the cached copy (see getFragmentKey) if it is still 
+    current.  Otherwise, it is rendered (by printSubmission) and cached.
+    
+    Holds a shared lock on the submission meanwhile, so it is never seen 
+    partway through being changed (see core_storage.lockSubmission).
+    """
+    with core_storage.lockSubmission(filename, shared=True):
+        submittedFile = getSubmittedFile(filename)
+        key = getFragmentKey(submittedFile, master)
+        fragment = loadFragment(submittedFile, master, key)
+        if fragment is None:
+            buffer = io.StringIO()
+            with contextlib.redirect_stdout(buffer):
+                printSubmission(submittedFile, master)
+            fragment = buffer.getvalue()
+            saveFragment(submittedFile, master, key, fragment)
+        return fragment
+
+def getSubmittedFile(filename):
+    """
+    Returns the GradedFile with the given filename or, if it is not graded
+    yet, the SubmittedFile.  Raises the same TamarinErrors as SubmittedFile
+    if there is no such file.
+    """
+    # most likely to be graded, so check that first
+    try:
+        return GradedFile(filename)
+    except TamarinError as err:
+        if err.key == 'NO_SUBMITTED_FILE':
+            # file not graded yet, so try submitted instead
+            return SubmittedFile(filename)
+        else:
+            # some more serious error, so let it carry on
+            raise err
+
+def getSubmissionPaths(submittedFile):
+    """
+    Returns the paths of all the files that the display of the given 
+    SubmittedFile or GradedFile is built from: the submission itself, its
+    grader output, and any review log and result sidecar.  For a file 
+    within an archive, the path of the archive's directory is given 
+    instead.
+    """
+    files = [submittedFile.path]
+    if isinstance(submittedFile, GradedFile):
+        files += [submittedFile.graderOutputPath, 
+                  submittedFile.getReviewPath(), submittedFile.getResultPath()]
+    elif submittedFile.getProvisionalOutputPath():
+        files += [submittedFile.getProvisionalOutputPath(), 
+                  submittedFile.getResultPath(provisional=True)]
+    return [core_storage.splitArchivePath(path)[0] 
+            if core_storage.isArchived(path) else path for path in files]
+
+def getSubmissionValidators(filename, master=False):
+    """
+    Returns the validators (see tamarin.getValidators) of a page showing 
+    the submission with the given filename, as per displaySubmission.  
+    Returns an empty list if there is no such submission, leaving the error
+    to be reported when it is displayed.
+    """
+    try:
+        submittedFile = getSubmittedFile(filename)
+    except TamarinError:
+        return []
+    paths = getSubmissionPaths(submittedFile)
+    # since a changed grade only renames files, include their directories
+    paths += sorted(set(os.path.dirname(path) for path in paths))
+    return tamarin.getValidators(paths + [__file__], 
+                                 getFragmentKey(submittedFile, master))
+
+def getSnapshotValidators(user=None, assignment=None, master=False):
+    """
+    Gathers a CourseSnapshot of the given user's submissions for the given
+    assignment (either of which may be None, as for CourseSnapshot), and 
+    returns it along with the validators (see tamarin.getValidators) of a 
+    page showing it, as per displayUser or displayAssignment.  
+    
+    These cover every submission's files (as for getSubmissionPaths), 
+    the directories they are in, and whether each assignment is too late
+    to submit to yet (which changes with no file changed).  Returns None 
+    and an empty list if the snapshot cannot be gathered, leaving the error
+    to be reported when it is displayed.
+    """
+    try:
+        snapshot = CourseSnapshot(user, assignment)
+    except TamarinError:
+        return None, []
+    paths = [__file__, tamarin.SUBMITTED_ROOT, tamarin.PROVISIONAL_ROOT]
+    tooLate = []
+    modified = []
+    for name, assign in sorted(snapshot.assignments.items()):
+        paths.append(assign.path)
+        if assign.isTooLate():
+            tooLate.append(name)
+            end = assign.policies[-1].end if assign.policies else assign.due
+            modified.append(tamarin.convertTimestampToTime(end).timestamp())
+    for key in sorted(snapshot.records):
+        for record in snapshot.records[key]:
+            fileExt = snapshot.assignments[record.assignment].type.fileExt
+            paths.append(record.path)
+            if record.graded:
+                stem = record.path[:-len(fileExt)]
+                paths += list(record.graderOutputPaths) + \
+                         [stem + tamarin.REVIEW_FILE_EXT, 
+                          stem + tamarin.RESULT_FILE_EXT]
+    paths = [core_storage.splitArchivePath(path)[0] 
+             if core_storage.isArchived(path) else path for path in paths]
+    return snapshot, tamarin.getValidators(paths, [FRAGMENT_VERSION, master,
+                                                   tooLate], modified)
+
+def getFragmentPath(submittedFile, master=False):
+    """
+    Returns the path in FRAGMENT_CACHE_ROOT of the cached HTML of the given
+    SubmittedFile or GradedFile, or None if there is no cache.
+    """
+    if not tamarin.FRAGMENT_CACHE_ROOT:
+        return None
+    name = submittedFile.filename + ('.master' if master else '') + '.html'
+    return os.path.join(tamarin.FRAGMENT_CACHE_ROOT, 
+                        submittedFile.assignment, name)
+
+def getFragmentKey(submittedFile, master=False):
+    """
+    Returns a string that changes whenever the HTML rendered for the given
+    SubmittedFile or GradedFile would: the submission, its grader output 
+    filename, and the size and mtime of each of its files (including any
+    review log and result sidecar); the master flag; and the display 
+    settings used.
+    """
+    stamps = []
+    for path in getSubmissionPaths(submittedFile):
+        try:
+            stat = os.stat(path)
+            stamps.append([os.path.basename(path), stat.st_size, 
+                           stat.st_mtime_ns])
+        except OSError:
+            stamps.append(None)
+    assignmentType = getAssignment(submittedFile.assignment).type
+    settings = [tamarin.CGI_URL, tamarin.HIGHLIGHT_PREFIX, 
+                tamarin.HIGHLIGHT_ELEMENTS, 
+                tamarin.SHORT_UNVERIFIED_GRADE_LABEL, tamarin.GRADE_START_TAG,
+                tamarin.GRADE_END_TAG, tamarin.MASTER_LINKS_OPEN_NEW_WINDOW,
+                assignmentType.preformatted, assignmentType.encoding]
+    return json.dumps([FRAGMENT_VERSION, submittedFile.filename, master, 
+                       stamps, settings])
+
+def loadFragment(submittedFile, master, key):
+    """
+    Returns the cached HTML of the given SubmittedFile or GradedFile if it
+    was cached with the given key, or else None.
+    """
+    path = getFragmentPath(submittedFile, master)
+    if not path:
+        return None
+    try:
+        with open(path, encoding='utf-8') as filein:
+            if filein.readline() != key + '\n':
+                return None
+            return filein.read()
+    except (OSError, ValueError):
+        return None
+
+def saveFragment(submittedFile, master, key, fragment):
+    """
+    Caches the given HTML of the given SubmittedFile or GradedFile under 
+    the given key, replacing any older copy.  Fails silently, since the 
+    HTML can always be rendered again.
+    """
+    path = getFragmentPath(submittedFile, master)
+    if not path:
+        return
+    # hidden until complete; per process in case two render at once
+    temp = os.path.join(os.path.dirname(path), 
+                        '.' + os.path.basename(path) + str(os.getpid()))
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(temp, 'w', encoding='utf-8') as fileout:
+            fileout.write(key + '\n')
+            fileout.write(fragment)
+        os.replace(temp, path)
+    except OSError:
+        pass
+
+def discardFragments(submittedFile):
+    """ Deletes all cached HTML of the given SubmittedFile or GradedFile. """
+    for master in (False, True):
+        path = getFragmentPath(submittedFile, master)
+        if path and os.path.exists(path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+def getStaleFragments():
+    """
+    Generates the path of each cached HTML file in FRAGMENT_CACHE_ROOT that
+    will never be used again: that of a submission that no longer exists, or
+    that has changed (such as by being archived) since it was cached.
+    """
+    if not tamarin.FRAGMENT_CACHE_ROOT:
+        return
+    for dirpath, dirnames, filenames in os.walk(tamarin.FRAGMENT_CACHE_ROOT):
+        for fn in sorted(filenames):
+            if fn.startswith('.') or not fn.endswith('.html'):
+                continue  # not a cached copy (temporary files are swept)
+            filename = fn[:-len('.html')]
+            master = filename.endswith('.master')
+            if master:
+                filename = filename[:-len('.master')]
+            path = os.path.join(dirpath, fn)
+            try:
+                key = getFragmentKey(getSubmittedFile(filename), master)
+                with open(path, encoding='utf-8') as filein:
+                    if filein.readline() == key + '\n':
+                        continue
+            except TamarinError:
+                pass  # no such submission
+            except (OSError, ValueError):
+                continue  # just removed, so leave be
+            yield path
+
+def printSubmission(submittedFile, master=False):
+    """
+    Prints the HTML of the given SubmittedFile or GradedFile for 
+    displaySubmission: its source code and then its grader output (if any).
+    """
+    filename = submittedFile.filename
+    print('<div class="submission">')
+    if master:
+        # the raw file, such as to download a binary submission
+        print('<h4><a href="masterview.py?source=' + filename + '">' + 
+              filename + '</a></h4>')
+    else:
+        print('<h4>' + filename + '</h4>')
+    assignment = getAssignment(submittedFile.assignment)
+
+    #how should we print this code?
+    usePre = assignment.type.preformatted
+    #print code
+    codefile = core_storage.openFile(submittedFile.path)
+    if usePre:
+        print('<pre class="code">')
+    else:
+        print('<div class="code">')
+    
+    if not assignment.type.encoding:
+        #can't display the contents (binary)
+        print('[ binary file format (' + submittedFile.fileExt + '): '
+              'cannot display contents here ]')
+    else:
+        for line in codefile:
+            #replace angle brackets and such
+            line = html.escape(line)
+            #if as text, need a little line-break formatting
+            if not usePre:
+                line = line.replace("\n", "<br>\n")
+            print(line, end='')  #since still have \n in line itself
+    
+    if usePre:
+        print('</pre>')
+    else:
+        print('</div>')
+    codefile.close()
+
+    if isinstance(submittedFile, GradedFile):
+        #a graded file
+        displayGraderOutput(submittedFile.graderOutputPath, filename, 
+                            submittedFile.humanVerified, master,
+                            submittedFile.loadReview(), 
+                            submittedFile.loadResult())
+    elif submittedFile.getProvisionalOutputPath():
+        #only quickly checked so far, so can't be modified yet
+        displayGraderOutput(submittedFile.getProvisionalOutputPath(), 
+                            filename, False, False, 
+                            result=submittedFile.loadResult(provisional=True))
+    else:
+        #only a submitted file
+        print('<div class="grader">')
+        print('<p><i>Submitted, but not yet graded.</i></p>')
+        print('</div>')
+    print('</div>')    
+
+def displayGraderOutput(path, filename, verified, master=False, review=(),
+                        result=None):
+    """
+    Displays the grader output file at the given path for the given 
+    submission filename, marking the grade as tentative if not verified.
+    Any given review log entries (see GradedFile.loadReview) are merged in.
+    The given result sidecar, if any, is used as per readGraderOutput.
+    
+    If master is True, grade is a link to a modify/comment form and comments
+    include a delete option.
+    """
+    for kind, value in readGraderOutput(path, review, result):
+        if kind == 'comment':
+            cid, line = value
+            # add delete button to comments
+            if master:
+                line += ('<form action="' + tamarin.CGI_URL +
+                        'masterview.py" method="post" ' 
+                        'enctype="multipart/form-data" ' 
+                        'class="deleteComment">\n')
+                line += ('<input type="hidden" name="submission" ' +
+                         'value="' + filename + '">\n')
+                line += ('<input type="hidden" name="deleteComment" ' +
+                         'value="' + str(cid) + '">\n')
+                line += ('<input type="submit" ' +
+                         'value="Delete Comment">\n')
+                line += '</form>\n'           
+            
+        elif kind == 'html':
+            print(value, end='')  # already highlighted
+            continue
+        
+        elif kind == 'grade':
+            # mark grade tentative and/or convert to link
+            line = tamarin.GRADE_START_TAG  # reconstruct the line
+            if master:
+                #make this a link to modifying the grade             
+                line += '<a href="masterview.py?submission=' + \
+                        filename + '#append"'
+                if tamarin.MASTER_LINKS_OPEN_NEW_WINDOW:
+                    line += ' target="_blank"'
+                line += '>'
+            
+            line += value  #grade
+            if not verified:
+                line += tamarin.SHORT_UNVERIFIED_GRADE_LABEL
+
+            if master:
+                #end link
+                line += '</a>'
+            line += tamarin.GRADE_END_TAG + '\n' #end line
+        else:
+            line = value
+
+        print(highlightLine(line), end='')
+
+def highlight(text):
+    """ Returns the given text with each line marked up by highlightLine. """
+    if not tamarin.HIGHLIGHT_PREFIX:
+        return text
+    return ''.join(highlightLine(line) for line in io.StringIO(text))
+
+def highlightLine(line):
+    """
+    Returns the given line of grader output, marked up if it starts with
+    HIGHLIGHT_PREFIX: the whole line as a graderOutputLine, and any 
+    [HIGHLIGHT_ELEMENTS] in it as graderELEMENT.
+    """
+    if tamarin.HIGHLIGHT_PREFIX and line.startswith(tamarin.HIGHLIGHT_PREFIX):
+        #</span> comes after line break, which is slightly annoying
+        line = '<span class="graderOutputLine">' + line + '</span>'
+        for elem in tamarin.HIGHLIGHT_ELEMENTS:
+            line = line.replace('[' + elem + ']', 
+                                '[<span class="grader' + elem +
+                                   '">' + elem + '</span>]')
+    return line
+
+def readGraderOutput(path, review=(), result=None):
+    """
+    Generates the contents of the grader output file at the given path,
+    merged with the given review log entries (as per mergeReview), as a 
+    series of (kind, value) tuples.  Kind is one of:
+    
+    * 'line' - value is a line of the output
+    * 'comment' - value is a (commentID, line) tuple, where line is the 
+                  first line of a TA comment (the rest follow as lines)
+    * 'grade' - value is the grade (as a str) from the grade line
+    * 'html' - value is a run of lines already highlighted when graded
+    
+    If given the result sidecar for this grader output (see
+    SubmittedFile.loadResult), its offsets are used to find the grade line
+    and comments come only from the review log.  If the sidecar also says
+    the output is already highlighted, all of the output before and after
+    the grade line is read straight through as two 'html' parts.  Otherwise,
+    as for grader output from older versions of Tamarin, each line is 
+    scanned for comments and the grade.
+    """
+    review = getCurrentReview(review)
+    if not result:
+        with core_storage.openFile(path) as gradeFile:
+            for line in mergeReview(gradeFile, review):
+                if '<div class="comment' in line:
+                    cid = int(re.search(r'id="comment(\d+)"', line).group(1))
+                    yield 'comment', (cid, line)
+                elif tamarin.GRADE_START_TAG in line:
+                    match = re.match(tamarin.GRADE_START_TAG + 
+                                     r"\s*([^<]+)\s*" + tamarin.GRADE_END_TAG,
+                                     line)
+                    yield 'grade', match.group(1)
+                else:
+                    yield 'line', line
+        return
+    
+    deleted = set(e['deleteComment'] for e in review if 'deleteComment' in e)
+    grades = [e['grade'] for e in review if 'grade' in e]
+    encoding = locale.getpreferredencoding(False)  # as written by GradeFile
+    decode = lambda raw: raw.decode(encoding).replace('\r\n', '\n')
+    
+    def readReview():
+        """ Generates the parts that replace the grade line. """
+        for e in review:
+            if 'comment' in e and e['id'] not in deleted:
+                lines = formatComment(e['id'], e['comment'])
+                yield 'comment', (e['id'], lines[0])
+                for commentLine in lines[1:]:
+                    yield 'line', commentLine
+        yield 'grade', str(grades[-1] if grades else result['grade'])
+    
+    with core_storage.openFile(path, 'rb') as gradeFile:
+        if result.get('highlighted'):
+            yield 'html', decode(gradeFile.read(result['gradeStart']))
+            yield from readReview()
+            gradeFile.read(result['gradeEnd'] - result['gradeStart'])
+            yield 'html', decode(gradeFile.read())
+            return
+        
+        offset = 0
+        for line in gradeFile:
+            if offset == result['gradeStart']:
+                yield from readReview()
+            elif not result['gradeStart'] < offset < result['gradeEnd']:
+                yield 'line', decode(line)
+            offset += len(line)
+
+def formatComment(commentID, comment):
+    """
+    Returns the given TA comment (already in HTML) with the given ID as 
+    a list of lines of HTML, in the form they appear in grader output.
+    """
+    return ['<div class="comment" id="comment' + str(commentID) + '">\n',
+            '<p><b>' + tamarin.TA_COMMENT + '</b><br>\n',
+            comment + '\n',
+            '</p>\n',
+            '</div><!--comment' + str(commentID) + '-->\n']
+
+def getCurrentReview(review):
+    """
+    Returns those of the given review log entries that apply to the current 
+    grader output; that is, those after the last 'regrade' entry, which 
+    GradeFile appends when it replaces the output the earlier ones reviewed.
+    """
+    for i in range(len(review) - 1, -1, -1):
+        if review[i].get('regrade'):
+            return review[i + 1:]
+    return review
+
+def mergeReview(lines, review):
+    """
+    Generates the given lines of grader output merged with the given list of
+    review log entries (see GradedFile.loadReview).  That is, comments
+    deleted in the log are skipped, comments added in the log are inserted 
+    before the grade, and the grade is replaced by the last one in the log.
+    Only those entries made since the output was last regraded are used.
+    """
+    review = getCurrentReview(review)
+    deleted = set(e['deleteComment'] for e in review if 'deleteComment' in e)
+    grades = [e['grade'] for e in review if 'grade' in e]
+    deleting = None
+    for line in lines:
+        if '<div class="comment"' in line:
+            cid = int(re.search(r'id="comment(\d+)"', line).group(1))
+            if cid in deleted:
+                deleting = cid
+        if deleting is not None:
+            # skip all lines of this comment until its end tag
+            if '</div><!--comment' + str(deleting) in line:
+                deleting = None
+            continue
+        
+        if tamarin.GRADE_START_TAG in line:
+            for e in review:
+                if 'comment' in e and e['id'] not in deleted:
+                    yield from formatComment(e['id'], e['comment'])
+            if grades:
+                line = tamarin.GRADE_START_TAG + str(grades[-1]) + \
+                       tamarin.GRADE_END_TAG + '\n'
+        yield line
+
+def displayAssignmentSubmissions(user, assignmentName, 
+                                 brief=False, master=False, snapshot=None):
+    """
+    Displays all the submissions the user made for this assignment.
+    
+    In brief mode, this will just be a list of files, including the grade
+    for each one.  Each listing will be a button (or link, if in master mode)
+    to the appropriate submission view.  In master mode, each listing also 
+    has a link to expand that submission in place (see masterview.js).
+    
+    If in full mode (that is, brief=False), will show each submission expanded 
+    within this view.
+    
+    At the top off all submissions, will include a header listing the 
+    assignment and the final grade based on last submission and late policy
+    adjustments.
+    
+    The submissions are taken from the given CourseSnapshot, if any.
+    Otherwise, a new snapshot is gathered for just this user and assignment.
+    """
+    if not snapshot:
+        snapshot = CourseSnapshot(user, assignmentName)
+    assignment = snapshot.assignments[assignmentName]
+    files = snapshot.getSubmissions(user, assignmentName)
+    
+    # calculate final grade and status for this assignment
+    # (Assuming that even ungraded and grader-error submissions count as
+    # submissions, we only need the grade of the last submission to have an 
+    # accurate final grade.)
+    grade = '<i>Not yet submitted.</i>'
+    reason = None
+
+    if files:
+        lastSubmit = files[-1]
+        if not lastSubmit.graded:
+            grade = '<i>Not yet graded.</i>'
+        else:
+            lastFile = GradedFile.fromRecord(lastSubmit, assignment)
+            grade = lastFile.getAdjustedGrade(len(files))
+            lateness = lastFile.getLateGradeAdjustment()
+            resubmits = lastFile.getResubmissionGradeAdjustment(len(files))
+            
+            if lateness or resubmits:
+                # explain grade calcs
+                reason = '[= ' + str(lastFile.grade)
+                if lateness:
+                    reason += ' ' + str(lateness)
+                    offset = lastFile.getLateOffset()
+                    label = 'early' if offset[0] == '-' else 'late'
+                    reason += ' <i>(' + label + ' ' + offset + ')</i>'
+                if resubmits:
+                    reason += ' ' + str(resubmits)
+                    reason += ' <i>(' + str(len(files) - 1) + \
+                              '&nbsp;resubmits)</i>'
+                reason += ']'
+            elif lastFile.isLate():
+                # just a little informational timestamping
+                reason = '<small>' + lastFile.getLateOffset() + '</small>'
+            
+            # mark grade if not verified yet
+            if not lastFile.humanVerified:
+                grade = '<span class="unverified">' + str(grade) + \
+                        tamarin.UNVERIFIED_GRADE_LABEL + '</span>'
+    else:
+        #no files submitted at all yet
+        if assignment.isTooLate():
+            #can't submit, so grade goes to 0
+            grade = 0
+            reason = '<i>Too late to submit.</i>'
+
+    # print submission list header, starting with assignment grade
+    print('<div class="submissionList">')
+    print('<div class="assignment">')
+    print('<table class="assignment"><tr><td class="assignment">')
+    print('<b>' + assignment.name + '</b> &nbsp;')
+    print('<small>(Due: ' + assignment.due + '. ')
+    print('Total: ' + str(assignment.maxScore) + ' points.)</small></td>')
+    print('<td class="grade"><b>Grade:</b> ' + str(grade) + '</td>')
+    if reason:
+        print('<td class="reason">' + reason + '</td>')
+    print('</tr></table>')
+
+    #list contents
+    if files and brief:
+        print('<ul>')
+    for f in files:
+        if brief:
+            if master:
+                print('<li><a href="masterview.py?submission=' + 
+                      f.filename + '"', end='')
+                if tamarin.MASTER_LINKS_OPEN_NEW_WINDOW:
+                    print(' target="_blank"', end='')
+                print('>' + f.filename + '</a>', end=' ') 
+            else:
+                print('<li><input type="submit" name="submission" value="' + 
+                      f.filename + '">', end=' ')
+            if not f.graded:
+                provisional = SubmittedFile(f.filename, virtualFile=True)
+                provisional = provisional.getProvisionalOutputPath()
+                if provisional:
+                    match = re.match(tamarin.GRADED_RE, 
+                                     os.path.basename(provisional))
+                    print('&nbsp; [<i>Not yet graded; quick check:</i> ' + 
+                          match.group(4) + 
+                          tamarin.SHORT_UNVERIFIED_GRADE_LABEL + ']')
+                else:
+                    print('&nbsp; [<i>Not yet graded.</i>]')
+            else:
+                graded = GradedFile.fromRecord(f, assignment)
+                shortGrade = str(graded.grade)
+                if not graded.humanVerified:
+                    shortGrade += tamarin.SHORT_UNVERIFIED_GRADE_LABEL
+                if graded.humanComment:
+                    shortGrade += tamarin.HUMAN_COMMENT_LABEL
+                print('&nbsp; [' + shortGrade + ']')
+            if master:
+                print('<a class="expand" href="masterview.py?fragment=' + 
+                      f.filename + '" onclick="return expandSubmission(this)"'
+                      '>[+]</a><div class="fragment"></div>')
+        else:
+            displaySubmission(f.filename, master)
+          
+    #list footer
+    if files and brief:
+        print('</ul>')
+    print('</div></div>')
+            
+def displayUser(user, assignment=None, brief=True, master=False, 
+                snapshot=None):
+    """
+    Displays the work of the given user.  
+    
+    If the name of the assignment is specified, it displays only that 
+    assignment. Otherwise, displays an assignmentSubmissions view for every 
+    assignment for this user. In other words, shows all the work this user 
+    has submitted (or not).
+    
+    A brief assignmentSubmissions view is on by default for this function.
+    
+    The submissions are taken from the given CourseSnapshot, if any.
+    Otherwise, a new snapshot is gathered for just this user.
+    """
+    if not snapshot:
+        snapshot = CourseSnapshot(user, assignment)
+    
+    #get assignment list
+    if assignment:
+        assignments = [snapshot.assignments[assignment].name]
+    else:
+        assignments = sorted(snapshot.assignments)
+    
+    #print user table
+    details = tamarin.getUserDetails(user)
+    print('<div class="user">')
+    print('<table class="user"><tr>')
+    print('<td class="user"><b>' + user.lower() + '</b>')
+    print('&nbsp; <small>(' + str(details[2]) + ' ' + str(details[1]) + 
+          ')</small></td>')
+    print('<td class="section">Section: ' + str(details[0]) + '</td>')
+    print('</tr></table>')
+      
+    for assign in assignments:
+        displayAssignmentSubmissions(user, assign, brief, master, snapshot)
+    print('</div>')
+ 
+def displayAssignment(assignment, brief=False, master=False, section=None,
+                      page=1, snapshot=None):
+    """
+    Displays the assignment submission lists for every user
+    for the given assignment.  (This is basically the "grading" view.)
+    If a section is given, shows only the users in that section.
+    
+    In full mode (brief=False), shows only the given page (numbered from 1)
+    of MASTERVIEW_USERS_PER_PAGE users, with links to the other pages 
+    above and below.
+    
+    The submissions are taken from the given CourseSnapshot, if any.
+    Otherwise, a new snapshot is gathered for this assignment.
+    """
+    users = tamarin.getUsers(section or None)
+    total = len(users)
+    perPage = tamarin.MASTERVIEW_USERS_PER_PAGE
+    paged = not brief and perPage and total > perPage
+    if paged:
+        pages = (total + perPage - 1) // perPage
+        page = min(max(page, 1), pages)
+        first = (page - 1) * perPage
+        users = users[first:first + perPage]
+        displayPageLinks(assignment, section, page, pages, first, users, 
+                         total)
+    if not snapshot:
+        snapshot = CourseSnapshot(assignment=assignment)
+    for u in users:
+        displayUser(u, assignment, brief, master, snapshot)  
+    if paged:
+        displayPageLinks(assignment, section, page, pages, first, users, 
+                         total)
+
+def displayPageLinks(assignment, section, page, pages, first, users, total):
+    """
+    Displays which users are on the given page of the full (masterview) 
+    view of the given assignment (and section, if any), and links to each of 
+    its pages.  first is the index of the first of the given users on this 
+    page out of the total.
+    """
+    url = 'masterview.py?assignment=' + assignment + '&amp;brief='
+    if section:
+        url += '&amp;section=' + html.escape(urllib.parse.quote(section))
+    print('<p class="pages">Users ' + str(first + 1) + '-' + 
+          str(first + len(users)) + ' of ' + str(total) + ' (' + 
+          users[0] + ' to ' + users[-1] + '). &nbsp; Page:')
+    for p in range(1, pages + 1):
+        if p == page:
+            print('<b>' + str(p) + '</b>')
+        else:
+            print('<a href="' + url + '&amp;page=' + str(p) + '">' + 
+                  str(p) + '</a>')
+    print('</p>')
+
+def modifySubmission(filename):
+    """
+    Extends displaySubmission to append a form for the master to append 
+    a comment and/or change the grade. Sends these change to appendComment 
+    (in masterview.py), which deals with the actual hassle of storing 
+    the changes.
+    """
+    # doesn't need grade link, but may want delete comment option, so master
+    displaySubmission(filename, master=True)
+    submittedFile = GradedFile(filename)
+    print('<form class="modify" action="masterview.py#bottom" method="post">')
+    print('<input type="hidden" name="submission" value="' + filename + '">')
+    print('<p id="append"><b>Comment to append:</b></p>')
+    print('<textarea name="comment" rows="4" cols="80"></textarea><br>')
+    print('<p><b>New grade:</b>')
+    print('<input type="text" name="grade" size="6"',) 
+    print('value="' + str(submittedFile.grade) + '">')
+    print('&nbsp; <b>Human verified:</b> ')
+    print('<input type="checkbox" name="verify" checked> &nbsp;')
+    print('<input type="submit" name="modify" value="Modify">')
+    print('</p></form>')
+
@@ -1,146 +1,218 @@
-#!python3
-
-## submit.py 
-
-"""
-Given an previously uploaded file, processes that file as a submission.  
-
-Should be given the name of a file already saved in UPLOADED_ROOT.
-Will then timestamp the file and move it into SUBMITTED_ROOT.
-If grading is then possible, it will go ahead and start the grading pipeline.
-
-If anything goes wrong along the way, reports to what happened to user.
-
-Part of Tamarin, by Zach Tomaszewski.  
-Created: 01 Aug 2008.
-"""
-
-import cgi
-import os
-import re
-import shutil
-import subprocess
-
-import tamarin
-from core_type import TamarinError
-
-def main(form=None):
-    if not form:
-        form = cgi.FieldStorage()
-    tamarin.printHeader("Submission and Grading Results")
-    print('<h2>Submission and Grading Results</h2>')
-    try: 
-        print('<p>')
-
-        # check that submitted form was correct with all needed details
-        if 'uploaded' not in form:
-            raise TamarinError('BAD_SUBMITTED_FORM', "Missing uploaded field.")
-        
-        # validate filename format, printing username and assignment
-        filename = form.getfirst('uploaded')
-        match = re.match(tamarin.UPLOADED_RE, filename)
-        if not match:
-            raise TamarinError('BAD_SUBMITTED_FORM', "Wrong filename format.")
-              
-        print('<b>Username:</b> ' +  match.group(1) + '<br>')
-        print('<b>Assignment:</b> ' + match.group(2) + '<br>')
-    
-        # check that uploaded file really exists
-        uploadedFilename = os.path.join(tamarin.UPLOADED_ROOT, filename)
-        if not os.path.exists(uploadedFilename):
-            raise TamarinError('NO_UPLOADED_FILE')
-    
-        # create submitted filename and move uploaded file to submitted folder
-        currentStamp = tamarin.convertTimeToTimestamp()
-        submittedFilename = filename.replace('.', '-' + currentStamp + '.', 1)
-        submittedFilename = os.path.join(tamarin.SUBMITTED_ROOT, 
-                                         submittedFilename)
-        shutil.move(uploadedFilename, submittedFilename)
-        print('<b>File submitted at:</b> ' + currentStamp + '<br>')
-        # Yay!  Submission is successful, and user is DONE
-        print('<i>--Submission completed successfully--</i>')
-        print('</p>')
-
-        # now start grading...
-        # (In future, might have option to grade in real time.  For now, 
-        #  just start the grade pipe and print results.)
-        startGradePipe()      
-    
-    except TamarinError as err:
-        tamarin.printError(err)
-        print('<p>')
-        print("Due to the above error, your file was <i>not</i> successfully "
-            "submitted. You may want to try again or else contact your " 
-            "Tamarin administrator ")
-        if tamarin.ADMIN_EMAIL:
-            print("(" + tamarin.ADMIN_EMAIL + ")")
-        print(" with the details of the error you encountered.")
-        print('</p>')   
-    except:
-        tamarin.printError('UNHANDLED_ERROR')
-    finally: 
-        tamarin.printFooter()
-
-
-def startGradePipe(printStatus=True):
-    """
-    If not already running, spawns a new instance of the grade pipe as a
-    separate process. (See gradepipe.py for more.)
-    
-    Returns True if the gradepipe was actually started; False if not 
-    (usually because it's already running or because it's been disabled.)
-    
-    If printStatus=True, prints a message concerning the initial state 
-    of the grade pipe (ie, already running or whether it was just started).
-    """
-    active = False
-    if printStatus:
-        print('<p><b>Grading:</b>')
-  
-    if os.path.exists(tamarin.GRADEPIPE_DISABLED):
-        if printStatus:
-            print('Queued.</p>')
-            print('<p>The grade pipe is currently disabled. '
-                  'Your submission has been added to the end of grading '
-                  'queue, to be compiled and/or graded once the grade pipe '
-                  'is activated again.</p>')
-
-    elif os.path.exists(tamarin.GRADEPIPE_ACTIVE):
-        # gradepipe already running
-        if printStatus:
-            print('Queued.</p>')
-            print('<p>The grade pipe is already running, grading earlier '
-                  'submissions than yours.  Your submission has been ' 
-                  'added to the end of grading queue. </p>')
-    
-    else:
-        # gradepipe not running yet, so start it up.
-        # First, make sure the redirected input file exists
-        open(tamarin.GRADEPIPE_IN, 'w').close()
-        # Spawn the gradepipe, redirecting in/out to get a clean separation
-        # End of process will close the files.
-        # NOTE: If you get a crash complaining about this line (probably
-        # only the last "stderr" line of which is printed in the error 
-        # message), check that your GRADEPIPE_CMD is valid.
-        subprocess.Popen(tamarin.GRADEPIPE_CMD.split(), 
-                         stdin=open(tamarin.GRADEPIPE_IN), 
-                         stdout=open(tamarin.GRADEPIPE_OUT, 'w'), 
-                         stderr=open(tamarin.GRADEPIPE_OUT, 'w'))
-        active = True
-        if printStatus:
-            print('Started.</p>')
-            print('<p>The grade pipe has been started in order to grade '
-                  'your submission, which is at the front of the grading '
-                  'queue.</p>')
-    
-    if printStatus:
-        print('<p>See <a href="' + tamarin.CGI_URL + 'status.py">status</a> ' +
-              'for more on the current state of the submitted/grading ' 
-              'queue.</p>')
-        
-    return active
-
-
-if __name__ == "__main__":
-    #running as a script (rather than as imported module)
-    main()
+#!python3
+
+## submit.py 
+
+"""
+Given an previously uploaded file, processes that file as a submission.  
+
+Should be given the name of a file already saved in UPLOADED_ROOT.
+Will then timestamp the file and move it into SUBMITTED_ROOT.
+If grading is then possible, it will go ahead and start the grading pipeline.
+
+If anything goes wrong along the way, reports to what happened to user.
+
+Part of Tamarin, by Zach Tomaszewski.  
+Created: 01 Aug 2008.
+"""
+
+import cgi
+import os
+import re
+import shutil
+import subprocess
+import time
+
+import tamarin
+import core_index
+import core_journal
+import core_storage
+from core_type import TamarinError, getAssignment
+
+def main(form=None):
+    if not form:
+        form = cgi.FieldStorage()
+    tamarin.printHeader("Submission and Grading Results")
+    print('<h2>Submission and Grading Results</h2>')
+    try: 
+        print('<p>')
+
+        # check that submitted form was correct with all needed details
+        if 'uploaded' not in form:
+            raise TamarinError('BAD_SUBMITTED_FORM', "Missing uploaded field.")
+        
+        # validate filename format, printing username and assignment
+        filename = form.getfirst('uploaded')
+        match = re.match(tamarin.UPLOADED_RE, filename)
+        if not match:
+            raise TamarinError('BAD_SUBMITTED_FORM', "Wrong filename format.")
+              
+        print('<b>Username:</b> ' +  match.group(1) + '<br>')
+        print('<b>Assignment:</b> ' + match.group(2) + '<br>')
+    
+        # check that uploaded file really exists
+        uploadedFilename = os.path.join(tamarin.UPLOADED_ROOT, filename)
+        if not os.path.exists(uploadedFilename):
+            raise TamarinError('NO_UPLOADED_FILE')
+    
+        # create submitted filename and move uploaded file to submitted folder
+        submittedFilename = moveToSubmitted(uploadedFilename)
+        core_index.recordSubmitted(submittedFilename)
+        core_journal.recordSubmitted(submittedFilename)
+        currentStamp = re.match(tamarin.SUBMITTED_RE, 
+                                submittedFilename).group(3)
+        print('<b>File submitted at:</b> ' + currentStamp + '<br>')
+        # Yay!  Submission is successful, and user is DONE
+        print('<i>--Submission completed successfully--</i>')
+        print('</p>')
+
+        # now start grading...
+        # (In future, might have option to grade in real time.  For now, 
+        #  just start the grade pipe and print results.)
+        startGradePipe()      
+    
+    except TamarinError as err:
+        tamarin.printError(err)
+        print('<p>')
+        print("Due to the above error, your file was <i>not</i> successfully "
+            "submitted. You may want to try again or else contact your " 
+            "Tamarin administrator ")
+        if tamarin.ADMIN_EMAIL:
+            print("(" + tamarin.ADMIN_EMAIL + ")")
+        print(" with the details of the error you encountered.")
+        print('</p>')   
+    except:
+        tamarin.printError('UNHANDLED_ERROR')
+    finally: 
+        tamarin.printFooter()
+
+
+def moveToSubmitted(uploadedFilename):
+    """
+    Moves the given uploaded file into SUBMITTED_ROOT, timestamping it to
+    the second.  Returns the new filename (without path).
+    
+    If another submission of the same file already has that timestamp 
+    (such as from a double-clicked submit button), adds a sequence number 
+    to the timestamp instead (up to _99, after which it waits for the next
+    second).  Concurrent submissions never overwrite each other, since 
+    each new name is claimed by claimSubmittedName.
+    """
+    filename = os.path.basename(uploadedFilename)
+    match = re.match(tamarin.UPLOADED_RE, filename)
+    currentStamp = tamarin.convertTimeToTimestamp(seconds=True)
+    try:
+        assignment = getAssignment(match.group(2))
+    except TamarinError:
+        assignment = None  # let grading report on this later
+    source = uploadedFilename
+    if os.stat(source).st_dev != os.stat(tamarin.SUBMITTED_ROOT).st_dev:
+        # on another filesystem, so first copy over under a hidden name
+        source = os.path.join(tamarin.SUBMITTED_ROOT, 
+                              '.' + filename + str(os.getpid()))
+        shutil.move(uploadedFilename, source)
+    # while not yet visible to the gradepipe; links made below share the blob
+    core_storage.storeBlob(source)
+    seq = 1
+    while True:
+        if seq > 99:
+            # a _100 suffix would sort before _99, so wait for a new stamp
+            time.sleep(1)
+            currentStamp = tamarin.convertTimeToTimestamp(seconds=True)
+            seq = 1
+        stamp = currentStamp if seq == 1 else \
+                currentStamp + '_' + str(seq).zfill(2)
+        submittedFilename = filename.replace('.', '-' + stamp + '.', 1)
+        submittedPath = os.path.join(tamarin.SUBMITTED_ROOT, 
+                                     submittedFilename)
+        seq += 1
+        if assignment and assignment.glob(submittedFilename, match.group(1)):
+            continue  # already graded
+        try:
+            claimSubmittedName(source, submittedPath)
+        except FileExistsError:
+            continue
+        return submittedFilename
+
+def claimSubmittedName(source, path):
+    """
+    Moves the given file to the given path on the same filesystem, but 
+    raises a FileExistsError instead if that path is already taken.
+    
+    The file is hard-linked to its new name, which fails rather than 
+    replacing an existing file.  Where hardlinks are not supported, the
+    name is reserved by creating it exclusively, and the file is then
+    renamed over it in a single step.
+    """
+    try:
+        os.link(source, path)
+    except FileExistsError:
+        raise
+    except OSError:
+        os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        os.replace(source, path)
+        return
+    os.remove(source)
+
+def startGradePipe(printStatus=True):
+    """
+    If not already running, spawns a new instance of the grade pipe as a
+    separate process. (See gradepipe.py for more.)
+    
+    Returns True if the gradepipe was actually started; False if not 
+    (usually because it's already running or because it's been disabled.)
+    
+    If printStatus=True, prints a message concerning the initial state 
+    of the grade pipe (ie, already running or whether it was just started).
+    """
+    active = False
+    if printStatus:
+        print('<p><b>Grading:</b>')
+  
+    if os.path.exists(tamarin.GRADEPIPE_DISABLED):
+        if printStatus:
+            print('Queued.</p>')
+            print('<p>The grade pipe is currently disabled. '
+                  'Your submission has been added to the end of grading '
+                  'queue, to be compiled and/or graded once the grade pipe '
+                  'is activated again.</p>')
+
+    elif os.path.exists(tamarin.GRADEPIPE_ACTIVE):
+        # gradepipe already running
+        if printStatus:
+            print('Queued.</p>')
+            print('<p>The grade pipe is already running, grading earlier '
+                  'submissions than yours.  Your submission has been ' 
+                  'added to the end of grading queue. </p>')
+    
+    else:
+        # gradepipe not running yet, so start it up.
+        # First, make sure the redirected input file exists
+        open(tamarin.GRADEPIPE_IN, 'w').close()
+        # Spawn the gradepipe, redirecting in/out to get a clean separation
+        # End of process will close the files.
+        # NOTE: If you get a crash complaining about this line (probably
+        # only the last "stderr" line of which is printed in the error 
+        # message), check that your GRADEPIPE_CMD is valid.
+        subprocess.Popen(tamarin.GRADEPIPE_CMD.split(), 
+                         stdin=open(tamarin.GRADEPIPE_IN), 
+                         stdout=open(tamarin.GRADEPIPE_OUT, 'w'), 
+                         stderr=open(tamarin.GRADEPIPE_OUT, 'w'))
+        active = True
+        if printStatus:
+            print('Started.</p>')
+            print('<p>The grade pipe has been started in order to grade '
+                  'your submission, which is at the front of the grading '
+                  'queue.</p>')
+    
+    if printStatus:
+        print('<p>See <a href="' + tamarin.CGI_URL + 'status.py">status</a> ' +
+              'for more on the current state of the submitted/grading ' 
+              'queue.</p>')
+        
+    return active
+
+
+if __name__ == "__main__":
+    #running as a script (rather than as imported module)
+    with tamarin.response():
+        main()
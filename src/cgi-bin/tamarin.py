@@ -12,8 +12,14 @@ Part of Tamarin, by Zach Tomaszewski.
 Created: 06 Jun 2008.
 """
 
+import contextlib # to buffer each CGI response
 import datetime   # for determining submission lateness, etc
+import email.utils # for the Last-Modified dates of pages
 import glob       # to check for file existence
+import gzip       # to compress CGI responses
+import hashlib    # for the ETags of pages
+import io         # to buffer each CGI response
+import json       # for the precompiled USERS_CACHE
 import os.path    # for checking file existence and joining paths
 import re         # to compare/process timestamps, etc
 import sys        # for crash/error reporting
@@ -62,6 +68,11 @@ SUBMITTED_ROOT = os.path.join(TAMARIN_ROOT, 'submitted')
 #
 GRADEZONE_ROOT = os.path.join(TAMARIN_ROOT, 'gradezone')
 
+# A second gradezone where the next submission is staged while the current 
+# one is graded.  Only used if GRADEPIPE_PREFETCH is True.
+#
+GRADEZONE_PREFETCH_ROOT = os.path.join(TAMARIN_ROOT, 'gradezone2')
+
 # Where assignment directories are created. 
 # A directory for each assignment must be created manually within
 # GRADED_ROOT so that Tamarin knows it can accept submissions for
@@ -74,6 +85,15 @@ GRADEZONE_ROOT = os.path.join(TAMARIN_ROOT, 'gradezone')
 # 
 GRADED_ROOT = os.path.join(TAMARIN_ROOT, 'graded')
 
+# If True, graded submissions (and their grader output files) are stored in
+# a subfolder for each user within each assignment folder, rather than 
+# all together in the assignment folder.  This keeps directories small 
+# for large classes.  Tamarin finds files in either place, so this can be 
+# changed at any time; run core_storage.py to move existing files into 
+# the new layout.  (Default: False)
+#
+SHARD_GRADED_BY_USER = False
+
 # Where a subfolder for each assignment (in format of [A-Z]\d\d\w?)
 # holds the necessary grader and any extra files need for 
 # grading that assignment.  
@@ -88,11 +108,41 @@ GRADERS_ROOT = os.path.join(TAMARIN_ROOT, 'graders')
 # 
 STRIPPED_ROOT = os.path.join(TAMARIN_ROOT, 'stripped')
 
+# If set, submitted files are each stored only once per distinct content.  
+# Each such file is then just a hardlink to a file in this directory named
+# by the SHA-256 of its contents.  (Copies made by the strip tool are not, 
+# so that the janitor can expire them by their own modification times.)
+# This directory must be on the same filesystem as SUBMITTED_ROOT and 
+# GRADED_ROOT.  Set to None to store every file separately.  (See 
+# core_storage.py for converting existing files and for reporting the 
+# space saved.)
+# 
+BLOB_ROOT = None
+
 # Where to dump various files created as Tamarin runs to indicate
 # its status.  (See FILES section below.)
 # 
 STATUS_ROOT = os.path.join(TAMARIN_ROOT, 'status')
 
+# Where the gradepipe caches the results of grading each assignment's 
+# reference solution.  (See REFERENCE_SOLUTION_DIR below.)  This directory
+# will be created when first needed.
+# 
+PREFLIGHT_ROOT = os.path.join(STATUS_ROOT, 'preflight')
+
+# Where to keep the lock files used to keep the gradepipe and masterview
+# tools from changing the same submission at once.  (See 
+# core_storage.lockSubmission.)  This directory will be created when first
+# needed.
+# 
+LOCK_ROOT = os.path.join(STATUS_ROOT, 'locks')
+
+# Where the provisional grader output for a submission is stored between
+# the quick and full phases of a two-phase SubmissionType.  (See 
+# SUBMISSION_TYPES below.)  This directory will be created when first needed.
+# 
+PROVISIONAL_ROOT = os.path.join(TAMARIN_ROOT, 'provisional')
+
 
 ## ---FILES----
 ## Defines the location and name of special files used to control
@@ -143,6 +193,45 @@ USERS_FILE = os.path.join(TAMARIN_ROOT, 'users.txt')
 # 
 USERS_FILE_DELIM = '|'   
 
+# Location of a precompiled copy of USERS_FILE.  If set, the parsed users
+# are saved here whenever USERS_FILE changes, so that later requests can 
+# load a large roster without parsing USERS_FILE again.  For example: 
+# os.path.join(STATUS_ROOT, 'users.json')  (Default: None)
+#
+USERS_CACHE = None
+
+# Location of an SQLite index of every submission, maintained by 
+# core_index.py.  If USE_SUBMISSION_INDEX is True, views look up 
+# submissions and their grades in this index rather than searching through
+# GRADED_ROOT and SUBMITTED_ROOT.  The index is rebuilt from those 
+# directories if it is missing; if files are moved around by hand, rebuild
+# it through masterview or by running core_index.py.  (Default: False)
+#
+SUBMISSION_INDEX = os.path.join(STATUS_ROOT, 'submissions.db')
+USE_SUBMISSION_INDEX = False
+
+# Location of an append-only journal of every change to a submission 
+# (submitted, graded, verified, commented, etc), kept by core_journal.py 
+# if USE_EVENT_JOURNAL is True.  Each event is numbered, so caches and 
+# other tools can read just the events since they last looked.  Compact
+# it now and then by running "core_journal.py compact".  (Default: False)
+#
+EVENT_JOURNAL = os.path.join(STATUS_ROOT, 'journal.log')
+USE_EVENT_JOURNAL = False
+
+# Folder in which to cache the HTML rendered for each submission (its 
+# escaped source code and highlighted grader output), so that views like
+# masterview's full mode do not render hundreds of submissions from 
+# scratch on every request.  A cached copy is used only while the 
+# submission's files and the display settings below are unchanged.  Add
+# 'render' to GRADEPIPE_MAINTENANCE to have the gradepipe render new and
+# changed submissions ahead of time.  The janitor removes cached copies 
+# that can no longer be used, such as those of archived submissions.  
+# For example:
+# os.path.join(STATUS_ROOT, 'fragments')  (Default: None, for no cache)
+#
+FRAGMENT_CACHE_ROOT = None
+
 
 ## ---COURSE DETAILS---
 
@@ -187,6 +276,28 @@ ASSIGNMENT_TYPE = "java"
 # 
 GRADER_OUTPUT_FILE_EXT = "txt"
 
+# If True, grader output files are gzip-compressed, with a .gz extension 
+# added after GRADER_OUTPUT_FILE_EXT.  Since grader output often includes 
+# the submitted code as well as long test logs, this can save a lot of 
+# space.  Both forms are always read, so this can be changed at any time;
+# run "core_storage.py compress" to convert existing files.  (Default: False)
+#
+COMPRESS_GRADER_OUTPUT = False
+
+# Extension of the review log kept alongside a graded submission once a 
+# human comments on it or changes its grade.  The log records each comment 
+# and grade change, and is merged into the grader output when it is 
+# displayed, so the grader output file itself is never rewritten.
+#
+REVIEW_FILE_EXT = "review"
+
+# Extension of the result sidecar written alongside each grader output.  
+# This records the grade, the results of each grading process, and where
+# each section is in the grader output, all as JSON.  Views use it to find 
+# their way around the grader output without having to parse it.
+#
+RESULT_FILE_EXT = "result"
+
 # The collection of late policies for this course. See Tamarin documentation 
 # (or the LatePolicy class in core_type) for details of policy formats
 # and how they are applied.  
@@ -247,6 +358,14 @@ from core_grade import JavaCompiler, JavaGrader
 # preformatted - (default: True)
 # initialCap - (default: False)
 # processes - (default: [])
+# quickProcesses - (default: None)
+#
+# Giving a type quickProcesses makes it a two-phase type.  When the grading 
+# queue is long (see QUICK_PHASE_QUEUE_LENGTH), every queued submission of 
+# such a type is first run through only its quickProcesses--such as 
+# [CopyGrader(), JavaCompiler(javacPath='javac')]--so students at least learn
+# whether their code compiled.  This provisional (tentative) result is shown
+# until the full list of processes has graded the submission.
 #
 SUBMISSION_TYPES = {
     'jar':  SubmissionType('jar',
@@ -288,6 +407,106 @@ SUBMISSION_TYPES = {
 # 
 LEAVE_PROBLEM_FILES_IN_SUBMITTED = False
 
+# The number of submissions that must be waiting in the grading queue before
+# the gradepipe uses the quick phase of two-phase SubmissionTypes.  With a
+# shorter queue, each submission is simply fully graded in turn.
+# 
+QUICK_PHASE_QUEUE_LENGTH = 10
+
+# How far ahead in the grading queue the gradepipe may look for another
+# submission to the same assignment it just graded.  Grading such
+# submissions back-to-back lets each one reuse the grader files that
+# CopyGrader already staged in the gradezone (as long as the previous
+# submission did not change them) rather than copying them in again.
+# No submission is passed over more than this many times, so none can be
+# starved.  Set to 0 to simply grade submissions in the order they arrived.
+#
+GRADEPIPE_BATCH_WINDOW = 0
+
+# Whether the gradepipe should stage the next submission in the queue while
+# the current one is being graded.  Staging means clearing a gradezone,
+# copying in the submission, and running any leading processes of its 
+# SubmissionType that only move files around (such as Unzip and CopyGrader).
+# The two gradezones (GRADEZONE_ROOT and GRADEZONE_PREFETCH_ROOT) then swap
+# roles, so the compiler and grader never wait on this file copying.  
+# Any custom processes must use args['GradeFile.zone'] rather than 
+# GRADEZONE_ROOT for this to work.  (Default: False)
+#
+GRADEPIPE_PREFETCH = False
+
+# Most submissions arrive just before an assignment's deadline.  Running
+# 'gradepipe.py prewarm' (such as from cron every 10 minutes) starts a
+# gradepipe that gets ready for this surge once a deadline is less than
+# PREWARM_LEAD_MINUTES away: it preflights the assignment's graders and
+# reads in its grader files.  Rather than quitting whenever the queue is
+# empty, that gradepipe then keeps checking for new submissions every
+# PREWARM_POLL_SECONDS until PREWARM_LINGER_MINUTES after the deadline,
+# which spares each submission from waiting for a new gradepipe to start.
+#
+PREWARM_LEAD_MINUTES = 30
+PREWARM_LINGER_MINUTES = 60
+PREWARM_POLL_SECONDS = 5
+
+# The name of an optional subdirectory of an assignment's GRADERS_ROOT folder
+# that holds a reference solution for that assignment.  The reference
+# solution should be a single file named as a student would upload it (such
+# as ReferenceA01.java).  If present, the gradepipe runs the reference 
+# solution through all of the assignment's processes before grading any
+# student submissions for that assignment, and does so again whenever the
+# grader files change.  If the reference solution fails or does not earn the
+# assignment's full score, submissions for that assignment are left in the
+# SUBMITTED queue until the graders are fixed.  The runtime of each of these
+# preflight runs, and the peak memory of the largest grader process (such 
+# as a compiler or JVM) it ran, are reported in masterview. 
+# (CopyGrader never copies this directory into the gradezone.)
+# 
+REFERENCE_SOLUTION_DIR = 'reference'
+
+# How many days the janitor (core_janitor.py) keeps files in each of these
+# directories.  Older files (by modification time) are deleted whenever the
+# janitor runs, which keeps the folders that are scanned on every request 
+# small.  Uploaded files are only kept until the student submits them, so 
+# anything left in UPLOADED_ROOT was never submitted.  Directories not 
+# listed here (or set to None) are never cleaned.  Hidden temporary files 
+# (starting with '.') left in GRADED_ROOT, SUBMITTED_ROOT, PREFLIGHT_ROOT, 
+# and STRIPPED_ROOT by an interrupted write are deleted after 
+# JANITOR_TEMP_DAYS.  
+# Run the janitor from cron as 'core_janitor.py' (or as 
+# 'core_janitor.py dry-run' to only list what would be deleted), and/or 
+# add 'janitor' to GRADEPIPE_MAINTENANCE to have the gradepipe run it 
+# whenever its queue is empty.
+#
+JANITOR_RETENTION_DAYS = {
+    UPLOADED_ROOT: 2,
+    STRIPPED_ROOT: 7,
+    PROVISIONAL_ROOT: 30,
+    GRADEZONE_ROOT: 1,
+    GRADEZONE_PREFETCH_ROOT: 1,
+    LOCK_ROOT: 1,
+}
+JANITOR_TEMP_DAYS = 1
+
+# Housekeeping tasks for the gradepipe to do once its queue is empty, in
+# order of priority, rather than leaving them to be done during a request.
+# Each task is done in small steps.  As soon as a new submission arrives,
+# the gradepipe stops after the current step to grade it, and then picks
+# up where it left off once the queue is empty again.  Each task is done
+# at most once each time the gradepipe runs.  Tasks for features that are 
+# not in use do nothing.  The tasks are:
+#   'index'    - builds the submission index, if USE_SUBMISSION_INDEX and 
+#                it is missing
+#   'users'    - updates USERS_CACHE, if USERS_FILE has changed
+#   'janitor'  - deletes old files, as per JANITOR_RETENTION_DAYS
+#   'journal'  - compacts the EVENT_JOURNAL, if USE_EVENT_JOURNAL
+#   'compress' - converts grader output files to match COMPRESS_GRADER_OUTPUT
+#   'dedupe'   - stores new submitted files in BLOB_ROOT, if set, and then
+#                removes any orphaned blobs
+#   'render'   - caches the HTML of every graded submission in 
+#                FRAGMENT_CACHE_ROOT, if set
+# For example: ('index', 'users', 'janitor', 'journal')  (Default: ())
+#
+GRADEPIPE_MAINTENANCE = ()
+
 
 
 ## ---OUTPUT CONTROLS----
@@ -312,13 +531,23 @@ HUMAN_COMMENT_LABEL = " + comment"
 # 
 MASTER_LINKS_OPEN_NEW_WINDOW = False
 
+# How many users' submissions masterview shows per page in the full view 
+# of an assignment, which includes every submission's code and grader 
+# output.  (The brief view always lists every user, but each submission
+# there can be expanded in place.)  Set to 0 to show all users on one 
+# page.  (Default: 25)
+#
+MASTERVIEW_USERS_PER_PAGE = 25
+
 # TamarinGrader.java marks all of its output lines with a prepend 
 # string ("## " by default).  Set this variable to the same prepend 
 # string if you want to turn on grader output highlighting.  
 # Specifically, if this variable contains anything, all lines starting
 # with the given string (regardless of Process source) will be wrapped by a 
-# <span class="graderOutputLine"> tag when displayed by displaycore.py, 
-# which then allows for CSS formatting.
+# <span class="graderOutputLine"> tag, which then allows for CSS formatting.
+# This markup is written into the grader output as each file is graded,
+# so changing this setting does not affect outputs already graded.  (Only
+# outputs graded by older versions of Tamarin are marked up when displayed.)
 # 
 HIGHLIGHT_PREFIX = '## '
 
@@ -327,10 +556,38 @@ HIGHLIGHT_PREFIX = '## '
 # Wraps each in a span of class="grader+element".  So, for example, if
 # a list element is PASS, any [PASS] found in a grader ouptut line
 # would be replaced with [<span class="graderPASS">PASS</span>].
-# Again, this allows for colorization and other CSS formating.
+# Again, this allows for colorization and other CSS formating.  As above,
+# this is done when each file is graded, so outputs already graded keep
+# the elements that were set at the time.
 # 
 HIGHLIGHT_ELEMENTS = ['PASS', 'FAIL', 'PART', 'EXTRA']
 
+# Whether to gzip each page sent by the CGI scripts (see response) to 
+# browsers that accept it.  Large pages, such as masterview's views of a 
+# whole assignment or the gradesheet, then download far faster.  Pages 
+# smaller than COMPRESS_RESPONSE_MIN_BYTES are not worth compressing, so 
+# they are sent as is.  (Default: True)
+#
+COMPRESS_RESPONSES = True
+COMPRESS_RESPONSE_MIN_BYTES = 1024
+
+# Whether masterview.py sends validators with its pages: an ETag and a 
+# Last-Modified date, computed from just the names, sizes, and 
+# modification times of the files each page is built from (see 
+# getValidators).  When a browser asks for a page again and its cached 
+# copy is still current, it then gets a short 304 Not Modified response
+# rather than the whole page being built again.  (Default: True)
+# (view.py does not, since students log in to it by POST, which browsers
+# never revalidate.)
+#
+# Raw submitted files (see masterview's source option) never change, since
+# their names include when they were submitted.  So browsers are told they
+# may cache them for SOURCE_CACHE_SECONDS without asking again.  (Set this
+# to 0 to not have them cached.)
+#
+USE_CONDITIONAL_GET = True
+SOURCE_CACHE_SECONDS = 365 * 24 * 60 * 60
+
 
 ## --- END OF CONFIGURATION SETTINGS ---
 #
@@ -372,8 +629,12 @@ EXTENSION_RE = r"\.([\w.]+)$"
 UPLOADED_RE =  r"^(\w+)" + ASSIGNMENT_RE + EXTENSION_RE
 
 # A Tamarin timestamp, of the form YYYYMMDD-HHMM.
+# Submissions are stamped to the second instead, as YYYYMMDD-HHMMSS, with
+# a _NN sequence suffix (_02, _03, ...) if that name is already taken.  
+# Either form is matched here (as a single group), so older minute-stamped
+# submissions are still valid.  All forms still sort correctly as strings.
 # 
-TIMESTAMP_RE = r"(\d{8}-\d{4})"
+TIMESTAMP_RE = r"(\d{8}-\d{4}(?:\d\d(?:_\d+)?)?)"
 
 # The regex for a student submission after it has been submitted:
 # basically, as UPLOADED_RE, but a -timestamp inserted before the extension.
@@ -598,6 +859,12 @@ STATUS = {
     'MULTIPLE_GRADER_RESULTS': 
         (542, "Found multiple grader output files (instead of only one) "
          "associated with this graded file."),          
+    'ARCHIVED_SUBMISSION':
+        (543, "This submission has been packed into its assignment's "
+         "archive, so it cannot be changed until the archive is unpacked."),
+    'ASSIGNMENT_NOT_CLOSED':
+        (544, "Only an assignment that no longer accepts submissions and has "
+         "none still waiting to be graded can be archived."),
 }
 
 
@@ -644,7 +911,66 @@ def loadUserFile():
     except IOError:
         raise TamarinError('NO_USERS_FILE')
 
-  
+
+# the cached UserDirectory and the USERS_FILE signature it was loaded from
+_userDirectory = {'signature': None, 'directory': None}
+
+def getUserDirectory():
+    """
+    Returns a UserDirectory of all the users in USERS_FILE.
+    
+    The directory is cached, so USERS_FILE is only loaded again when its 
+    size or mtime changes.  If USERS_CACHE is set, it is loaded from that 
+    precompiled copy instead, if the copy is still up to date.
+    
+    Raises the same TamarinErrors as loadUserFile.  In particular, raises
+    'NO_USERS_FILE' if USERS_FILE no longer exists, even if it was cached.
+    """
+    from core_type import UserDirectory
+    try:
+        stat = os.stat(USERS_FILE)
+    except OSError:
+        raise TamarinError('NO_USERS_FILE')
+    signature = [USERS_FILE, USERS_FILE_DELIM, stat.st_size, stat.st_mtime_ns]
+    if _userDirectory['signature'] != signature:
+        users = loadUserCache(signature) if USERS_CACHE else None
+        if users is None:
+            users = loadUserFile()
+            if USERS_CACHE:
+                saveUserCache(signature, users)
+        _userDirectory['directory'] = UserDirectory(users)
+        _userDirectory['signature'] = signature
+    return _userDirectory['directory']
+
+def loadUserCache(signature):
+    """
+    Returns the users saved in USERS_CACHE (in the same form as returned 
+    by loadUserFile) if they were saved from a USERS_FILE with the given
+    signature.  Otherwise, returns None.
+    """
+    try:
+        with open(USERS_CACHE, 'r') as filein:
+            cache = json.load(filein)
+        if cache['signature'] == signature:
+            return cache['users']
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+def saveUserCache(signature, users):
+    """ 
+    Saves the given users, loaded from a USERS_FILE with the given 
+    signature, to USERS_CACHE.  Fails silently, since the cache is optional.
+    """
+    temp = USERS_CACHE + '.' + str(os.getpid())
+    try:
+        with open(temp, 'w') as fileout:
+            json.dump({'signature': signature, 'users': users}, fileout)
+        os.replace(temp, USERS_CACHE)
+    except OSError:
+        if os.path.exists(temp):
+            os.remove(temp)
+
 def authenticate(username, password):
     """
     Returns True if the given username and password are valid,
@@ -654,21 +980,23 @@ def authenticate(username, password):
     'NO_USERS_FILE', 'MALFORMED_USERS_FILE', 'INVALID_USERNAME', 
     or 'INVALID_PASSWORD'
     """
-    users = loadUserFile()  #may raise TamarinError
-    username = username.lower()
-    if username not in users:
-        raise TamarinError('INVALID_USERNAME')
-    elif users[username][0] != password:
+    details = getUserDirectory().getDetails(username)  #may raise TamarinError
+    if details[0] != password:
         raise TamarinError('INVALID_PASSWORD')
     else:
         return True
 
-def getUsers():
+def getUsers(section=None):
     """
     Returns a sorted list of all usernames from USERS_FILE or throws a 
-    TamarinError.  
+    TamarinError.  If a section is given, returns only the users in that
+    section.
     """
-    return sorted(loadUserFile().keys())
+    directory = getUserDirectory()
+    if section is None:
+        return list(directory.usernames)
+    else:
+        return list(directory.sections.get(section, []))
 
 def getUserDetails(username):
     """
@@ -678,20 +1006,165 @@ def getUserDetails(username):
     
     May throw 'NO_USERS_FILE' or 'INVALID_USERNAME' TamarinErrors.
     """
-    users = loadUserFile()
-    username = username.lower()
-    return users[username.lower()][1:]
+    return getUserDirectory().getDetails(username)[1:]
 
 
 ## --Printing---
 
-def printHeader(title='Tamarin Results'):
+@contextlib.contextmanager
+def response():
+    """
+    Collects everything printed to stdout within this context as the 
+    response of a CGI script--its headers, a blank line, and its body--and 
+    then sends it all at once, with a Content-Length header.  The body is
+    gzipped if COMPRESS_RESPONSES and the browser accepts it (see 
+    acceptsGzip).
+    
+    If an exception escapes the context, an UNHANDLED_ERROR is printed 
+    (after a page header, if nothing was printed yet) and the page so far
+    is still sent.
+    
+    A response with a 'Status: 304' header (see isNotModified) is sent
+    without any body.
     """
-    Prints the necessary content type header and then the HTML page 
-    header with the given title.
+    out = sys.stdout
+    sys.stdout = io.StringIO()
+    try:
+        yield
+    except Exception:
+        if not sys.stdout.getvalue():
+            printHeader('Tamarin Error')
+        printError('UNHANDLED_ERROR')
+    finally:
+        page = sys.stdout.getvalue()
+        sys.stdout = out
+        sendResponse(page)
+
+def sendResponse(page):
+    """
+    Sends the given complete CGI response (headers, blank line, and body) 
+    to stdout, as described in response.  If there are no headers, the 
+    page is sent as text/html.  If stdout is not a binary stream underneath,
+    as when testing, the page is printed unchanged instead.
+    """
+    if not hasattr(sys.stdout, 'buffer'):
+        sys.stdout.write(page)
+        return
+    head, blank, body = page.partition('\n\n')
+    headers = head.split('\n')
+    if not blank or not all(re.match(r'[\w-]+:', h) for h in headers):
+        headers, body = ['Content-Type: text/html'], page
+    body = body.encode(sys.stdout.encoding or 'utf-8', 'xmlcharrefreplace')
+    if 'Status: 304 Not Modified' in headers:
+        body = b''
+    elif COMPRESS_RESPONSES:
+        headers.append('Vary: Accept-Encoding')
+        if len(body) >= COMPRESS_RESPONSE_MIN_BYTES and acceptsGzip():
+            body = gzip.compress(body, compresslevel=6)
+            headers.append('Content-Encoding: gzip')
+    if body:
+        headers.append('Content-Length: ' + str(len(body)))
+    sys.stdout.flush()
+    sys.stdout.buffer.write(('\n'.join(headers) + '\n\n').encode('latin-1'))
+    sys.stdout.buffer.write(body)
+    sys.stdout.buffer.flush()
+
+def acceptsGzip():
+    """
+    Returns whether the browser's HTTP_ACCEPT_ENCODING header (from the CGI
+    environment) accepts gzip-encoded responses.
+    """
+    for coding in os.environ.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        name, *params = [part.strip().lower() for part in coding.split(';')]
+        if name in ('gzip', 'x-gzip', '*'):
+            quality = [p[2:] for p in params if p.startswith('q=')]
+            try:
+                return not quality or float(quality[0]) > 0
+            except ValueError:
+                return False
+    return False
+
+def getValidators(paths, extra=None, modified=()):
+    """
+    Returns a list of the ETag, Last-Modified, and Cache-Control header
+    lines for a page built from the files (or directories) at the given 
+    paths, as well as from this file (for the current settings) and the
+    USERS_FILE.  Paths that do not exist are skipped.  
+    
+    The ETag is a hash of the number of files and the name, size, and 
+    modification time of each, as well as of extra (which must be 
+    JSON-serializable), so it changes whenever the page would.  The 
+    Last-Modified date is the latest modification time of any of the 
+    files, or any later time (in seconds since the epoch) in modified.
+    So it only takes a stat of each file to know whether a page is current.
+    
+    The Cache-Control header has browsers check that a cached copy is still 
+    current (see isNotModified) before using it.
+    """
+    stamps = []
+    latest = max(modified, default=0)
+    for path in [__file__, USERS_FILE] + list(paths):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        stamps.append([os.path.basename(path), stat.st_size, 
+                       stat.st_mtime_ns])
+        latest = max(latest, stat.st_mtime)
+    key = json.dumps([len(stamps), stamps, extra])
+    etag = hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]
+    return ['ETag: "' + etag + '"',
+            'Last-Modified: ' + email.utils.formatdate(latest, usegmt=True),
+            'Cache-Control: private, no-cache']
+
+def isNotModified(validators):
+    """
+    Returns whether the browser already has a current copy of the page 
+    with the given validators (from getValidators), as shown by its 
+    HTTP_IF_NONE_MATCH header or, failing that, its HTTP_IF_MODIFIED_SINCE 
+    header.  If so, also prints a 304 Not Modified response (just the 
+    headers), and the page itself should not be printed.
+    
+    Always returns False if there are no validators, if not 
+    USE_CONDITIONAL_GET, or if the request was not a GET (or HEAD).
+    """
+    if not validators or not USE_CONDITIONAL_GET or \
+            os.environ.get('REQUEST_METHOD', 'GET') not in ('GET', 'HEAD'):
+        return False
+    headers = dict(h.split(': ', 1) for h in validators)
+    matches = os.environ.get('HTTP_IF_NONE_MATCH')
+    since = os.environ.get('HTTP_IF_MODIFIED_SINCE')
+    if matches is not None:
+        tags = [t.strip() for t in matches.split(',')]
+        tags = [t[2:] if t.startswith('W/') else t for t in tags]
+        current = '*' in tags or headers['ETag'] in tags
+    elif since is not None:
+        try:
+            since = email.utils.parsedate_to_datetime(since)
+            modified = email.utils.parsedate_to_datetime(
+                                                    headers['Last-Modified'])
+            current = modified <= since
+        except (TypeError, ValueError):
+            current = False
+    else:
+        current = False
+    if current:
+        print('Status: 304 Not Modified')
+        for header in validators:
+            print(header)
+        print()
+    return current
+
+def printHeader(title='Tamarin Results', headers=()):
+    """
+    Prints the necessary content type header (and any other given header 
+    lines, such as from getValidators) and then the HTML page header with 
+    the given title.
     """
     #print header
     print("Content-Type: text/html")
+    for header in headers:
+        print(header)
     print()
     #print HTML
     print("""\
@@ -788,33 +1261,47 @@ def printError(error):
 
 ## ---Utility---
 
-def convertTimeToTimestamp(time=None):
+def convertTimeToTimestamp(time=None, seconds=False):
     """
     Converts the given datetime object to a string in the Tamarin timestamp
-    format of YYYYMMDD-HHMM.  If not given, uses current time.
+    format of YYYYMMDD-HHMM.  If not given, uses current time.  
+    If seconds is True, appends the seconds too: YYYYMMDD-HHMMSS.
     """
     if not time:
         time = datetime.datetime.now()
     stamp = str(time.year) 
     stamp += str(time.month).zfill(2) + str(time.day).zfill(2)
     stamp += '-' + str(time.hour).zfill(2) + str(time.minute).zfill(2)
+    if seconds:
+        stamp += str(time.second).zfill(2)
     return stamp  
 
 def convertTimestampToTime(timestamp=None):
     """
     Returns the given Tamarin timestamps converted to a datetime object.
+    Any seconds are included; any sequence suffix is ignored.
     """
     if not timestamp:
         timestamp = convertTimeToTimestamp()
-    match = re.match(r"(\d{4})(\d\d)(\d\d)-(\d\d)(\d\d)$", timestamp)
+    match = re.match(r"(\d{4})(\d\d)(\d\d)-(\d\d)(\d\d)(\d\d)?(_\d+)?$", 
+                     timestamp)
     assert match, 'Bad deadline timestamp format: ' + str(timestamp)
 
     #convert matches to ints and label
-    elements = [int(g) for g in match.groups()]
+    elements = [int(g) for g in match.groups()[:5]]
     year, month, day, hour, minute = elements     
+    second = int(match.group(6)) if match.group(6) else 0
 
     #return new datetime object
-    return datetime.datetime(year, month, day, hour, minute)
+    return datetime.datetime(year, month, day, hour, minute, second)
+
+def getMinuteTimestamp(timestamp):
+    """
+    Returns the given timestamp (which may be a second-resolution submission
+    timestamp) as a plain YYYYMMDD-HHMM timestamp.  Deadlines and late 
+    policies are only to the minute, so this is what they compare against.
+    """
+    return timestamp[:13]
 
 
 def getAssignments():
@@ -850,7 +1337,16 @@ def getSubmissions(user=None, assignment=None,
     # asObjects=False, which would encapsulate as SubmittedFile and GradedFile?
     # if no user or assignment, sort into assignment-user-timestamp order?
     #
-    from core_type import Assignment
+    from core_type import getAssignment
+    if USE_SUBMISSION_INDEX:
+        import core_index
+        if assignment:
+            getAssignment(assignment)  # still complain if no such assignment
+        files = core_index.getSubmissions(user, assignment, graded, submitted)
+        if files is not None:
+            return files
+        # otherwise, index is unusable so fall back on the filesystem
+
     if not assignment:
         assignments = getAssignments()
     else:
@@ -858,7 +1354,7 @@ def getSubmissions(user=None, assignment=None,
 
     files = []
     for a in assignments:
-        assignment = Assignment(a)
+        assignment = getAssignment(a)
         if user:
             # support username having either upper or lowercase first letter
             user = user.lower()
@@ -870,7 +1366,7 @@ def getSubmissions(user=None, assignment=None,
         
         # get graded files 
         if graded:
-            afiles = glob.glob(os.path.join(assignment.path, globFilename))
+            afiles = assignment.glob(globFilename, user)
             if assignment.type.fileExt == GRADER_OUTPUT_FILE_EXT:
                 # need to drop grader output files from files list
                 afiles = [f for f in afiles 
@@ -898,5 +1394,6 @@ def getSubmittedFilenames(only=None):
     else:
         submitted = glob.glob(os.path.join(SUBMITTED_ROOT, '*'))
     #sort using timestamp as the key
-    submitted.sort(key=lambda x: re.search(r"\d{8}-\d{4}", x).group())
+    submitted.sort(key=lambda x: re.search(TIMESTAMP_RE + EXTENSION_RE, 
+                                           os.path.basename(x)).group(1))
     return submitted
@@ -0,0 +1,32 @@
+/*
+ * masterview.js
+ *
+ * Lets the brief lists of submissions in masterview expand a submission
+ * in place.  Each expand link points to masterview.py?fragment=..., which
+ * returns just that submission's displaySubmission HTML, and is followed
+ * by an empty div.fragment to hold it.  Without JavaScript, the link
+ * simply opens the fragment by itself.
+ *
+ * Part of Tamarin.
+ */
+
+function expandSubmission(link) {
+  var box = link.nextSibling;
+  while (box && box.nodeType != 1) {
+    box = box.nextSibling;  // skip any whitespace
+  }
+  if (box.innerHTML) {
+    // already expanded, so collapse again
+    box.innerHTML = '';
+    link.innerHTML = '[+]';
+    return false;
+  }
+  var request = new XMLHttpRequest();
+  request.open('GET', link.href);
+  request.onload = function () {
+    box.innerHTML = request.responseText;
+    link.innerHTML = '[-]';
+  };
+  request.send();
+  return false;
+}
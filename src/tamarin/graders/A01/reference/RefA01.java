@@ -0,0 +1 @@
+class RefA01{}
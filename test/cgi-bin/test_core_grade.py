@@ -0,0 +1,561 @@
+"""
+Tests the gradepipe processes in core_grade.py.
+"""
+
+import unittest
+import datetime
+import glob
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+
+import test
+sys.path.append(test.SRC_CGI)
+import tamarin
+import core_storage
+import core_view
+import masterview
+from core_grade import Process, GradePipe, GradeFile, Preflight, CopyGrader
+from core_grade import Prewarm, Maintenance
+from core_type import getAssignment, GradedFile
+
+
+class Stub(Process):
+    """
+    Earns the given grade and output, unless Stub.fail is set (which,
+    being a class variable, does not change any preflight fingerprint).
+    Records the text of each run in Stub.ran.
+    """
+    fail = False
+    ran = []
+
+    def __init__(self, points=None, text=None, required=True):
+        super().__init__(required)
+        self.points = points
+        self.text = text
+
+    def run(self, args):
+        Stub.ran.append(self.text)
+        self.grade = 'X' if Stub.fail else self.points
+        self.output = self.text
+        return not Stub.fail
+
+
+class StagingStub(Stub):
+    """ A Stub that only prepares files, so it may be run by stage. """
+    staging = True
+
+
+class Spawn(Stub):
+    """ Also runs a subprocess that briefly needs about 64 MB of memory. """
+
+    def run(self, args):
+        subprocess.run([sys.executable, '-c', 'bytearray(64 * 2**20)'],
+                       check=True)
+        return super().run(args)
+
+
+class Crash(StagingStub):
+    """ A staging process that crashes (and so records no text). """
+
+    def run(self, args):
+        Stub.ran.append('Crash.')
+        raise ValueError('Crashed while staging')
+
+
+class Chores(Maintenance):
+    """ Maintenance with stand-in tasks that record each of their steps. """
+    TASKS = {'count': 'count', 'fail': 'fail'}
+
+    def __init__(self):
+        super().__init__()
+        self.done = []
+
+    def count(self):
+        for i in range(3):
+            self.done.append(i)
+            yield
+
+    def fail(self):
+        self.done.append('fail')
+        yield
+        raise ValueError('Failed.')
+
+
+class GradeTestCase(test.TamarinTestCase):
+    """
+    Grades A01 with Stub processes, in temporary graders, gradezones,
+    and preflight and provisional directories.
+    """
+    CONFIG = ('GRADERS_ROOT', 'PREFLIGHT_ROOT', 'PROVISIONAL_ROOT',
+              'GRADEZONE_ROOT', 'GRADEZONE_PREFETCH_ROOT')
+
+    def setUp(self):
+        logging.getLogger('Process').setLevel('CRITICAL')
+        self.saved = {name: getattr(tamarin, name) for name in self.CONFIG}
+        self.temp = tempfile.mkdtemp()
+        for name in self.CONFIG:
+            setattr(tamarin, name, os.path.join(self.temp, name.lower()))
+            os.makedirs(getattr(tamarin, name))
+        self.assignment = getAssignment('A01')
+        self.type = self.assignment.type
+        self.processes = self.type.processes
+        self.quickProcesses = self.type.quickProcesses
+        self.type.processes = [Stub(self.assignment.maxScore, 'All good.')]
+        Stub.fail = False
+        Stub.ran = []
+
+    def tearDown(self):
+        for name, value in self.saved.items():
+            setattr(tamarin, name, value)
+        self.type.processes = self.processes
+        self.type.quickProcesses = self.quickProcesses
+        shutil.rmtree(self.temp)
+        for path in glob.glob(os.path.join(tamarin.SUBMITTED_ROOT, '*')) + \
+                    glob.glob(os.path.join(self.assignment.path, '*')):
+            os.remove(path)
+
+    def submit(self, filename, content='class Test {}\n'):
+        """ Puts a file with the given name into SUBMITTED_ROOT. """
+        path = os.path.join(tamarin.SUBMITTED_ROOT, filename)
+        with open(path, 'w') as outfile:
+            outfile.write(content)
+        return path
+
+    def addReference(self, assignmentName='A01'):
+        """ Gives the given assignment a reference solution. """
+        refDir = os.path.join(tamarin.GRADERS_ROOT, assignmentName,
+                              tamarin.REFERENCE_SOLUTION_DIR)
+        os.makedirs(refDir)
+        path = os.path.join(refDir, 'Ref' + assignmentName + '.java')
+        with open(path, 'w') as outfile:
+            outfile.write('class Ref {}\n')
+        return path
+
+    def runGradePipe(self):
+        """ Runs a GradePipe until the queue is empty. """
+        return GradePipe(fileControlled=False, logLevel='CRITICAL').run()
+
+
+class PreflightTest(GradeTestCase):
+    """ Tests grading reference solutions before any submissions. """
+
+    def testNoReference(self):
+        """ No reference solution -> passes without grading anything. """
+        self.assertTrue(Preflight().run({}, 'A01'))
+        self.assertIsNone(Preflight.load('A01'))
+
+    def testFailingReference(self):
+        """ Reference fails -> assignment blocked; its files left queued. """
+        self.addReference()
+        Stub.fail = True
+        path = self.submit('JohndoeA01-20200101-1200.java')
+        self.assertTrue(self.runGradePipe())
+        self.assertTrue(os.path.exists(path))
+        self.assertFalse(Preflight.load('A01')['passed'])
+
+    def testInvalidAssignment(self):
+        """ Preflight error -> only that assignment is blocked. """
+        self.addReference('A99')
+        blocked = self.submit('JohndoeA99-20200101-1200.java')
+        graded = self.submit('JohndoeA01-20200101-1300.java')
+        self.assertTrue(self.runGradePipe())
+        self.assertTrue(os.path.exists(blocked))
+        self.assertFalse(os.path.exists(graded))
+        self.assertTrue(os.path.exists(os.path.join(self.assignment.path,
+                                    'JohndoeA01-20200101-1300.java')))
+
+    def testCache(self):
+        """ Cached result reused until the grader files or processes change.
+        """
+        reference = self.addReference()
+        self.assertTrue(Preflight().run({}, 'A01'))
+        self.assertEqual(Preflight.load('A01')['grade'],
+                         self.assignment.maxScore)
+
+        Stub.fail = True
+        self.assertTrue(Preflight().run({}, 'A01'))
+
+        stat = os.stat(reference)
+        os.utime(reference, (stat.st_atime, stat.st_mtime + 10))
+        self.assertFalse(Preflight().run({}, 'A01'))
+
+        Stub.fail = False
+        self.assertFalse(Preflight().run({}, 'A01'))
+        self.type.processes[0].required = False
+        self.assertTrue(Preflight().run({}, 'A01'))
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'measured only when forking')
+    def testMemory(self):
+        """ Peak memory -> that of the grader subprocesses only. """
+        self.addReference()
+        self.assertTrue(Preflight().run({}, 'A01'))
+        self.assertIsNone(Preflight.load('A01')['memory'])
+
+        self.type.processes = [Spawn(self.assignment.maxScore, 'Spawned.')]
+        self.assertTrue(Preflight().run({}, 'A01'))
+        memory = Preflight.load('A01')['memory']
+        self.assertGreaterEqual(memory, 64 * 1024)
+
+
+class QuickPhaseTest(GradeTestCase):
+    """ Tests provisional grading of two-phase types under load. """
+
+    def setUp(self):
+        super().setUp()
+        self.queueLength = tamarin.QUICK_PHASE_QUEUE_LENGTH
+        self.type.quickProcesses = [Stub(text='Quick.')]
+        self.type.processes = [Stub(self.assignment.maxScore, 'Full.')]
+
+    def tearDown(self):
+        tamarin.QUICK_PHASE_QUEUE_LENGTH = self.queueLength
+        super().tearDown()
+
+    def testPending(self):
+        """ Files without a provisional output -> pending, in order. """
+        submitted = [os.path.join(tamarin.SUBMITTED_ROOT, fn) for fn in
+                     ('JohndoeA01-20200101-1200.java',
+                      'JanedoeA01-20200101-1201.java',
+                      'JohndoeA01-20200101-1202.java')]
+        with open(os.path.join(tamarin.PROVISIONAL_ROOT,
+                               'JanedoeA01-20200101-1201-OK.txt'), 'w'):
+            pass
+        gradePipe = GradePipe()
+        self.assertEqual(gradePipe.getQuickPhasePending(submitted),
+                         [submitted[0], submitted[2]])
+        self.type.quickProcesses = None
+        self.assertEqual(gradePipe.getQuickPhasePending(submitted), [])
+
+    def testQueueLength(self):
+        """ Long enough queue -> quick phase for all before full grading.
+        """
+        tamarin.QUICK_PHASE_QUEUE_LENGTH = 2
+        self.submit('JohndoeA01-20200101-1200.java')
+        self.submit('JanedoeA01-20200101-1201.java')
+        self.assertTrue(self.runGradePipe())
+        self.assertEqual(Stub.ran, ['Quick.', 'Quick.', 'Full.', 'Full.'])
+
+        Stub.ran = []
+        tamarin.QUICK_PHASE_QUEUE_LENGTH = 3
+        self.submit('JohndoeA01-20200101-1300.java')
+        self.submit('JanedoeA01-20200101-1301.java')
+        self.assertTrue(self.runGradePipe())
+        self.assertEqual(Stub.ran, ['Full.', 'Full.'])
+
+    def testProvisional(self):
+        """ Provisional output kept until the file is fully graded. """
+        filename = 'JohndoeA01-20200101-1200.java'
+        path = self.submit(filename)
+        self.assertTrue(GradeFile(provisional=True).run({}, filename))
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(sorted(os.listdir(tamarin.PROVISIONAL_ROOT)),
+                         ['JohndoeA01-20200101-1200-OK.txt',
+                          'JohndoeA01-20200101-1200.result'])
+
+        self.assertTrue(GradeFile().run({}, filename))
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(os.listdir(tamarin.PROVISIONAL_ROOT), [])
+        self.assertTrue(os.path.exists(os.path.join(self.assignment.path,
+                                    'JohndoeA01-20200101-1200-' +
+                                    str(float(self.assignment.maxScore)) +
+                                    '.txt')))
+
+
+class ResultTest(GradeTestCase):
+    """ Tests the result sidecar details recorded while grading. """
+
+    def setUp(self):
+        super().setUp()
+        self.compress = tamarin.COMPRESS_GRADER_OUTPUT
+
+    def tearDown(self):
+        tamarin.COMPRESS_GRADER_OUTPUT = self.compress
+        super().tearDown()
+
+    def testRunProcesses(self):
+        """ Processes run -> details and grade line offsets recorded. """
+        for compress in (False, True):
+            tamarin.COMPRESS_GRADER_OUTPUT = compress
+            path = os.path.join(self.temp, 'output' + str(compress) + '.' +
+                                core_storage.getGraderOutputExt())
+            processes = [Stub(3, 'Compiled.'), Stub(2, '## [PASS] Ran.')]
+            results = {}
+            with core_storage.openFile(path, 'w') as graderOut:
+                grade, passed = GradeFile().runProcesses(processes, {}, 
+                                                graderOut, results=results)
+            self.assertEqual((grade, passed), (5.0, True))
+            results['grade'] = grade  # as added by GradeFile.run
+            self.assertEqual(path.endswith(core_storage.COMPRESSED_EXT), 
+                             compress)
+
+            details = results['processes']
+            self.assertEqual([(d['grade'], d['passed']) for d in details],
+                             [(3.0, True), (2.0, True)])
+            for d in details:
+                self.assertGreaterEqual(d['duration'], 0)
+            self.assertEqual(details[0]['start'], 0)
+            self.assertEqual(details[0]['end'], details[1]['start'])
+            self.assertLessEqual(details[1]['end'], results['gradeStart'])
+            with core_storage.openFile(path, 'rb') as filein:
+                raw = filein.read()
+            self.assertEqual(raw[results['gradeStart']:results['gradeEnd']],
+                             (tamarin.GRADE_START_TAG + '5.0' + 
+                              tamarin.GRADE_END_TAG + '\n').encode())
+
+            parts = list(core_view.readGraderOutput(path, (), results))
+            self.assertEqual([kind for kind, value in parts], 
+                             ['html', 'grade', 'html'])
+            self.assertEqual(parts[1], ('grade', '5.0'))
+            self.assertIn('Compiled.', parts[0][1])
+            self.assertEqual(parts[2][1], '</div>\n')
+
+
+class RegradeTest(GradeTestCase):
+    """ Tests grading a file again after it has been reviewed. """
+
+    def testReview(self):
+        """ Regraded -> earlier grade and comments from review not shown. """
+        filename = 'JohndoeA01-20200101-1200.java'
+        self.submit(filename)
+        self.assertTrue(GradeFile().run({}, filename))
+        masterview.modifySubmission(filename, '1', False, 'Looks off.')
+        graded = GradedFile(filename)
+        parts = list(core_view.readGraderOutput(graded.graderOutputPath,
+                                                graded.loadReview(),
+                                                graded.loadResult()))
+        self.assertIn(('grade', '1.0'), parts)
+        self.assertEqual(masterview.getNextCommentID(graded), 2)
+
+        shutil.move(graded.path, tamarin.SUBMITTED_ROOT)
+        self.assertTrue(GradeFile().run({}, filename))
+        graded = GradedFile(filename)
+        self.assertFalse(graded.humanComment)
+        self.assertEqual([fn for fn in os.listdir(self.assignment.path)
+                          if core_storage.matchGraderOutput(fn)],
+                         [graded.graderOutputFilename])
+        parts = list(core_view.readGraderOutput(graded.graderOutputPath,
+                                                graded.loadReview(),
+                                                graded.loadResult()))
+        self.assertIn(('grade', str(graded.grade)), parts)
+        self.assertNotIn('comment', [kind for kind, value in parts])
+        self.assertEqual(masterview.getNextCommentID(graded), 2)
+
+
+class BatchTest(GradeTestCase):
+    """ Tests batching by assignment and reusing staged grader files. """
+
+    def setUp(self):
+        super().setUp()
+        self.window = tamarin.GRADEPIPE_BATCH_WINDOW
+        tamarin.GRADEPIPE_BATCH_WINDOW = 2
+        CopyGrader.staged.clear()
+
+    def tearDown(self):
+        tamarin.GRADEPIPE_BATCH_WINDOW = self.window
+        CopyGrader.staged.clear()
+        super().tearDown()
+
+    def testNextInBatch(self):
+        """ Same assignment within window -> next, up to window skips. """
+        gradePipe = GradePipe()
+        submitted = ['JohndoeA02-20200101-1200.java',
+                     'JohndoeA01-20200101-1201.java',
+                     'JohndoeA01-20200101-1202.java']
+        head = submitted[0]
+        skipped = {}
+        self.assertEqual(gradePipe.getNextInBatch(submitted, None, skipped),
+                         head)
+        self.assertEqual(skipped, {})
+        self.assertEqual(gradePipe.getNextInBatch(submitted, 'A03', skipped),
+                         head)
+
+        self.assertEqual(gradePipe.getNextInBatch(submitted, 'A01', skipped),
+                         submitted[1])
+        self.assertEqual(skipped, {head: 1})
+        # A01 file now outside the window
+        later = [head, 'JanedoeA02-20200101-1201.java', submitted[2]]
+        self.assertEqual(gradePipe.getNextInBatch(later, 'A01', skipped),
+                         head)
+        self.assertEqual(skipped, {})
+
+        # head passed over only window times
+        self.assertEqual(gradePipe.getNextInBatch(submitted, 'A01', skipped),
+                         submitted[1])
+        self.assertEqual(gradePipe.getNextInBatch(submitted, 'A01', skipped),
+                         submitted[1])
+        self.assertEqual(skipped, {head: 2})
+        self.assertEqual(gradePipe.getNextInBatch(submitted, 'A01', skipped),
+                         head)
+        self.assertEqual(skipped, {})
+
+    def testCopyGraderFile(self):
+        """ Unchanged grader and zone copy -> reused; otherwise copied. """
+        grader = os.path.join(tamarin.GRADERS_ROOT, 'Grader.class')
+        with open(grader, 'w') as outfile:
+            outfile.write('version 1')
+        args = {'GradeFile.zone': tamarin.GRADEZONE_ROOT,
+                'GradeFile.assignment': 'A01'}
+        copyGrader = CopyGrader()
+        reused = CopyGrader.reusedCount
+        self.assertEqual(copyGrader.copyGraderFile(grader, args), 1)
+        self.assertEqual(copyGrader.copyGraderFile(grader, args), 0)
+        self.assertEqual(CopyGrader.reusedCount, reused + 1)
+
+        with open(grader, 'w') as outfile:
+            outfile.write('version 2!')
+        self.assertEqual(copyGrader.copyGraderFile(grader, args), 1)
+        copy = os.path.join(tamarin.GRADEZONE_ROOT, 'Grader.class')
+        with open(copy) as infile:
+            self.assertEqual(infile.read(), 'version 2!')
+
+        with open(copy, 'a') as outfile:
+            outfile.write(' changed by a submission')
+        self.assertEqual(copyGrader.copyGraderFile(grader, args), 1)
+        with open(copy) as infile:
+            self.assertEqual(infile.read(), 'version 2!')
+
+        args['GradeFile.assignment'] = 'A02'
+        self.assertEqual(copyGrader.copyGraderFile(grader, args), 1)
+
+    def testThreads(self):
+        """ Zones staged by two threads at once -> every file recorded. """
+        graders = []
+        for i in range(50):
+            graders.append(os.path.join(tamarin.GRADERS_ROOT, 
+                                        'Grader' + str(i) + '.class'))
+            with open(graders[-1], 'w') as outfile:
+                outfile.write('version ' + str(i))
+        reused = CopyGrader.reusedCount
+        errors = []
+        def stage(zone):
+            args = {'GradeFile.zone': os.path.join(self.temp, zone),
+                    'GradeFile.assignment': 'A01'}
+            os.makedirs(args['GradeFile.zone'])
+            try:
+                for i in range(2):
+                    for grader in graders:
+                        CopyGrader().copyGraderFile(grader, args)
+            except Exception as err:
+                errors.append(err)
+        threads = [threading.Thread(target=stage, args=(zone,)) 
+                   for zone in ('zone1', 'zone2')]
+        for thread in threads:
+            thread.start()
+        while any(thread.is_alive() for thread in threads):
+            CopyGrader.getStaged('A01')
+        self.assertEqual(errors, [])
+        self.assertEqual(len(CopyGrader.getStaged('A01')), 100)
+        self.assertEqual(CopyGrader.reusedCount, reused + 100)
+
+
+class StageTest(GradeTestCase):
+    """ Tests staging the next file in the prefetch gradezone. """
+
+    def testReplay(self):
+        """ Staged processes -> recorded as they were, not run again. """
+        self.type.processes = [StagingStub(None, 'Staged.'),
+                               Stub(self.assignment.maxScore, 'Graded.')]
+        filename = 'JohndoeA01-20200101-1200.java'
+        self.submit(filename)
+        zone = tamarin.GRADEZONE_PREFETCH_ROOT
+        staged = GradeFile().stage({}, filename, zone)
+        self.assertEqual(Stub.ran, ['Staged.'])
+        self.assertEqual(staged['args']['GradeFile.zone'], zone)
+        self.assertTrue(os.path.exists(os.path.join(zone, 'JohndoeA01.java')))
+
+        self.assertTrue(GradeFile().run({}, filename, staged))
+        self.assertEqual(Stub.ran, ['Staged.', 'Graded.'])
+        output = glob.glob(os.path.join(self.assignment.path,
+                                        'JohndoeA01-20200101-1200-*.txt'))
+        with open(output[0]) as infile:
+            output = infile.read()
+        self.assertIn('Staged.', output)
+        self.assertIn('Graded.', output)
+
+    def testStagedError(self):
+        """ Process crashed while staging -> error raised when graded. """
+        self.type.processes = [Crash(), Stub(self.assignment.maxScore,
+                                             'Graded.')]
+        filename = 'JohndoeA01-20200101-1200.java'
+        self.submit(filename)
+        staged = GradeFile().stage({}, filename,
+                                   tamarin.GRADEZONE_PREFETCH_ROOT)
+        self.assertEqual(len(staged['done']), 1)
+        self.assertIsInstance(staged['done'][0][2], ValueError)
+
+        self.assertFalse(GradeFile().run({}, filename, staged))
+        self.assertEqual(Stub.ran, ['Crash.'])
+        output = os.path.join(self.assignment.path,
+                              'JohndoeA01-20200101-1200-ERR.txt')
+        with open(output) as infile:
+            self.assertIn('GRADING_CRASH', infile.read())
+
+
+class PrewarmTest(test.TamarinTestCase):
+    """ Tests finding the assignments whose deadlines are near. """
+
+    def setUp(self):
+        self.minutes = (tamarin.PREWARM_LEAD_MINUTES,
+                        tamarin.PREWARM_LINGER_MINUTES)
+        tamarin.PREWARM_LEAD_MINUTES = 30
+        tamarin.PREWARM_LINGER_MINUTES = 60
+
+    def tearDown(self):
+        tamarin.PREWARM_LEAD_MINUTES, tamarin.PREWARM_LINGER_MINUTES = \
+            self.minutes
+
+    def testSurging(self):
+        """ Surging from lead minutes before to linger minutes after. """
+        due = tamarin.convertTimestampToTime(getAssignment('A01').due)
+        prewarm = Prewarm()
+        for minutes, surging in ((-31, False), (-30, True), (0, True),
+                                 (60, True), (61, False)):
+            now = due + datetime.timedelta(minutes=minutes)
+            self.assertEqual('A01' in prewarm.getSurging(now), surging,
+                             str(minutes) + ' minutes from the deadline')
+        self.assertEqual(prewarm.getSurging(due - datetime.timedelta(days=1)),
+                         [])
+
+
+class MaintenanceTest(test.TamarinTestCase):
+    """ Tests doing maintenance tasks a step at a time. """
+
+    def setUp(self):
+        self.tasks = tamarin.GRADEPIPE_MAINTENANCE
+
+    def tearDown(self):
+        tamarin.GRADEPIPE_MAINTENANCE = self.tasks
+
+    def testPause(self):
+        """ Queue no longer empty -> stops; resumes at the same step. """
+        tamarin.GRADEPIPE_MAINTENANCE = ['count']
+        chores = Chores()
+        calls = []
+        def getQueue():
+            calls.append(None)
+            return ['JohndoeA01-20200101-1200.java'] if len(calls) == 2 else []
+        self.assertFalse(chores.run(getQueue=getQueue))
+        self.assertEqual(chores.done, [0, 1])
+        self.assertTrue(chores.run(getQueue=getQueue))
+        self.assertEqual(chores.done, [0, 1, 2])
+        self.assertTrue(chores.run(getQueue=getQueue))
+        self.assertEqual(chores.done, [0, 1, 2])
+
+    def testSkipped(self):
+        """ Unknown or failing task -> logged and skipped. """
+        tamarin.GRADEPIPE_MAINTENANCE = ['nothing', 'fail', 'count']
+        chores = Chores()
+        with self.assertLogs(chores.logger, 'ERROR') as logs:
+            self.assertTrue(chores.run())
+        self.assertEqual(chores.done, ['fail', 0, 1, 2])
+        self.assertEqual(len(logs.records), 2)
+        self.assertIn('No such maintenance task: nothing', logs.output[0])
+        self.assertIn('fail maintenance failed.', logs.output[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
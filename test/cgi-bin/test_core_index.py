@@ -0,0 +1,101 @@
+"""
+Tests the submission index maintained by core_index.py.
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+
+import test
+sys.path.append(test.SRC_CGI)
+import tamarin
+import core_index
+from core_type import GradedFile
+
+class IndexTest(test.TamarinTestCase):
+    """ Tests the submission index against a few files in A01. """
+
+    def setUp(self):
+        """ Creates a graded and an ungraded submission; uses a temp index. """
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.oldIndex = (tamarin.SUBMISSION_INDEX, tamarin.USE_SUBMISSION_INDEX)
+        tamarin.SUBMISSION_INDEX = os.path.join(self.tempDir.name, 'test.db')
+        tamarin.USE_SUBMISSION_INDEX = True
+
+        a01 = os.path.join(tamarin.GRADED_ROOT, 'A01-20380119-0314')
+        self.files = [os.path.join(a01, 'JohndoeA01-20120101-1200.java'),
+                      os.path.join(a01, 'JohndoeA01-20120101-1200-4.5.txt'),
+                      os.path.join(tamarin.SUBMITTED_ROOT,
+                                   'JohndoeA01-20120102-1200.java')]
+        for f in self.files:
+            with open(f, 'w') as outfile:
+                outfile.write('<p class="grade"><b>Grade:</b> 4.5</p>\n')
+
+    def tearDown(self):
+        for f in self.files:
+            if os.path.exists(f):
+                os.remove(f)
+        for f in os.listdir(os.path.dirname(self.files[0])):
+            if f.startswith('JohndoeA01-20120101-1200-'):
+                os.remove(os.path.join(os.path.dirname(self.files[0]), f))
+        core_index.close()
+        tamarin.SUBMISSION_INDEX, tamarin.USE_SUBMISSION_INDEX = self.oldIndex
+        self.tempDir.cleanup()
+
+    def testGetSubmissions(self):
+        """ Index built when missing -> same results as the filesystem. """
+        indexed = tamarin.getSubmissions(user='johndoe', assignment='A01')
+        self.assertTrue(os.path.exists(tamarin.SUBMISSION_INDEX))
+        self.assertEqual(indexed, [self.files[0], self.files[2]])
+        self.assertEqual(tamarin.getSubmissions(assignment='A01',
+                                                submitted=False),
+                         [self.files[0]])
+        self.assertEqual(tamarin.getSubmissions(user='Foobar'), [])
+
+        tamarin.USE_SUBMISSION_INDEX = False
+        self.assertEqual(tamarin.getSubmissions(user='johndoe',
+                                                assignment='A01'), indexed)
+
+    def testUpdate(self):
+        """ GradedFile.update -> index records new grade and flags. """
+        self.assertEqual(core_index.rebuild(), 2)
+        graded = GradedFile(os.path.basename(self.files[0]))
+        self.assertEqual(graded.grade, 4.5)
+        graded.grade = 5.0
+        graded.humanVerified = True
+        graded.update()
+
+        conn = core_index.connect()
+        row = conn.execute('SELECT grade, humanVerified, graderOutputPath '
+                           'FROM submissions WHERE filename = ?',
+                           (graded.filename,)).fetchone()
+        self.assertEqual(row, ('5.0', 1, graded.graderOutputPath))
+        self.assertEqual(GradedFile(graded.filename).grade, 5.0)
+
+    def testConnection(self):
+        """ One connection reused; missing index scanned only once. """
+        scans = []
+        getSubmittedFilenames = tamarin.getSubmittedFilenames
+        def countScans(only=None):
+            scans.append(only)
+            return getSubmittedFilenames(only)
+        tamarin.getSubmittedFilenames = countScans
+        try:
+            self.assertEqual(core_index.rebuild(), 2)
+            self.assertEqual(len(scans), 1)
+            conn = core_index.connect()
+            self.assertIs(core_index.connect(), conn)
+            self.assertEqual(len(scans), 1)
+            
+            core_index.discard()
+            self.assertFalse(os.path.exists(tamarin.SUBMISSION_INDEX))
+            self.assertEqual(len(core_index.getRecords('johndoe')), 2)
+            self.assertEqual(len(scans), 2)
+            self.assertIsNot(core_index.connect(), conn)
+        finally:
+            tamarin.getSubmittedFilenames = getSubmittedFilenames
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+"""
+Tests core_janitor.py.
+"""
+
+import unittest
+import contextlib
+import io
+import os
+import shutil
+import sys
+import time
+
+import test
+sys.path.append(test.SRC_CGI)
+import tamarin
+import core_janitor
+import core_storage
+import masterview
+from core_type import Assignment
+
+
+class JanitorTest(test.TamarinTestCase):
+    """ Tests deleting old files from the working directories. """
+
+    def setUp(self):
+        """ Creates old and new uploads and an old hidden temp file. """
+        self.retention = tamarin.JANITOR_RETENTION_DAYS
+        tamarin.JANITOR_RETENTION_DAYS = {tamarin.UPLOADED_ROOT: 1}
+        a01 = Assignment('A01').path
+        self.old = [os.path.join(tamarin.UPLOADED_ROOT, 'JohndoeA01.java'),
+                    os.path.join(a01, '.JohndoeA01-20120101-1200-.txt')]
+        self.new = [os.path.join(tamarin.UPLOADED_ROOT, 'JanedoeA01.java'),
+                    os.path.join(a01, '.JanedoeA01-20120101-1200-.txt')]
+        twoDaysAgo = time.time() - 2 * core_janitor.SECONDS_PER_DAY
+        for f in self.old + self.new:
+            with open(f, 'w') as outfile:
+                outfile.write('class Test {}\n')
+        for f in self.old:
+            os.utime(f, (twoDaysAgo, twoDaysAgo))
+
+    def tearDown(self):
+        tamarin.JANITOR_RETENTION_DAYS = self.retention
+        for f in self.old + self.new:
+            if os.path.exists(f):
+                os.remove(f)
+
+    def testSweep(self):
+        """ Old files -> reported on dry run; deleted otherwise. """
+        swept = core_janitor.sweep(dryRun=True)
+        self.assertEqual(sorted(path for path, size in swept),
+                         sorted(self.old))
+        self.assertTrue(all(os.path.exists(f) for f in self.old))
+
+        swept = core_janitor.sweep()
+        self.assertEqual(sorted(path for path, size in swept),
+                         sorted(self.old))
+        self.assertFalse(any(os.path.exists(f) for f in self.old))
+        self.assertTrue(all(os.path.exists(f) for f in self.new))
+        self.assertEqual(core_janitor.sweep(), [])
+
+    def testStripped(self):
+        """ Old submission just stripped -> copy kept until it expires. """
+        tamarin.BLOB_ROOT = os.path.join(tamarin.TAMARIN_ROOT, 'blobs')
+        tamarin.JANITOR_RETENTION_DAYS = {tamarin.STRIPPED_ROOT: 7}
+        graded = os.path.join(Assignment('A01').path, 
+                              'JohndoeA01-20120101-1200.java')
+        stripped = os.path.join(tamarin.STRIPPED_ROOT, 'JohndoeA01.java')
+        self.old.append(graded)
+        self.new.append(stripped)
+        try:
+            with open(graded, 'w') as outfile:
+                outfile.write('class Test {}\n')
+            monthAgo = time.time() - 30 * core_janitor.SECONDS_PER_DAY
+            os.utime(graded, (monthAgo, monthAgo))
+            self.assertTrue(core_storage.storeBlob(graded))
+            with contextlib.redirect_stdout(io.StringIO()):
+                masterview.stripFiles('A01', 'Johndoe')
+            self.assertTrue(os.path.exists(stripped))
+            self.assertNotIn(stripped, 
+                             [path for path, size in core_janitor.sweep()])
+            self.assertTrue(os.path.exists(stripped))
+            
+            weekAgo = time.time() - 8 * core_janitor.SECONDS_PER_DAY
+            os.utime(stripped, (weekAgo, weekAgo))
+            self.assertEqual(core_janitor.sweep(), [(stripped, 14)])
+            self.assertTrue(os.path.exists(graded))
+        finally:
+            shutil.rmtree(tamarin.BLOB_ROOT)
+            tamarin.BLOB_ROOT = None
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+"""
+Tests the event journal kept by core_journal.py.
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+
+import test
+sys.path.append(test.SRC_CGI)
+import tamarin
+import core_journal
+import masterview
+from core_type import GradedFile
+
+class JournalTest(test.TamarinTestCase):
+    """ Tests journaling changes to a graded submission in A01. """
+
+    def setUp(self):
+        """ Creates a graded submission; uses a temp journal. """
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.oldJournal = (tamarin.EVENT_JOURNAL, tamarin.USE_EVENT_JOURNAL)
+        tamarin.EVENT_JOURNAL = os.path.join(self.tempDir.name, 'journal.log')
+        tamarin.USE_EVENT_JOURNAL = True
+
+        self.a01 = os.path.join(tamarin.GRADED_ROOT, 'A01-20380119-0314')
+        self.filename = 'JohndoeA01-20120101-1200.java'
+        with open(os.path.join(self.a01, self.filename), 'w') as outfile:
+            outfile.write('class Test {}\n')
+        with open(os.path.join(self.a01, 'JohndoeA01-20120101-1200-4.5.txt'),
+                  'w') as outfile:
+            outfile.write(tamarin.GRADE_START_TAG + '4.5' + 
+                          tamarin.GRADE_END_TAG + '\n')
+
+    def tearDown(self):
+        for fn in os.listdir(self.a01):
+            if fn.startswith('JohndoeA01-20120101-1200'):
+                os.remove(os.path.join(self.a01, fn))
+        tamarin.EVENT_JOURNAL, tamarin.USE_EVENT_JOURNAL = self.oldJournal
+        self.tempDir.cleanup()
+
+    def testJournal(self):
+        """ Changes -> numbered events; compacted -> last state kept. """
+        self.assertEqual(list(core_journal.readEvents()), [])
+        masterview.modifySubmission(self.filename, '4', True, 'Nice.')
+        masterview.deleteComment(self.filename, '1')
+        events = list(core_journal.readEvents())
+        self.assertEqual([(e['seq'], e['event']) for e in events],
+                         [(1, 'regrade'), (2, 'verify'), (3, 'comment'),
+                          (4, 'delete')])
+        self.assertEqual(events[2]['commentID'], 1)
+        self.assertTrue(events[2]['commented'])
+        self.assertFalse(events[3]['commented'])
+        self.assertEqual(events[3]['grade'], 4.0)
+        self.assertEqual([e['seq'] for e in core_journal.readEvents(2)], 
+                         [3, 4])
+
+        other = GradedFile(self.filename)
+        other.filename = 'FoobarA01-20120101-1300.java'
+        core_journal.record('grade', other)
+        self.assertEqual(core_journal.compact(), (2, 3))
+        self.assertEqual([e['seq'] for e in core_journal.readEvents()], [4, 5])
+        self.assertEqual(core_journal.record('verify', other), 6)
+
+    def testVerifyOnly(self):
+        """ Whole-number grade only verified -> no regrade journaled. """
+        os.rename(os.path.join(self.a01, 'JohndoeA01-20120101-1200-4.5.txt'),
+                  os.path.join(self.a01, 'JohndoeA01-20120101-1200-4.txt'))
+        masterview.markAllAsVerified('A01', silent=True)
+        self.assertEqual(GradedFile(self.filename).graderOutputFilename,
+                         'JohndoeA01-20120101-1200-4.0-H.txt')
+        self.assertEqual([e['event'] for e in core_journal.readEvents()],
+                         ['verify'])
+        
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,365 @@
+"""
+Tests the storage layout tools in core_storage.py.
+"""
+
+import unittest
+import io
+import json
+import os
+import shutil
+import sys
+import threading
+
+import test
+sys.path.append(test.SRC_CGI)
+import tamarin
+import core_storage
+import core_view
+import masterview
+from core_type import TamarinError, getAssignment, GradedFile, CourseSnapshot
+from core_grade import GradeFile
+from test_core_grade import Stub
+
+class ShardTest(test.TamarinTestCase):
+    """ Tests converting A01 to and from the per-user layout. """
+
+    def setUp(self):
+        """ Creates a graded submission in the flat layout. """
+        self.a01 = getAssignment('A01').path
+        self.names = ['JohndoeA01-20120101-1200.java',
+                      'JohndoeA01-20120101-1200-4.5.txt']
+        for fn in self.names:
+            with open(os.path.join(self.a01, fn), 'w') as outfile:
+                outfile.write('')
+
+    def tearDown(self):
+        tamarin.SHARD_GRADED_BY_USER = False
+        for d in (self.a01, os.path.join(self.a01, 'johndoe')):
+            for fn in self.names:
+                if os.path.exists(os.path.join(d, fn)):
+                    os.remove(os.path.join(d, fn))
+        if os.path.isdir(os.path.join(self.a01, 'johndoe')):
+            os.rmdir(os.path.join(self.a01, 'johndoe'))
+
+    def testMigrate(self):
+        """ Flat -> per-user -> flat, with files found all along. """
+        tamarin.SHARD_GRADED_BY_USER = True
+        self.assertEqual(GradedFile(self.names[0]).grade, 4.5)
+        self.assertEqual(core_storage.migrate(['A01']), (2, 0))
+        userDir = os.path.join(self.a01, 'johndoe')
+        self.assertEqual(sorted(os.listdir(userDir)), sorted(self.names))
+
+        graded = GradedFile(self.names[0])
+        self.assertEqual(graded.path, os.path.join(userDir, self.names[0]))
+        self.assertEqual(graded.grade, 4.5)
+        self.assertEqual(tamarin.getSubmissions('johndoe', 'A01',
+                                                submitted=False),
+                         [graded.path])
+        records = CourseSnapshot('johndoe', 'A01').getSubmissions('johndoe',
+                                                                  'A01')
+        self.assertEqual([r.path for r in records], [graded.path])
+
+        tamarin.SHARD_GRADED_BY_USER = False
+        self.assertEqual(core_storage.migrate(['A01']), (2, 0))
+        self.assertFalse(os.path.exists(userDir))
+        self.assertEqual(GradedFile(self.names[0]).path,
+                         os.path.join(self.a01, self.names[0]))
+
+
+class ArchiveTest(test.TamarinTestCase):
+    """ Tests archiving and unpacking a closed assignment. """
+
+    def setUp(self):
+        """ Creates a closed assignment with two graded submissions. """
+        self.path = os.path.join(tamarin.GRADED_ROOT, 'A53-20120101-0000')
+        os.makedirs(os.path.join(self.path, 'foobar'))
+        self.files = [os.path.join(self.path, 'JohndoeA53-20111231-1200.java'),
+                      os.path.join(self.path, 
+                                   'JohndoeA53-20111231-1200-4.5.txt'),
+                      os.path.join(self.path, 'foobar', 
+                                   'FoobarA53-20111231-1300.java'),
+                      os.path.join(self.path, 'foobar', 
+                                   'FoobarA53-20111231-1300-3-H.txt')]
+        for f in self.files:
+            with open(f, 'w') as outfile:
+                outfile.write('<p>' + os.path.basename(f) + '</p>\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def testArchive(self):
+        """ Archived -> one file, still readable; unpacked -> restored. """
+        self.assertRaisesRegex(TamarinError, 'ASSIGNMENT_NOT_CLOSED',
+                               core_storage.archive, getAssignment('A01'))
+        assignment = getAssignment('A53')
+        self.assertEqual(core_storage.archive(assignment), 4)
+        self.assertEqual(os.listdir(self.path), 
+                         [core_storage.ARCHIVE_FILENAME])
+
+        graded = GradedFile('FoobarA53-20111231-1300.java')
+        self.assertTrue(graded.isArchived())
+        self.assertEqual(graded.grade, 3)
+        self.assertTrue(graded.humanVerified)
+        self.assertEqual(len(tamarin.getSubmissions(assignment='A53')), 2)
+        self.assertEqual(len(CourseSnapshot(assignment='A53').records), 2)
+        graded.humanVerified = False
+        self.assertRaisesRegex(TamarinError, 'ARCHIVED_SUBMISSION', 
+                               graded.update)
+        
+        sys.stdout = io.StringIO()
+        try:
+            core_view.displaySubmission('JohndoeA53-20111231-1200.java')
+            output = sys.stdout.getvalue()
+        finally:
+            sys.stdout = sys.__stdout__
+        self.assertIn('&lt;p&gt;JohndoeA53-20111231-1200.java', output)
+        self.assertIn('<p>JohndoeA53-20111231-1200-4.5.txt', output)
+
+        self.assertEqual(core_storage.unpack(assignment), 4)
+        for f in self.files:
+            self.assertTrue(os.path.exists(f))
+        self.assertFalse(GradedFile(os.path.basename(self.files[0]))
+                         .isArchived())
+
+
+class CompressTest(test.TamarinTestCase):
+    """ Tests compressed grader output files. """
+
+    def setUp(self):
+        """ Creates a graded submission with a plain grader output. """
+        a01 = getAssignment('A01').path
+        self.filename = 'JohndoeA01-20120101-1200.java'
+        self.output = os.path.join(a01, 'JohndoeA01-20120101-1200-4.5.txt')
+        with open(os.path.join(a01, self.filename), 'w') as outfile:
+            outfile.write('class Test {}\n')
+        with open(self.output, 'w') as outfile:
+            outfile.write('<div class="grader">\n' + tamarin.GRADE_START_TAG + 
+                          '4.5' + tamarin.GRADE_END_TAG + '\n</div>\n')
+
+    def tearDown(self):
+        tamarin.COMPRESS_GRADER_OUTPUT = False
+        a01 = getAssignment('A01').path
+        for fn in os.listdir(a01):
+            if fn.startswith('JohndoeA01-20120101-1200'):
+                os.remove(os.path.join(a01, fn))
+
+    def testCompress(self):
+        """ Compressed -> still read and modified; decompressed again. """
+        tamarin.COMPRESS_GRADER_OUTPUT = True
+        self.assertEqual(core_storage.compressGraderOutputs(
+                                                getAssignment('A01')), 1)
+        self.assertFalse(os.path.exists(self.output))
+        graded = GradedFile(self.filename)
+        self.assertEqual(graded.graderOutputPath, self.output + '.gz')
+        self.assertEqual(graded.grade, 4.5)
+
+        masterview.modifySubmission(self.filename, '3', True, 'Good job.')
+        graded = GradedFile(self.filename)
+        self.assertEqual(graded.graderOutputFilename, 
+                         'JohndoeA01-20120101-1200-3.0-HC.txt.gz')
+        with core_storage.openFile(graded.graderOutputPath) as filein:
+            contents = filein.read()
+        merged = ''.join(core_view.mergeReview(contents.splitlines(True),
+                                               graded.loadReview()))
+        self.assertIn('Good job.', merged)
+        self.assertIn(tamarin.GRADE_START_TAG + '3.0', merged)
+
+        tamarin.COMPRESS_GRADER_OUTPUT = False
+        self.assertEqual(core_storage.compressGraderOutputs(
+                                                getAssignment('A01')), 1)
+        graded = GradedFile(self.filename)
+        with open(graded.graderOutputPath) as filein:
+            self.assertEqual(filein.read(), contents)
+
+
+class ReviewTest(test.TamarinTestCase):
+    """ Tests recording TA changes in a submission's review log. """
+
+    def setUp(self):
+        """ Creates a graded submission with one embedded TA comment. """
+        a01 = getAssignment('A01').path
+        self.filename = 'JohndoeA01-20120101-1200.java'
+        self.output = os.path.join(a01, 'JohndoeA01-20120101-1200-4.5-C.txt')
+        with open(os.path.join(a01, self.filename), 'w') as outfile:
+            outfile.write('class Test {}\n')
+        with open(self.output, 'w') as outfile:
+            outfile.write('<div class="grader">\n' + 
+                          ''.join(core_view.formatComment(2, 'Old.')) +
+                          tamarin.GRADE_START_TAG + '4.5' + 
+                          tamarin.GRADE_END_TAG + '\n</div>\n')
+
+    def tearDown(self):
+        a01 = getAssignment('A01').path
+        for fn in os.listdir(a01):
+            if fn.startswith('JohndoeA01-20120101-1200'):
+                os.remove(os.path.join(a01, fn))
+
+    def getMerged(self):
+        """ Returns the grader output as it would be displayed. """
+        graded = GradedFile(self.filename)
+        with core_storage.openFile(graded.graderOutputPath) as filein:
+            return ''.join(core_view.mergeReview(filein, graded.loadReview()))
+
+    def testReview(self):
+        """ Comments added/deleted -> logged, output untouched but merged. """
+        with open(self.output) as filein:
+            original = filein.read()
+        masterview.modifySubmission(self.filename, '4', False, 'New.')
+        graded = GradedFile(self.filename)
+        self.assertEqual(graded.graderOutputFilename, 
+                         'JohndoeA01-20120101-1200-4.0-C.txt')
+        with open(graded.graderOutputPath) as filein:
+            self.assertEqual(filein.read(), original)
+        self.assertEqual([(e.get('grade'), e.get('id')) 
+                          for e in graded.loadReview()], [(4.0, 3)])
+        merged = self.getMerged()
+        self.assertLess(merged.index('Old.'), merged.index('New.'))
+        self.assertLess(merged.index('New.'), 
+                        merged.index(tamarin.GRADE_START_TAG + '4.0'))
+
+        masterview.deleteComment(self.filename, '2')
+        self.assertNotIn('Old.', self.getMerged())
+        self.assertRaisesRegex(TamarinError, 'BAD_SUBMITTED_FORM',
+                               masterview.deleteComment, self.filename, '2')
+        masterview.deleteComment(self.filename, '3')
+        self.assertNotIn('comment', self.getMerged())
+        self.assertFalse(GradedFile(self.filename).humanComment)
+
+    def testResultSidecar(self):
+        """ Output with result sidecar -> grade and comments found by it. """
+        os.remove(self.output)
+        head = '<div class="grader">\n<p>Ran tests.</p>\n'
+        gradeLine = tamarin.GRADE_START_TAG + '4.5' + tamarin.GRADE_END_TAG
+        with open(self.output.replace('-C.', '.'), 'w') as outfile:
+            outfile.write(head + gradeLine + '\n</div>\n')
+        graded = GradedFile(self.filename)
+        with open(graded.getResultPath(), 'w') as outfile:
+            json.dump({'grade': 4.5, 'gradeStart': len(head), 
+                       'gradeEnd': len(head + gradeLine) + 1}, outfile)
+        self.assertEqual(graded.loadResult()['grade'], 4.5)
+        
+        masterview.modifySubmission(self.filename, '4', False, 'New.')
+        graded = GradedFile(self.filename)
+        parts = list(core_view.readGraderOutput(graded.graderOutputPath,
+                                                graded.loadReview(),
+                                                graded.loadResult()))
+        self.assertEqual(parts[2][0], 'comment')
+        self.assertEqual(parts[2][1][0], 1)
+        self.assertEqual(parts[-2], ('grade', '4.0'))
+        self.assertEqual(parts[-1], ('line', '</div>\n'))
+        
+        sys.stdout = io.StringIO()
+        try:
+            core_view.displaySubmission(self.filename, master=True)
+            output = sys.stdout.getvalue()
+        finally:
+            sys.stdout = sys.__stdout__
+        self.assertIn('<p>Ran tests.</p>', output)
+        self.assertIn('name="deleteComment" value="1"', output)
+        self.assertEqual(output.count(tamarin.GRADE_START_TAG), 1)
+        masterview.deleteComment(self.filename, '1')
+        self.assertFalse(GradedFile(self.filename).humanComment)
+
+    def testHighlightedSidecar(self):
+        """ Output highlighted when graded -> streamed through as is. """
+        os.remove(self.output)
+        results = {}
+        with open(self.output.replace('-C.', '.'), 'w') as graderOut:
+            print('<div class="grader">', file=graderOut)
+            grade, passed = GradeFile().runProcesses(
+                                [Stub(4.5, '## [PASS] Ran.\n')], {}, 
+                                graderOut, results=results)
+        graded = GradedFile(self.filename)
+        GradeFile.writeResults(graded.getResultPath(), 
+                               dict(results, grade=grade, passed=passed))
+        self.assertIs(graded.loadResult()['highlighted'], True)
+        parts = list(core_view.readGraderOutput(graded.graderOutputPath,
+                                                graded.loadReview(),
+                                                graded.loadResult()))
+        self.assertEqual([kind for kind, value in parts], 
+                         ['html', 'grade', 'html'])
+        self.assertEqual(parts[1:], [('grade', '4.5'), ('html', '</div>\n')])
+        head = parts[0][1]
+        self.assertIn('<span class="graderOutputLine">## [<span class='
+                      '"graderPASS">PASS</span>] Ran.\n</span>', head)
+
+        sys.stdout = io.StringIO()
+        try:
+            core_view.displaySubmission(self.filename)
+            output = sys.stdout.getvalue()
+        finally:
+            sys.stdout = sys.__stdout__
+        self.assertIn(head, output)
+        self.assertIn(tamarin.GRADE_START_TAG + '4.5', output)
+
+
+class LockTest(test.TamarinTestCase):
+    """ Tests per-submission locks. """
+
+    def testLock(self):
+        """ Exclusive lock held -> others wait; lock files then removed. """
+        events = []
+        def reader(filename):
+            with core_storage.lockSubmission(filename, shared=True):
+                events.append('read ' + filename)
+
+        filename = 'JohndoeA01-20120101-1200.java'
+        with core_storage.lockSubmission(filename):
+            waiting = threading.Thread(target=reader, args=(filename,))
+            waiting.start()
+            other = threading.Thread(target=reader, 
+                                     args=('FoobarA01-20120101-1200.java',))
+            other.start()
+            other.join(5)
+            waiting.join(0.2)
+            events.append('written')
+        waiting.join(5)
+        self.assertEqual(events, ['read FoobarA01-20120101-1200.java', 
+                                  'written', 'read ' + filename])
+        self.assertEqual(os.listdir(tamarin.LOCK_ROOT), [])
+        self.assertRaisesRegex(TamarinError, 'BAD_GRADE_FILENAME',
+                               core_storage.lockSubmission('A01').__enter__)
+
+
+class BlobTest(test.TamarinTestCase):
+    """ Tests storing submitted files by content. """
+
+    def setUp(self):
+        """ Creates two identical submissions and one different one. """
+        tamarin.BLOB_ROOT = os.path.join(tamarin.TAMARIN_ROOT, 'blobs')
+        self.files = [os.path.join(tamarin.SUBMITTED_ROOT, fn) for fn in 
+                      ('JohndoeA01-20120101-1200.java', 
+                       'JohndoeA01-20120101-1201.java',
+                       'JohndoeA01-20120101-1202.java')]
+        for f, contents in zip(self.files, ['same', 'same', 'other']):
+            with open(f, 'w') as outfile:
+                outfile.write('class Test {} //' + contents + '\n')
+
+    def tearDown(self):
+        shutil.rmtree(tamarin.BLOB_ROOT)
+        tamarin.BLOB_ROOT = None
+        for f in self.files:
+            if os.path.exists(f):
+                os.remove(f)
+
+    def testDedupe(self):
+        """ Identical files -> one blob; unlinked blobs -> removed. """
+        self.assertEqual(core_storage.dedupe(), (3, 0))
+        self.assertTrue(os.path.samefile(self.files[0], self.files[1]))
+        self.assertFalse(os.path.samefile(self.files[0], self.files[2]))
+        blob = core_storage.storeBlob(self.files[0])
+        self.assertEqual(os.path.basename(blob), 
+                         core_storage.hashFile(self.files[1]))
+        stats = core_storage.getBlobStats()
+        size = os.path.getsize(self.files[0])
+        self.assertEqual((stats['blobs'], stats['files'], stats['saved']), 
+                         (2, 3, size))
+
+        os.remove(self.files[2])
+        self.assertEqual(core_storage.getBlobStats()['orphans'], 1)
+        self.assertEqual(core_storage.dedupe(), (2, 1))
+        self.assertEqual(core_storage.getBlobStats()['blobs'], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
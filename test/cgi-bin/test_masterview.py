@@ -0,0 +1,107 @@
+"""
+Tests masterview.py.
+"""
+import unittest
+import contextlib
+import glob
+import io
+import os
+import sys
+
+import cgifactory
+import test
+
+sys.path.append(test.SRC_CGI)
+import tamarin
+from core_type import Assignment
+import core_view
+import masterview
+
+class MasterviewTest(test.TamarinTestCase):
+
+    def setUp(self):
+        self.perPage = tamarin.MASTERVIEW_USERS_PER_PAGE
+        a01 = Assignment('A01').path
+        with open(os.path.join(a01, 'JohndoeA01-20200606-1300.java'),
+                  'w') as file:
+            file.write('graded content')
+        with open(os.path.join(a01, 'JohndoeA01-20200606-1300-3-H.txt'),
+                  'w') as file:
+            file.write('<div class="grader">grader output</div>')
+
+    def tearDown(self):
+        """ Clean any stub files dropped during test. """
+        tamarin.MASTERVIEW_USERS_PER_PAGE = self.perPage
+        os.environ.pop('HTTP_IF_NONE_MATCH', None)
+        for file in glob.glob(os.path.join(Assignment('A01').path, '*')):
+            os.remove(file)
+
+    def testPages(self):
+        """ Full assignment view -> split into pages of users. """
+        tamarin.MASTERVIEW_USERS_PER_PAGE = 3
+        form = cgifactory.get(assignment='A01', brief='', page='2')
+        response = self.query(masterview.main, form)
+        self.assertIn('Users 4-4 of 4', response)
+        self.assertIn('page=1', response)
+        self.assertIn('ztomasze', response)
+        self.assertNotIn('johndoe', response)
+
+        form = cgifactory.get(assignment='A01', brief='', section='01')
+        response = self.query(masterview.main, form)
+        self.assertNotIn('class="pages"', response)
+        self.assertIn('graded content', response)
+        self.assertNotIn('foobar', response)
+        self.assertNotIn('Tamarin Error', response)
+
+        form = cgifactory.get(assignment='A01', brief='', page='x')
+        response = self.query(masterview.main, form)
+        self.assertIn('BAD_SUBMITTED_FORM', response)
+        self.assertNotIn('UNHANDLED_ERROR', response)
+
+        buffer = io.StringIO()
+        with contextlib.redirect_stdout(buffer):
+            core_view.displayPageLinks('A01', 'M&W 1', 1, 2, 0, ['a', 'b'], 4)
+        self.assertIn('&amp;section=M%26W%201&amp;page=2"', buffer.getvalue())
+
+    def testFragment(self):
+        """ Brief view -> expandable; fragment -> just that submission. """
+        form = cgifactory.get(assignment='A01', brief='1')
+        response = self.query(masterview.main, form)
+        self.assertIn('?fragment=JohndoeA01-20200606-1300.java', response)
+        self.assertNotIn('graded content', response)
+
+        form = cgifactory.get(fragment='JohndoeA01-20200606-1300.java')
+        response = self.query(masterview.main, form)
+        self.assertTrue(response.startswith('Content-Type: text/html\n'))
+        self.assertIn('\n\n<div class="submission">', response)
+        self.assertIn('grader output', response)
+        self.assertNotIn('</html>', response)
+
+    def testConditionalGet(self):
+        """ Same ETag -> 304 until a file changes; source -> cacheable. """
+        form = cgifactory.get(user='johndoe', brief='1')
+        response = self.query(masterview.main, form)
+        etag = [h for h in response.split('\n') if h.startswith('ETag: ')]
+        self.assertEqual(len(etag), 1)
+        
+        os.environ['HTTP_IF_NONE_MATCH'] = etag[0][len('ETag: '):]
+        response = self.query(masterview.main, form)
+        self.assertTrue(response.startswith('Status: 304 Not Modified\n'))
+        self.assertNotIn('</html>', response)
+
+        # changing the grade just renames the grader output
+        a01 = Assignment('A01').path
+        os.rename(os.path.join(a01, 'JohndoeA01-20200606-1300-3-H.txt'),
+                  os.path.join(a01, 'JohndoeA01-20200606-1300-4-H.txt'))
+        response = self.query(masterview.main, form)
+        self.assertNotIn('Status: 304', response)
+        self.assertIn('[4', response)
+
+        form = cgifactory.get(source='JohndoeA01-20200606-1300.java')
+        response = self.query(masterview.main, form)
+        self.assertIn('immutable', response)
+        self.assertTrue(response.endswith('\n\ngraded content'))
+
+
+if __name__ == "__main__":
+    unittest.main()
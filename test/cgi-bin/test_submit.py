@@ -1,77 +1,145 @@
-"""
-Tests upload.py.
-
-Author: Zach Tomaszewski
-Created: Jun 2, 2012
-"""
-import unittest
-import glob
-import os
-import sys
-
-import cgifactory
-import test
-
-sys.path.append(test.SRC_CGI)
-import tamarin
-import submit
-
-class UploadTest(test.TamarinTestCase):
-    
-    @classmethod
-    def setUpClass(cls):
-        """ Turn off gradepipe. """
-        open(tamarin.GRADEPIPE_DISABLED, 'w').close()
-        
-    @classmethod
-    def tearDownClass(cls):
-        """ Turn gradepipe back on and clear out any/all submitted files. """
-        os.remove(tamarin.GRADEPIPE_DISABLED)
-        submitted = glob.glob(os.path.join(tamarin.SUBMITTED_ROOT, "*"))
-        for file in submitted:
-            os.remove(file)
-                
-    def setUp(self):
-        self.file = 'JohndoeA01.java'
-        self.testFile = os.path.join(tamarin.UPLOADED_ROOT, self.file)
-        with open(self.testFile, 'w') as f:
-            f.write("file contents here")        
-        
-    def tearDown(self):
-        if os.path.exists(self.testFile):
-            os.remove(self.testFile)
-        
-    def testBadForm(self):
-        """ Required form fields are missing -> bad form message. """
-        form = cgifactory.get(upload=self.file)  #should be uploaded=
-        response = self.query(submit.main, form)
-        #print(response)
-        self.assertIn('BAD_SUBMITTED_FORM', response)
-        
-    def testBadContext(self):
-        """ Various context problems -> appropriate message. """
-        tests = {
-            'A01': 'BAD_SUBMITTED_FORM',
-            'JohndoeA99.java': 'NO_UPLOADED_FILE',
-        }
-        for file, error in tests.items():
-            form = cgifactory.get(uploaded=file) 
-            response = self.query(submit.main, form)
-            #print(response)
-            self.assertIn(error, response)
-
-    def testGoodSubmission(self):
-        """ Required form fields are missing -> bad form message. """
-        #only a password
-        form = cgifactory.get(uploaded=self.file) 
-        response = self.query(submit.main, form)
-        #print(response)
-        self.assertIn("Submission completed successfully", response)
-        self.assertIn("disabled", response)  # gradepipe was really off?
-        
-
-if __name__ == "__main__":
-    #import sys;sys.argv = ['', 'Test.testName']
-    unittest.main()
-    
+"""
+Tests upload.py.
+
+Author: Zach Tomaszewski
+Created: Jun 2, 2012
+"""
+import unittest
+import glob
+import os
+import re
+import shutil
+import sys
+import tempfile
+
+import cgifactory
+import test
+
+sys.path.append(test.SRC_CGI)
+import tamarin
+import submit
+
+class UploadTest(test.TamarinTestCase):
+    
+    @classmethod
+    def setUpClass(cls):
+        """ Turn off gradepipe. """
+        open(tamarin.GRADEPIPE_DISABLED, 'w').close()
+        
+    @classmethod
+    def tearDownClass(cls):
+        """ Turn gradepipe back on and clear out any/all submitted files. """
+        os.remove(tamarin.GRADEPIPE_DISABLED)
+        submitted = glob.glob(os.path.join(tamarin.SUBMITTED_ROOT, "*"))
+        for file in submitted:
+            os.remove(file)
+                
+    def setUp(self):
+        self.file = 'JohndoeA01.java'
+        self.testFile = os.path.join(tamarin.UPLOADED_ROOT, self.file)
+        with open(self.testFile, 'w') as f:
+            f.write("file contents here")        
+        
+    def tearDown(self):
+        if os.path.exists(self.testFile):
+            os.remove(self.testFile)
+        
+    def testBadForm(self):
+        """ Required form fields are missing -> bad form message. """
+        form = cgifactory.get(upload=self.file)  #should be uploaded=
+        response = self.query(submit.main, form)
+        #print(response)
+        self.assertIn('BAD_SUBMITTED_FORM', response)
+        
+    def testBadContext(self):
+        """ Various context problems -> appropriate message. """
+        tests = {
+            'A01': 'BAD_SUBMITTED_FORM',
+            'JohndoeA99.java': 'NO_UPLOADED_FILE',
+        }
+        for file, error in tests.items():
+            form = cgifactory.get(uploaded=file) 
+            response = self.query(submit.main, form)
+            #print(response)
+            self.assertIn(error, response)
+
+    def testGoodSubmission(self):
+        """ Required form fields are missing -> bad form message. """
+        #only a password
+        form = cgifactory.get(uploaded=self.file) 
+        response = self.query(submit.main, form)
+        #print(response)
+        self.assertIn("Submission completed successfully", response)
+        self.assertIn("disabled", response)  # gradepipe was really off?
+        
+    def testRepeatedSubmission(self):
+        """ Same file submitted twice at once -> two distinct submissions. """
+        first = submit.moveToSubmitted(self.testFile)
+        with open(self.testFile, 'w') as f:
+            f.write("second contents")
+        second = submit.moveToSubmitted(self.testFile)
+        self.assertNotEqual(first, second)
+        self.assertLess(first, second)
+        for filename in (first, second):
+            self.assertTrue(re.match(tamarin.SUBMITTED_RE, filename))
+            self.assertTrue(os.path.exists(os.path.join(tamarin.SUBMITTED_ROOT,
+                                                        filename)))
+
+    def testNoHardlinks(self):
+        """ Hardlinks not supported -> moved into a reserved name. """
+        def link(source, path):
+            raise PermissionError('Operation not permitted')
+        os.link, realLink = link, os.link
+        try:
+            submitted = submit.moveToSubmitted(self.testFile)
+        finally:
+            os.link = realLink
+        self.assertFalse(os.path.exists(self.testFile))
+        with open(os.path.join(tamarin.SUBMITTED_ROOT, submitted)) as f:
+            self.assertEqual(f.read(), "file contents here")
+
+    def testSequenceLimit(self):
+        """ _99 already taken -> waits to use the next second instead. """
+        stamps = ['20200101-120000']
+        def convert(time=None, seconds=False):
+            return stamps[-1]
+        def sleep(seconds):
+            stamps.append('20200101-120001')
+        for seq in range(1, 100):
+            stamp = stamps[0] + ('_' + str(seq).zfill(2) if seq > 1 else '')
+            open(os.path.join(tamarin.SUBMITTED_ROOT, 
+                              'JohndoeA01-' + stamp + '.java'), 'w').close()
+        realConvert = tamarin.convertTimeToTimestamp
+        tamarin.convertTimeToTimestamp = convert
+        submit.time.sleep, realSleep = sleep, submit.time.sleep
+        try:
+            submitted = submit.moveToSubmitted(self.testFile)
+        finally:
+            tamarin.convertTimeToTimestamp = realConvert
+            submit.time.sleep = realSleep
+        self.assertEqual(submitted, 'JohndoeA01-20200101-120001.java')
+
+    def testBlob(self):
+        """ BLOB_ROOT set -> identical submissions linked to one blob. """
+        blobRoot = tamarin.BLOB_ROOT
+        tamarin.BLOB_ROOT = tempfile.mkdtemp()
+        try:
+            first = submit.moveToSubmitted(self.testFile)
+            with open(self.testFile, 'w') as f:
+                f.write("file contents here")
+            second = submit.moveToSubmitted(self.testFile)
+            self.assertTrue(os.path.samefile(
+                                os.path.join(tamarin.SUBMITTED_ROOT, first),
+                                os.path.join(tamarin.SUBMITTED_ROOT, second)))
+            self.assertEqual(os.stat(os.path.join(tamarin.SUBMITTED_ROOT, 
+                                                  first)).st_nlink, 3)
+        finally:
+            shutil.rmtree(tamarin.BLOB_ROOT)
+            tamarin.BLOB_ROOT = blobRoot
+        
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
+    
     
\ No newline at end of file
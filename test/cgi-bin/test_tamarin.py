@@ -1,67 +1,191 @@
-"""
-Tests the utility functions found in tamarin.py.
-
-Created: May 30, 2012
-Author: Zach Tomaszewski
-"""
-
-import unittest
-import sys
-import io
-import shutil
-
-import cgifactory
-import test
-
-sys.path.append(test.SRC_CGI)
-import tamarin
-from tamarin import TamarinError
-from tamarin import printFooter, printHeader, authenticate
-
-class TamarinTest(test.TamarinTestCase):
-
-    def setUp(self):
-        """ Save all normal output to memory buffer for tests. """
-        sys.stdout = io.StringIO()
-        
-    def tearDown(self):
-        """ Reset output stream. """
-        sys.stdout.close()
-        sys.stdout = sys.__stdout__ 
-
-    def testPrintPage(self):
-        """ printHeader and printFooter work. """
-        printHeader()
-        print("<p>Hello World.</p>")
-        printFooter()
-        #print(sys.stdout.getvalue(), file=sys.__stdout__)
-        
-        output = sys.stdout.getvalue()
-        self.assertIn('<html>', output)
-        self.assertIn('</html>', output)
-        self.assertIn('Hello', output)
-        
-    def testAuthenticate(self):
-        """ Check of user -> True or 'INVALID' error, depending. """
-        self.assertTrue(authenticate('johndoe', 'password'))
-        self.assertRaisesRegex(TamarinError, 'INVALID_USERNAME',
-                               authenticate, 'johndo', 'password')
-        self.assertRaisesRegex(TamarinError, 'INVALID_PASSWORD',
-                               authenticate, 'johndoe', 'letmein')
-
-    def testAuthenticateNoUsersFile(self):
-        """ If USERS_FILE is unopenable -> NO_USERS_FILE. """
-        bak = tamarin.USERS_FILE + '.bak'
-        try:
-            shutil.move(tamarin.USERS_FILE, bak)
-            self.assertRaisesRegex(TamarinError, 'NO_USERS_FILE',
-                               authenticate, 'johndoe', 'password')
-        finally:
-            shutil.move(bak, tamarin.USERS_FILE)        
-        #[Contents processing and MALFORMED_USERS_FILE tested manually.]
-        
-
-if __name__ == "__main__":
-    #import sys;sys.argv = ['', 'Test.testName']
-    unittest.main()
+"""
+Tests the utility functions found in tamarin.py.
+
+Created: May 30, 2012
+Author: Zach Tomaszewski
+"""
+
+import unittest
+import sys
+import io
+import datetime
+import gzip
+import json
+import os
+import re
+import shutil
+import tempfile
+
+import cgifactory
+import test
+
+sys.path.append(test.SRC_CGI)
+import tamarin
+from tamarin import TamarinError
+from tamarin import printFooter, printHeader, authenticate
+
+class TamarinTest(test.TamarinTestCase):
+
+    def setUp(self):
+        """ Save all normal output to memory buffer for tests. """
+        sys.stdout = io.StringIO()
+        
+    def tearDown(self):
+        """ Reset output stream. """
+        sys.stdout.close()
+        sys.stdout = sys.__stdout__ 
+
+    def testPrintPage(self):
+        """ printHeader and printFooter work. """
+        printHeader()
+        print("<p>Hello World.</p>")
+        printFooter()
+        #print(sys.stdout.getvalue(), file=sys.__stdout__)
+        
+        output = sys.stdout.getvalue()
+        self.assertIn('<html>', output)
+        self.assertIn('</html>', output)
+        self.assertIn('Hello', output)
+        
+    def testAuthenticate(self):
+        """ Check of user -> True or 'INVALID' error, depending. """
+        self.assertTrue(authenticate('johndoe', 'password'))
+        self.assertRaisesRegex(TamarinError, 'INVALID_USERNAME',
+                               authenticate, 'johndo', 'password')
+        self.assertRaisesRegex(TamarinError, 'INVALID_PASSWORD',
+                               authenticate, 'johndoe', 'letmein')
+
+    def testAuthenticateNoUsersFile(self):
+        """ If USERS_FILE is unopenable -> NO_USERS_FILE. """
+        bak = tamarin.USERS_FILE + '.bak'
+        try:
+            shutil.move(tamarin.USERS_FILE, bak)
+            self.assertRaisesRegex(TamarinError, 'NO_USERS_FILE',
+                               authenticate, 'johndoe', 'password')
+        finally:
+            shutil.move(bak, tamarin.USERS_FILE)        
+        #[Contents processing and MALFORMED_USERS_FILE tested manually.]
+
+    def testUserDirectory(self):
+        """ Users -> indexed, cached, and saved to USERS_CACHE. """
+        users = tamarin.getUsers()
+        self.assertIn('johndoe', users)
+        self.assertEqual(users, sorted(users))
+        self.assertEqual(tamarin.getUsers('01'), ['jane_doe', 'johndoe'])
+        self.assertEqual(tamarin.getUsers('03'), [])
+        self.assertEqual(tamarin.getUserDetails('JohnDoe'), 
+                         ['01', 'Doe', 'John'])
+        self.assertIs(tamarin.getUserDirectory(), tamarin.getUserDirectory())
+        self.assertRaisesRegex(TamarinError, 'INVALID_USERNAME',
+                               tamarin.getUserDetails, 'johndo')
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            oldCache = tamarin.USERS_CACHE
+            tamarin.USERS_CACHE = os.path.join(tempDir, 'users.json')
+            tamarin._userDirectory['signature'] = None
+            try:
+                self.assertIn('johndoe', tamarin.getUserDirectory())
+                self.assertTrue(os.path.exists(tamarin.USERS_CACHE))
+                with open(tamarin.USERS_CACHE) as filein:
+                    cache = json.load(filein)
+                cache['users']['janedoe'] = ['secret', '03', 'Doe', 'Jane']
+                with open(tamarin.USERS_CACHE, 'w') as fileout:
+                    json.dump(cache, fileout)
+                tamarin._userDirectory['signature'] = None
+                self.assertEqual(tamarin.getUsers('03'), ['janedoe'])
+            finally:
+                tamarin.USERS_CACHE = oldCache
+                tamarin._userDirectory['signature'] = None
+
+    def testTimestamps(self):
+        """ Minute and second stamps -> matched, parsed, and sorted. """
+        stamps = ['20120101-1200', '20120101-120000', '20120101-120005', 
+                  '20120101-120005_02', '20120101-120005_03', '20120101-1201']
+        self.assertEqual(sorted(reversed(stamps)), stamps)
+        for stamp in stamps:
+            match = re.match(tamarin.GRADED_RE, 
+                             'JohndoeA01-' + stamp + '-4.5-H.txt')
+            self.assertEqual(match.group(3), stamp)
+            self.assertEqual(match.group(4), '4.5')
+            match = re.match(tamarin.SUBMITTED_RE, 
+                             'JohndoeA01-' + stamp + '.java')
+            self.assertEqual(match.group(3), stamp)
+        self.assertEqual(tamarin.convertTimestampToTime('20120101-120005_02'),
+                         datetime.datetime(2012, 1, 1, 12, 0, 5))
+        self.assertEqual(tamarin.getMinuteTimestamp('20120101-120005_02'), 
+                         '20120101-1200')
+
+    def getResponse(self, encoding, render):
+        """ 
+        Returns the (headers, body) sent by tamarin.response for the given
+        function that prints a page, as if the browser sent the given 
+        Accept-Encoding header.
+        """
+        sys.stdout.close()
+        raw = io.BytesIO()
+        sys.stdout = io.TextIOWrapper(raw, encoding='utf-8')
+        old = os.environ.get('HTTP_ACCEPT_ENCODING')
+        os.environ['HTTP_ACCEPT_ENCODING'] = encoding
+        try:
+            with tamarin.response():
+                render()
+        finally:
+            if old is None:
+                del os.environ['HTTP_ACCEPT_ENCODING']
+            else:
+                os.environ['HTTP_ACCEPT_ENCODING'] = old
+        head, body = raw.getvalue().split(b'\n\n', 1)
+        return head.decode('latin-1').split('\n'), body
+        
+    def testResponse(self):
+        """ Buffered page -> gzipped if accepted, with Content-Length. """
+        def render():
+            printHeader()
+            print("<p>Hello World.</p>" * 100)
+            printFooter()
+        headers, body = self.getResponse('deflate, gzip;q=0.5', render)
+        self.assertIn('Content-Encoding: gzip', headers)
+        self.assertIn('Content-Length: ' + str(len(body)), headers)
+        self.assertIn(b'Hello World', gzip.decompress(body))
+        
+        headers, body = self.getResponse('gzip;q=0, deflate', render)
+        self.assertNotIn('Content-Encoding: gzip', headers)
+        self.assertIn('Content-Length: ' + str(len(body)), headers)
+        self.assertIn(b'</html>', body)
+
+    def testResponseError(self):
+        """ Exception while rendering -> error page still sent. """
+        def render():
+            raise ValueError('Oops')
+        headers, body = self.getResponse('', render)
+        self.assertEqual(headers[0], 'Content-Type: text/html')
+        self.assertIn(b'UNHANDLED_ERROR', body)
+        self.assertIn(b'Oops', body)
+
+    def testNotModified(self):
+        """ Current cached copy -> 304 Not Modified without any body. """
+        validators = tamarin.getValidators([tamarin.USERS_FILE])
+        sent = dict(h.split(': ', 1) for h in validators)
+        try:
+            os.environ['HTTP_IF_MODIFIED_SINCE'] = sent['Last-Modified']
+            def render():
+                if not tamarin.isNotModified(validators):
+                    printHeader()
+            headers, body = self.getResponse('gzip', render)
+            self.assertEqual(headers[0], 'Status: 304 Not Modified')
+            self.assertIn(validators[0], headers)
+            self.assertEqual(body, b'')
+            
+            os.environ['HTTP_IF_NONE_MATCH'] = '"stale"'
+            self.assertFalse(tamarin.isNotModified(validators))
+            os.environ['HTTP_IF_NONE_MATCH'] = 'W/"x", ' + sent['ETag']
+            self.assertTrue(tamarin.isNotModified(validators))
+        finally:
+            os.environ.pop('HTTP_IF_MODIFIED_SINCE', None)
+            os.environ.pop('HTTP_IF_NONE_MATCH', None)
+        
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
     
\ No newline at end of file
@@ -1,109 +1,196 @@
-"""
-Tests view.py.
-
-Author: Zach Tomaszewski
-Created: Jun 2, 2012
-"""
-import unittest
-import glob
-import os
-import sys
-
-import cgifactory
-import test
-
-sys.path.append(test.SRC_CGI)
-import tamarin
-from core_type import Assignment
-import view
-
-class ViewTest(test.TamarinTestCase):
-    
-    def setUp(self):
-        self.fields = {'user': 'johndoe', 'pass': 'password'}
-            
-    def tearDown(self):
-        """ Clean any stub files dropped during test. """
-        files = glob.glob(os.path.join(Assignment('A01').path, '*'))
-        files.extend(glob.glob(os.path.join(tamarin.SUBMITTED_ROOT, '*')))
-        for file in files:
-            os.remove(file)
-
-    def createFile(self, dir, name, contents):
-        """ Puts given contents into a file with given name in given dir. """
-        with open(os.path.join(dir, name), 'w') as file:
-            file.write(contents) 
-
-    def testDefault(self):
-        """ No args given -> login form. """
-        form = cgifactory.post()
-        response = self.query(view.main, form)
-        #print(response)
-        self.assertIn('View Submissions', response)
-        self.assertNotIn('Tamarin Error', response)
-
-    def testEmptyView(self):
-        """ Login -> view of no assignments. """
-        form = cgifactory.post(**self.fields)
-        response = self.query(view.main, form)
-        #print(response)
-        self.assertIn('John Doe', response)
-        self.assertIn('Not yet submitted', response)
-        self.assertNotIn('Tamarin Error', response)
-
-    def testSubmittedOnly(self):
-        """ Login -> view includes a submitted-only file. """
-        self.createFile(tamarin.SUBMITTED_ROOT, 
-                        'JohndoeA01-20200606-1200.java', "submitted content")
-        form = cgifactory.post(**self.fields)
-        response = self.query(view.main, form)
-        #print(response)
-        self.assertIn('John Doe', response)
-        self.assertIn('Not yet graded', response)
-        self.assertNotIn('Tamarin Error', response)
-
-    def testSubmittedOnlyView(self):
-        """ View of single submitted file -> displays content. """
-        self.createFile(tamarin.SUBMITTED_ROOT, 
-                        'JohndoeA01-20200606-1200.java', "submitted content")
-        form = cgifactory.post(submission='JohndoeA01-20200606-1200.java',
-                               **self.fields)
-        response = self.query(view.main, form)
-        #print(response)
-        self.assertIn('submitted content', response)
-        self.assertNotIn('Tamarin Error', response)
-        
-    def testGraded(self):
-        """ Login -> view includes a graded file. """
-        self.createFile(Assignment('A01').path, 
-                        'JohndoeA01-20200606-1300.java', "graded content")
-        self.createFile(Assignment('A01').path, 
-                        'JohndoeA01-20200606-1300-3-H.txt', "grader output")
-        form = cgifactory.post(**self.fields)
-        response = self.query(view.main, form)
-        #print(response)
-        self.assertIn('John Doe', response)
-        self.assertIn('<b>Grade:</b> 3', response)
-        self.assertNotIn('Tamarin Error', response)
-
-    def testGraded(self):
-        """ View of single graded file -> displays content. """
-        self.createFile(Assignment('A01').path, 
-                        'JohndoeA01-20200606-1300.java', "graded content")
-        self.createFile(Assignment('A01').path, 
-                        'JohndoeA01-20200606-1300-3-H.txt', 
-                        '<div class="grader">grader output</div>')
-        form = cgifactory.post(submission='JohndoeA01-20200606-1300.java',
-                               **self.fields)
-        response = self.query(view.main, form)
-        #print(response)
-        self.assertIn('graded content', response)
-        self.assertIn('grader output', response)
-        self.assertNotIn('Tamarin Error', response)
-            
-
-if __name__ == "__main__":
-    #import sys;sys.argv = ['', 'Test.testName']
-    unittest.main()
-    
+"""
+Tests view.py and the submission views it builds with core_view.py.
+
+Author: Zach Tomaszewski
+Created: Jun 2, 2012
+"""
+import unittest
+import glob
+import os
+import shutil
+import sys
+
+import cgifactory
+import test
+
+sys.path.append(test.SRC_CGI)
+import tamarin
+import core_janitor
+import core_view
+import masterview
+from core_type import Assignment, GradedFile, getAssignment
+import view
+
+class ViewTest(test.TamarinTestCase):
+    
+    def setUp(self):
+        self.fields = {'user': 'johndoe', 'pass': 'password'}
+            
+    def tearDown(self):
+        """ Clean any stub files dropped during test. """
+        files = glob.glob(os.path.join(Assignment('A01').path, '*'))
+        files.extend(glob.glob(os.path.join(tamarin.SUBMITTED_ROOT, '*')))
+        for file in files:
+            os.remove(file)
+
+    def createFile(self, dir, name, contents):
+        """ Puts given contents into a file with given name in given dir. """
+        with open(os.path.join(dir, name), 'w') as file:
+            file.write(contents) 
+
+    def testDefault(self):
+        """ No args given -> login form. """
+        form = cgifactory.post()
+        response = self.query(view.main, form)
+        #print(response)
+        self.assertIn('View Submissions', response)
+        self.assertNotIn('Tamarin Error', response)
+
+    def testEmptyView(self):
+        """ Login -> view of no assignments. """
+        form = cgifactory.post(**self.fields)
+        response = self.query(view.main, form)
+        #print(response)
+        self.assertIn('John Doe', response)
+        self.assertIn('Not yet submitted', response)
+        self.assertNotIn('Tamarin Error', response)
+        self.assertNotIn('ETag:', response)  # POSTs are never revalidated
+
+    def testSubmittedOnly(self):
+        """ Login -> view includes a submitted-only file. """
+        self.createFile(tamarin.SUBMITTED_ROOT, 
+                        'JohndoeA01-20200606-1200.java', "submitted content")
+        form = cgifactory.post(**self.fields)
+        response = self.query(view.main, form)
+        #print(response)
+        self.assertIn('John Doe', response)
+        self.assertIn('Not yet graded', response)
+        self.assertNotIn('Tamarin Error', response)
+
+    def testSubmittedOnlyView(self):
+        """ View of single submitted file -> displays content. """
+        self.createFile(tamarin.SUBMITTED_ROOT, 
+                        'JohndoeA01-20200606-1200.java', "submitted content")
+        form = cgifactory.post(submission='JohndoeA01-20200606-1200.java',
+                               **self.fields)
+        response = self.query(view.main, form)
+        #print(response)
+        self.assertIn('submitted content', response)
+        self.assertNotIn('Tamarin Error', response)
+        
+    def testGraded(self):
+        """ Login -> view includes a graded file. """
+        self.createFile(Assignment('A01').path, 
+                        'JohndoeA01-20200606-1300.java', "graded content")
+        self.createFile(Assignment('A01').path, 
+                        'JohndoeA01-20200606-1300-3-H.txt', "grader output")
+        form = cgifactory.post(**self.fields)
+        response = self.query(view.main, form)
+        #print(response)
+        self.assertIn('John Doe', response)
+        self.assertIn('<b>Grade:</b> 3', response)
+        self.assertNotIn('Tamarin Error', response)
+
+    def testGraded(self):
+        """ View of single graded file -> displays content. """
+        self.createFile(Assignment('A01').path, 
+                        'JohndoeA01-20200606-1300.java', "graded content")
+        self.createFile(Assignment('A01').path, 
+                        'JohndoeA01-20200606-1300-3-H.txt', 
+                        '<div class="grader">grader output</div>')
+        form = cgifactory.post(submission='JohndoeA01-20200606-1300.java',
+                               **self.fields)
+        response = self.query(view.main, form)
+        #print(response)
+        self.assertIn('graded content', response)
+        self.assertIn('grader output', response)
+        self.assertNotIn('Tamarin Error', response)
+            
+
+class FragmentTest(test.TamarinTestCase):
+    """ Tests caching the HTML rendered for each submission. """
+
+    def setUp(self):
+        """ Creates a graded submission. """
+        tamarin.FRAGMENT_CACHE_ROOT = os.path.join(tamarin.TAMARIN_ROOT, 
+                                                   'fragments')
+        a01 = getAssignment('A01').path
+        self.filename = 'JohndoeA01-20120101-1200.java'
+        self.files = [os.path.join(a01, self.filename),
+                      os.path.join(a01, 'JohndoeA01-20120101-1200-4.5.txt')]
+        with open(self.files[0], 'w') as outfile:
+            outfile.write('class Test {}\n')
+        with open(self.files[1], 'w') as outfile:
+            outfile.write('<div class="grader">\n## [PASS] Ran.\n' + 
+                          tamarin.GRADE_START_TAG + '4.5' + 
+                          tamarin.GRADE_END_TAG + '\n</div>\n')
+
+    def tearDown(self):
+        shutil.rmtree(tamarin.FRAGMENT_CACHE_ROOT)
+        tamarin.FRAGMENT_CACHE_ROOT = None
+        a01 = getAssignment('A01').path
+        for fn in os.listdir(a01):
+            if fn.startswith('JohndoeA01-20120101-1200'):
+                os.remove(os.path.join(a01, fn))
+
+    def testCache(self):
+        """ Rendered once -> cached until submission or settings change. """
+        html = core_view.renderSubmission(self.filename, master=True)
+        self.assertIn('masterview.py', html)
+        self.assertNotIn('masterview.py', 
+                         core_view.renderSubmission(self.filename))
+        graded = GradedFile(self.filename)
+        path = core_view.getFragmentPath(graded, master=True)
+        with open(path, encoding='utf-8') as filein:
+            key = filein.readline()
+        with open(path, 'w', encoding='utf-8') as fileout:
+            fileout.write(key + 'cached')
+        self.assertEqual(core_view.renderSubmission(self.filename, True), 
+                         'cached')
+
+        tamarin.HIGHLIGHT_PREFIX, prefix = '>> ', tamarin.HIGHLIGHT_PREFIX
+        try:
+            self.assertNotIn('graderOutputLine', 
+                             core_view.renderSubmission(self.filename, True))
+        finally:
+            tamarin.HIGHLIGHT_PREFIX = prefix
+
+        masterview.modifySubmission(self.filename, '4', True, 'First.')
+        self.assertFalse(os.path.exists(path))
+        html = core_view.renderSubmission(self.filename, True)
+        self.assertIn('First.', html)
+        masterview.modifySubmission(self.filename, '4', True, 'Second.')
+        self.assertIn('Second.', core_view.renderSubmission(self.filename, 
+                                                            True))
+
+    def testStale(self):
+        """ Submission changed or deleted -> cached copy swept by janitor. """
+        core_view.renderSubmission(self.filename)
+        core_view.renderSubmission(self.filename, master=True)
+        graded = GradedFile(self.filename)
+        paths = [core_view.getFragmentPath(graded, master) 
+                 for master in (False, True)]
+        self.assertEqual(list(core_view.getStaleFragments()), [])
+
+        with open(self.files[1], 'a') as outfile:
+            outfile.write('\n')
+        core_view.renderSubmission(self.filename)
+        self.assertEqual(list(core_view.getStaleFragments()), [paths[1]])
+
+        retention = tamarin.JANITOR_RETENTION_DAYS
+        tamarin.JANITOR_RETENTION_DAYS = {}
+        try:
+            for path in self.files:
+                os.remove(path)
+            self.assertEqual(sorted(path for path, size in 
+                                    core_janitor.sweep()), sorted(paths))
+        finally:
+            tamarin.JANITOR_RETENTION_DAYS = retention
+        self.assertEqual(os.listdir(tamarin.FRAGMENT_CACHE_ROOT), [])
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
+    
     
\ No newline at end of file